@@ -0,0 +1,18 @@
+"""
+ASGI config for RoadSafety project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server so the notification stream can hold many idle
+connections per worker, e.g. ``uvicorn RoadSafety.asgi:application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'RoadSafety.settings')
+
+application = get_asgi_application()
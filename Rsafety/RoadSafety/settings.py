@@ -24,6 +24,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'roadapp.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -46,12 +47,14 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'roadapp.context_processors.unread_notifications',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'RoadSafety.wsgi.application'
+ASGI_APPLICATION = 'RoadSafety.asgi.application'
 
 # Database
 DATABASES = {
@@ -96,6 +99,11 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Per-view SQL query budgets, checked by roadapp.middleware.QueryBudgetMiddleware
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_FILE = BASE_DIR / 'roadapp' / 'query_budgets.json'
+QUERY_BUDGET_RAISE = False
+
 # Login URL
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -120,4 +128,32 @@ EMAIL_HOST_PASSWORD = ''
 # EMAIL_PORT = 587
 # EMAIL_USE_TLS = True
 # EMAIL_HOST_USER = 'your-email@gmail.com'
-# EMAIL_HOST_PASSWORD = 'your-app-password' 
\ No newline at end of file
+# EMAIL_HOST_PASSWORD = 'your-app-password'
+#
+# Mail is queued in roadapp.OutboundEmail and delivered by `manage.py send_queued_mail`.
+# To try the SMTP path locally, switch to the SMTP backend and run a stand-in server
+# on EMAIL_HOST/EMAIL_PORT, e.g. `python -m aiosmtpd -n -l localhost:1025`.
+
+# Dashboard fragments are cached under per-role/per-user versions that signals bump.
+# Local memory is per process; with several workers use a shared backend instead, e.g.
+# 'django.core.cache.backends.filebased.FileBasedCache' with LOCATION = BASE_DIR / 'cache'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roadsafety',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+FRAGMENT_CACHE_TIMEOUT = 300
+
+# Resized copies of uploaded images are made by a thread pool after the upload commits
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# Image uploads are hashed while they stream in (roadapp.uploads.hashing_uploads)
+# and stored once per distinct content; larger images are rejected
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# Completed and rejected complaints untouched this long move to the archive tables
+# (python manage.py archive_complaints)
+ARCHIVE_AFTER_DAYS = 180
@@ -6,6 +6,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('dashboard/', include('roadapp.admin_urls')),  # Custom admin routes
+    path('api/v1/', include('roadapp.api_urls')),  # Read-only JSON API
     path('', include('roadapp.urls')),
 ]
 
@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Contractor, Complaint, ComplaintAssignment, ComplaintUpdate, Notification
+from django.db.models import Q
+from .models import Contractor, Complaint, ComplaintAssignment, ComplaintUpdate, Notification, OutboundEmail
+from .search import fts_available, matching_complaint_ids
+
+# Admin search only shows the best-ranked matches from the full-text index
+ADMIN_SEARCH_LIMIT = 1000
 
 @admin.register(Contractor)
 class ContractorAdmin(admin.ModelAdmin):
@@ -16,6 +21,12 @@ class ComplaintAdmin(admin.ModelAdmin):
     list_editable = ['status', 'priority']
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not fts_available():
+            return super().get_search_results(request, queryset, search_term)
+        complaint_ids = matching_complaint_ids(search_term, ADMIN_SEARCH_LIMIT)
+        return queryset.filter(Q(id__in=complaint_ids) | Q(user__username=search_term.strip())), False
+
 @admin.register(ComplaintAssignment)
 class ComplaintAssignmentAdmin(admin.ModelAdmin):
     list_display = ['complaint', 'contractor', 'assigned_by', 'assigned_at', 'is_active']
@@ -36,4 +47,11 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ['notification_type', 'is_read', 'created_at']
     search_fields = ['user__username', 'title', 'message']
     list_editable = ['is_read']
-    readonly_fields = ['created_at'] 
\ No newline at end of file
+    readonly_fields = ['created_at'] 
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
@@ -4,8 +4,12 @@ from . import views
 urlpatterns = [
     path('', views.admin_dashboard, name='admin_dashboard'),
     path('complaint/<int:complaint_id>/verify/', views.verify_complaint, name='verify_complaint'),
+    path('complaints/bulk/', views.bulk_complaint_action, name='bulk_complaint_action'),
     path('complaint/<int:complaint_id>/assign/', views.assign_contractor, name='assign_contractor'),
     path('contractors/', views.view_contractors, name='view_contractors'),
     path('contractor/<int:contractor_id>/verify/', views.verify_contractor, name='verify_contractor'),
     path('search/email/', views.search_by_email, name='search_by_email'),
+    path('search/complaints/', views.search_complaints, name='search_complaints'),
+    path('export/<str:name>/', views.export_data, name='export_data'),
+    path('cache-stats/', views.fragment_cache_stats, name='fragment_cache_stats'),
 ]
@@ -0,0 +1,196 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, Count, Max
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Complaint, ComplaintAssignment, ComplaintUpdate, Notification
+from .pagination import DEFAULT_PAGE_SIZE, paginate_keyset
+
+API_VERSION = 'v1'
+
+
+class Resource:
+    """
+    One read-only collection of the API.
+
+    ``scope`` narrows the model's rows to what a user may see. ``version_field``
+    is the column whose maximum, together with the row count, changes whenever
+    any row in the collection does; it drives ETag and Last-Modified.
+    """
+
+    def __init__(self, model, fields, default_fields, filters, scope, key='created_at', version_field='updated_at'):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.filters = filters
+        self.scope = scope
+        self.key = key
+        self.version_field = version_field
+
+    def queryset(self, user, params):
+        """Rows ``user`` may see, narrowed by the filter parameters; raises ValidationError on bad values"""
+        rows = self.scope(self.model.objects.all(), user)
+        for name in self.filters:
+            value = params.get(name)
+            if not value:
+                continue
+            field = self.model._meta.get_field(name)
+            if isinstance(field, BooleanField):
+                value = {'true': True, 'false': False}.get(value.lower(), value)
+            rows = rows.filter(**{name: field.to_python(value)})
+        return rows
+
+
+def role(user):
+    if user.is_staff:
+        return 'admin'
+    if hasattr(user, 'contractor'):
+        return 'contractor'
+    return 'reporter'
+
+
+def complaint_scope(rows, user):
+    user_role = role(user)
+    if user_role == 'admin':
+        return rows
+    if user_role == 'contractor':
+        return rows.filter(id__in=ComplaintAssignment.objects.filter(contractor__user=user).values('complaint_id'))
+    return rows.filter(user=user)
+
+
+def assignment_scope(rows, user):
+    user_role = role(user)
+    if user_role == 'admin':
+        return rows
+    if user_role == 'contractor':
+        return rows.filter(contractor__user=user)
+    return rows.filter(complaint__user=user)
+
+
+update_scope = assignment_scope
+
+
+def notification_scope(rows, user):
+    return rows.filter(user=user)
+
+
+RESOURCES = {
+    'complaints': Resource(
+        Complaint,
+        fields=[
+            'id', 'title', 'description', 'location', 'complaint_type', 'priority', 'status', 'image',
+            'latitude', 'longitude', 'user_id', 'verified_at', 'duplicate_of_id', 'created_at', 'updated_at',
+        ],
+        default_fields=['id', 'title', 'location', 'complaint_type', 'priority', 'status', 'created_at', 'updated_at'],
+        filters=['status', 'complaint_type', 'priority'],
+        scope=complaint_scope,
+    ),
+    'assignments': Resource(
+        ComplaintAssignment,
+        fields=[
+            'id', 'complaint_id', 'contractor_id', 'assigned_at', 'estimated_completion_date', 'status_update',
+            'work_started_at', 'work_completed_at', 'is_active', 'updated_at',
+        ],
+        default_fields=['id', 'complaint_id', 'contractor_id', 'assigned_at', 'is_active', 'updated_at'],
+        filters=['is_active', 'complaint_id'],
+        scope=assignment_scope,
+        key='assigned_at',
+    ),
+    'updates': Resource(
+        ComplaintUpdate,
+        fields=['id', 'complaint_id', 'contractor_id', 'update_text', 'update_image', 'created_at'],
+        default_fields=['id', 'complaint_id', 'contractor_id', 'update_text', 'created_at'],
+        filters=['complaint_id'],
+        scope=update_scope,
+        # Updates are never edited, so the newest creation time is their version
+        version_field='created_at',
+    ),
+    'notifications': Resource(
+        Notification,
+        fields=['id', 'notification_type', 'title', 'message', 'complaint_id', 'is_read', 'created_at', 'updated_at'],
+        default_fields=['id', 'notification_type', 'title', 'complaint_id', 'is_read', 'created_at'],
+        filters=['is_read', 'notification_type', 'complaint_id'],
+        scope=notification_scope,
+    ),
+}
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def requested_fields(resource, params):
+    """The ``fields`` parameter as a list, or None if it names an unknown field"""
+    if not params.get('fields'):
+        return resource.default_fields
+    fields = [name.strip() for name in params['fields'].split(',') if name.strip()]
+    if not fields or any(name not in resource.fields for name in fields):
+        return None
+    return fields
+
+
+def collection_version(rows, resource, user, params):
+    """``(etag, last_modified)`` of a filtered collection from one aggregate query"""
+    state = rows.aggregate(last_modified=Max(resource.version_field), count=Count('id'))
+    last_modified = state['last_modified']
+    fingerprint = '|'.join([
+        API_VERSION, resource.model._meta.label, str(user.pk), params.urlencode(),
+        last_modified.isoformat() if last_modified else '', str(state['count']),
+    ])
+    return f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()}"', last_modified
+
+
+def collection(request, name):
+    """
+    ``GET /api/v1/<name>/``: one keyset page of a collection as JSON.
+
+    Unchanged collections answer If-None-Match / If-Modified-Since with a 304
+    before any row is read; otherwise rows are serialized straight from
+    ``.values()`` without building model instances.
+    """
+    resource = RESOURCES.get(name)
+    if resource is None:
+        return error(f'Unknown collection {name!r}.', 404)
+    if request.method != 'GET':
+        return error('Only GET is supported.', 405)
+    if not request.user.is_authenticated:
+        return error('Authentication required.', 401)
+    fields = requested_fields(resource, request.GET)
+    if fields is None:
+        return error(f"fields must be a comma-separated subset of: {', '.join(resource.fields)}", 400)
+
+    try:
+        rows = resource.queryset(request.user, request.GET)
+    except ValidationError as exc:
+        return error(' '.join(exc.messages), 400)
+    etag, last_modified = collection_version(rows, resource, request.user, request.GET)
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if not_modified is not None:
+        return finish(not_modified, etag, last_modified_ts)
+
+    # The cursor needs the key and id even when the client did not ask for them
+    selected = list(dict.fromkeys([*fields, resource.key, 'id']))
+    page = paginate_keyset(request, rows.values(*selected), key=resource.key, page_size=DEFAULT_PAGE_SIZE)
+    results = [{name: row[name] for name in fields} for row in page.object_list]
+    response = JsonResponse({
+        'results': results,
+        'next': page.next_querystring or None,
+        'previous': page.previous_querystring or None,
+        'page_size': page.page_size,
+    }, encoder=DjangoJSONEncoder)
+    return finish(response, etag, last_modified_ts)
+
+
+def finish(response, etag, last_modified_ts):
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    # Per-user data: caches may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('complaints/', api.collection, {'name': 'complaints'}, name='api_complaints'),
+    path('assignments/', api.collection, {'name': 'assignments'}, name='api_assignments'),
+    path('updates/', api.collection, {'name': 'updates'}, name='api_updates'),
+    path('notifications/', api.collection, {'name': 'notifications'}, name='api_notifications'),
+]
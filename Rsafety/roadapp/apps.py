@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class RoadappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'roadapp' 
\ No newline at end of file
+    name = 'roadapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
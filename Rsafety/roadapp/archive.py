@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import (
+    ArchivedAssignment, ArchivedComplaint, ArchivedNotification, ArchivedUpdate,
+    Complaint, ComplaintAssignment, ComplaintUpdate, Notification,
+)
+from .purge import PURGE_BATCH_SIZE, Purge, quote
+
+# Complaints nobody works on any more
+ARCHIVE_STATUSES = ['completed', 'rejected']
+DEFAULT_ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = PURGE_BATCH_SIZE
+
+# Live model -> (archive model, column holding the complaint id)
+ARCHIVE_TABLES = [
+    (Complaint, ArchivedComplaint, 'id'),
+    (ComplaintAssignment, ArchivedAssignment, 'complaint_id'),
+    (ComplaintUpdate, ArchivedUpdate, 'complaint_id'),
+    (Notification, ArchivedNotification, 'complaint_id'),
+]
+
+
+def archive_after():
+    return timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS))
+
+
+def archive_candidates(age=None):
+    """Closed complaints untouched for longer than ``age`` (ARCHIVE_AFTER_DAYS by default)"""
+    cutoff = timezone.now() - (archive_after() if age is None else age)
+    return Complaint.objects.filter(status__in=ARCHIVE_STATUSES, updated_at__lt=cutoff)
+
+
+class Archive(Purge):
+    """
+    Move closed complaints, with their assignments, updates and notifications, to the archive tables.
+
+    Each batch copies the rows with one INSERT ... SELECT per table, keeping
+    their ids, then removes them from the live tables through the purge
+    cascade, which also takes them out of the status, unread and workload
+    counters and the search index. Image references move with the rows, so
+    no media blob is released.
+    """
+
+    def process(self, model, ids):
+        # Duplicates follow their original, whose id they keep pointing at
+        ids = ids + list(
+            Complaint.objects.filter(duplicate_of_id__in=ids, status='duplicate')
+            .exclude(id__in=ids).values_list('id', flat=True)
+        )
+        placeholders = ', '.join(['%s'] * len(ids))
+        archived_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        for live, archived, column in ARCHIVE_TABLES:
+            columns = ', '.join(
+                quote(field.column) for field in archived._meta.concrete_fields if field.name != 'archived_at'
+            )
+            self.execute(
+                f'INSERT INTO {quote(archived._meta.db_table)} ({columns}, {quote("archived_at")}) '
+                f'SELECT {columns}, %s FROM {quote(live._meta.db_table)} WHERE {quote(column)} IN ({placeholders})',
+                [archived_at, *ids],
+            )
+        super().process(Complaint, ids)
+
+    def release_images(self):
+        pass
+
+
+def find_complaint(complaint_id, user=None):
+    """
+    ``(complaint, updates, archived)`` for the detail page, live first then archived.
+
+    ``user`` limits the lookup to that reporter's complaints. Returns
+    ``(None, None, False)`` when neither table has it.
+    """
+    complaints = Complaint.objects.for_detail()
+    archived = ArchivedComplaint.objects.select_related('user', 'verified_by')
+    if user is not None:
+        complaints, archived = complaints.filter(user=user), archived.filter(user=user)
+    complaint = complaints.filter(id=complaint_id).first()
+    if complaint is not None:
+        updates = ComplaintUpdate.objects.for_complaint_detail().filter(complaint=complaint)
+        return complaint, updates.order_by('-created_at'), False
+    complaint = archived.filter(id=complaint_id).first()
+    if complaint is None:
+        return None, None, False
+    updates = ArchivedUpdate.objects.select_related('contractor').filter(complaint=complaint)
+    return complaint, updates.order_by('-created_at'), True
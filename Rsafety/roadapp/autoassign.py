@@ -0,0 +1,205 @@
+import heapq
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import fragments, workload
+from .models import Complaint, ComplaintAssignment, Contractor, ContractorWorkload
+from .notifications import notify_planned_assignments
+from .stats import record_status_change
+
+# Complaints are handed out most urgent first, oldest first within a priority
+PRIORITY_ORDER = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+# A specialist is preferred while it has at most this many more active
+# assignments than the least-loaded contractor overall
+SPECIALIST_MARGIN = 10
+# Temporary table the plan is loaded into, so it is written with set-based statements
+PLAN_TABLE = 'auto_assign_plan'
+
+
+def urgency(row):
+    """Sort key of a ``(id, complaint_type, priority, created_at)`` backlog row"""
+    complaint_id, _, priority, created_at = row
+    return PRIORITY_ORDER.get(priority, len(PRIORITY_ORDER)), created_at, complaint_id
+
+
+def specialties(specialization):
+    """Complaint types a contractor's free-text specialization covers"""
+    text = specialization.lower()
+    return {
+        code for code, label in Complaint.COMPLAINT_TYPES
+        if code != 'other' and (code in text or label.lower() in text)
+    }
+
+
+def active_workloads():
+    """``{contractor_id: active assignments}`` from the workload counters"""
+    return dict(ContractorWorkload.objects.values_list('contractor_id', 'active'))
+
+
+class WorkloadHeaps:
+    """
+    Min-heaps of contractors keyed by their current workload.
+
+    Each complaint type has a heap of its specialists, and one more heap holds
+    every contractor for types nobody specializes in. A contractor sits in
+    several heaps, so entries are re-keyed lazily: an entry whose load is out
+    of date is pushed back with the current load when it reaches the top.
+    """
+
+    def __init__(self, contractors, workloads, max_active=None):
+        self.workloads = {contractor_id: workloads.get(contractor_id, 0) for contractor_id in contractors}
+        self.max_active = max_active
+        self.by_type = defaultdict(list)
+        for contractor_id, types in contractors.items():
+            for complaint_type in types:
+                self.by_type[complaint_type].append((self.workloads[contractor_id], contractor_id))
+        self.anyone = [(load, contractor_id) for contractor_id, load in self.workloads.items()]
+        for heap in [*self.by_type.values(), self.anyone]:
+            heapq.heapify(heap)
+
+    def take(self, complaint_type):
+        """The contractor to give a ``complaint_type`` complaint, charged one more assignment, or None"""
+        specialist = self._top(self.by_type.get(complaint_type, []))
+        anyone = self._top(self.anyone)
+        if specialist is not None and (anyone is None or specialist[0] <= anyone[0] + SPECIALIST_MARGIN):
+            choice = specialist
+        else:
+            choice = anyone
+        if choice is None:
+            return None
+        contractor_id = choice[1]
+        # The entry at the top of each heap is now stale and gets re-keyed on the next look
+        self.workloads[contractor_id] += 1
+        return contractor_id
+
+    def _top(self, heap):
+        """``(load, contractor_id)`` of the least-loaded contractor in ``heap`` with room, or None"""
+        while heap:
+            load, contractor_id = heap[0]
+            current = self.workloads[contractor_id]
+            if load != current:
+                heapq.heapreplace(heap, (current, contractor_id))
+            elif self.max_active is not None and current >= self.max_active:
+                heapq.heappop(heap)
+            else:
+                return load, contractor_id
+        return None
+
+
+def plan_assignments(complaints, contractors, workloads, max_active=None):
+    """
+    Match complaints to contractors in one greedy pass; no queries.
+
+    ``complaints`` are ``(id, complaint_type, priority, created_at)`` tuples,
+    ``contractors`` maps contractor id to the set of types it specializes in
+    and ``workloads`` maps contractor id to its active assignments. Each
+    complaint goes to the least-loaded specialist for its type unless that one
+    is more than SPECIALIST_MARGIN busier than the least-loaded contractor
+    overall, who gets it instead. Returns
+    ``{contractor_id: [complaint_id, ...]}``; complaints left over once every
+    contractor reached ``max_active`` are not in it.
+    """
+    heaps = WorkloadHeaps(contractors, workloads, max_active)
+    plan = defaultdict(list)
+    for complaint_id, complaint_type, _, _ in sorted(complaints, key=urgency):
+        contractor_id = heaps.take(complaint_type)
+        if contractor_id is not None:
+            plan[contractor_id].append(complaint_id)
+    return dict(plan)
+
+
+def write_plan(plan, actor):
+    """
+    Assign the complaints of ``plan`` with a handful of set-based statements and return how many changed.
+
+    The ``(complaint_id, contractor_id)`` pairs are loaded into a temporary
+    table; complaints no longer verified are dropped from it, then one
+    INSERT ... SELECT writes the assignments, one UPDATE moves the complaints
+    to assigned and one more INSERT ... SELECT writes the notifications.
+    Nothing is done per row in Python, and since no statement sends signals
+    the status counters, workload counters and dashboard fragments are
+    maintained here, once for the whole plan. Must run in a transaction.
+    """
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    plan_table = quote(PLAN_TABLE)
+    complaints = quote(Complaint._meta.db_table)
+    assignments = quote(ComplaintAssignment._meta.db_table)
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {plan_table}')
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {plan_table} (complaint_id integer PRIMARY KEY, contractor_id integer NOT NULL)'
+        )
+        try:
+            cursor.executemany(
+                f'INSERT INTO {plan_table} (complaint_id, contractor_id) VALUES (%s, %s)',
+                [(complaint_id, contractor_id) for contractor_id, ids in plan.items() for complaint_id in ids],
+            )
+            if connection.features.has_select_for_update:
+                cursor.execute(
+                    f'SELECT id FROM {complaints} WHERE id IN (SELECT complaint_id FROM {plan_table}) FOR UPDATE'
+                )
+            cursor.execute(
+                f'DELETE FROM {plan_table} WHERE complaint_id NOT IN '
+                f'(SELECT id FROM {complaints} WHERE status = %s)',
+                ['verified'],
+            )
+            cursor.execute(
+                f'INSERT INTO {assignments} (complaint_id, contractor_id, assigned_by_id, assigned_at, '
+                f'estimated_completion_date, status_update, is_active, updated_at) '
+                f'SELECT complaint_id, contractor_id, %s, %s, NULL, %s, %s, %s FROM {plan_table}',
+                [actor.pk, adapt(now), '', True, adapt(now)],
+            )
+            cursor.execute(
+                f'UPDATE {complaints} SET status = %s, updated_at = %s '
+                f'WHERE id IN (SELECT complaint_id FROM {plan_table})',
+                ['assigned', adapt(now)],
+            )
+            changed = cursor.rowcount
+            if changed:
+                notify_planned_assignments(PLAN_TABLE, actor)
+                cursor.execute(
+                    f'SELECT DISTINCT c.user_id FROM {plan_table} p JOIN {complaints} c ON c.id = p.complaint_id'
+                )
+                reporter_ids = [user_id for user_id, in cursor.fetchall()]
+        finally:
+            cursor.execute(f'DROP TABLE {plan_table}')
+    if changed:
+        record_status_change('verified', 'assigned', changed)
+        workload.schedule_refresh(plan)
+        fragments.bump(
+            'role:admin',
+            *(f'contractor:{contractor_id}' for contractor_id in plan),
+            *(f'reporter:{user_id}' for user_id in reporter_ids),
+        )
+    return changed
+
+
+def auto_assign(actor, limit=None, max_active=None, dry_run=False):
+    """
+    Assign the verified backlog (its ``limit`` most urgent complaints) and return the plan.
+
+    Reads the backlog, the verified contractors and their workloads with three
+    queries, plans in memory, then writes the whole plan with write_plan in
+    one transaction.
+    """
+    contractors = {
+        contractor_id: specialties(specialization)
+        for contractor_id, specialization in Contractor.objects.filter(is_verified=True).values_list('id', 'specialization')
+    }
+    if not contractors:
+        return {}
+    backlog = list(
+        Complaint.objects.filter(status='verified').values_list('id', 'complaint_type', 'priority', 'created_at')
+    )
+    if limit is not None:
+        backlog = sorted(backlog, key=urgency)[:limit]
+    plan = plan_assignments(backlog, contractors, active_workloads(), max_active)
+    if dry_run or not plan:
+        return plan
+    with transaction.atomic():
+        write_plan(plan, actor)
+    return plan
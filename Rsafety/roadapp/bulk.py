@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import fragments, workload
+from .models import Complaint, ComplaintAssignment
+from .notifications import NotificationBatch
+from .stats import record_status_change
+
+# Ids per statement; keeps the IN lists well under SQLite's bound-variable limit
+BULK_CHUNK_SIZE = 500
+
+# Bulk action -> (status a complaint must have, status it moves to)
+BULK_TRANSITIONS = {
+    'verify': ('pending', 'verified'),
+    'reject': ('pending', 'rejected'),
+    'assign': ('verified', 'assigned'),
+}
+
+
+def chunked(ids, size=BULK_CHUNK_SIZE):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def lock_complaints(ids, status):
+    """The complaints among ``ids`` still in ``status``, locked until the transaction ends"""
+    return list(
+        Complaint.objects.select_for_update().filter(id__in=ids, status=status)
+        .only('id', 'user_id', 'title', 'location', 'status')
+    )
+
+
+def bulk_transition(ids, action, actor, contractor=None, estimated_completion_date=None, status_update=''):
+    """
+    Apply a dashboard bulk action to the complaints ``ids`` and return how many changed.
+
+    Each chunk is one SELECT ... FOR UPDATE of the eligible rows and one
+    ``UPDATE ... WHERE id IN (...) AND status = ...``; ``assign`` also writes
+    the chunk's assignments with one ``bulk_create``. Complaints that are no
+    longer in the expected status are skipped. Everything runs in a single
+    transaction, and since the UPDATEs bypass ``save()`` the status counters,
+    workload counters, notifications and dashboard fragments are maintained here.
+    """
+    old_status, new_status = BULK_TRANSITIONS[action]
+    if action == 'assign' and contractor is None:
+        raise ValueError('Assigning needs a contractor.')
+    now = timezone.now()
+    fields = {'status': new_status, 'updated_at': now}
+    if action == 'verify':
+        fields.update(verified_by=actor, verified_at=now)
+
+    changed = 0
+    reporter_ids = set()
+    with transaction.atomic(), NotificationBatch(actor) as batch:
+        for chunk in chunked(ids):
+            complaints = lock_complaints(chunk, old_status)
+            if not complaints:
+                continue
+            locked_ids = [complaint.pk for complaint in complaints]
+            if action == 'assign':
+                ComplaintAssignment.objects.bulk_create([
+                    ComplaintAssignment(
+                        complaint_id=complaint_id, contractor=contractor, assigned_by=actor,
+                        estimated_completion_date=estimated_completion_date, status_update=status_update,
+                    )
+                    for complaint_id in locked_ids
+                ])
+            changed += Complaint.objects.filter(id__in=locked_ids, status=old_status).update(**fields)
+            for complaint in complaints:
+                complaint.status = new_status
+                batch.add(complaint, contractor_user_id=contractor.user_id if contractor else None)
+                reporter_ids.add(complaint.user_id)
+        if changed:
+            record_status_change(old_status, new_status, changed)
+            scopes = ['role:admin', *(f'reporter:{user_id}' for user_id in reporter_ids)]
+            if contractor is not None:
+                scopes.append(f'contractor:{contractor.pk}')
+                # bulk_create sends no post_save, so recount the contractor here
+                workload.schedule_refresh([contractor.pk])
+            fragments.bump(*scopes)
+    return changed
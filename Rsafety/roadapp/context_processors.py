@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import unread_count
+
+
+def unread_notifications(request):
+    """Navbar badge count, read from the cache only when a template uses it"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notification_count': SimpleLazyObject(lambda: unread_count(user.pk))}
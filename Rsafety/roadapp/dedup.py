@@ -0,0 +1,130 @@
+import heapq
+import re
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .geo import RANGE_END, covering_cells, haversine_m, radius_bbox
+
+# Size of the bottom-k sketch: the signature keeps this many of the smallest shingle hashes
+NUM_PERMUTATIONS = 32
+SHINGLE_SIZE = 4
+# Only this much of a complaint's text is signed, so a very long description
+# costs no more than a long one; duplicates already agree on how they begin
+SIGNATURE_MAX_CHARS = 4000
+# Estimated Jaccard similarity at which a new complaint is linked to an existing one
+DUPLICATE_THRESHOLD = 0.5
+DUPLICATE_RADIUS_M = 150
+# Without coordinates only recent complaints at the same location are compared
+LOCATION_WINDOW = timedelta(days=30)
+MAX_CANDIDATES = 200
+# Statuses whose complaints still represent open work a new report could duplicate.
+# Linked duplicates carry the 'duplicate' status, so they are never candidates themselves.
+OPEN_STATUSES = ['pending', 'verified', 'assigned', 'in_progress']
+
+_MASK_64 = (1 << 64) - 1
+# Odd multiplier of the shingle hash (the 64-bit golden ratio). Fixed, so
+# signatures stored in the database stay comparable across processes.
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def shingles(text):
+    """Overlapping character n-grams of the normalised text"""
+    normalized = ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def text_signature(title, description):
+    """
+    Bottom-k MinHash sketch of a complaint's title and description as a hex string.
+
+    Shingles are at most SHINGLE_SIZE ASCII characters, so their bytes read as
+    an integer are already distinct; a multiply spreads them over 64 bits and the
+    NUM_PERMUTATIONS smallest are kept, top 32 bits each, in ascending order.
+    One hash per shingle and a single ``nsmallest`` keep this to a fraction of
+    a millisecond for a typical description.
+    """
+    text = f'{title} {description}'[:SIGNATURE_MAX_CHARS]
+    hashes = [int.from_bytes(shingle.encode(), 'big') * _HASH_MULTIPLIER & _MASK_64 for shingle in shingles(text)]
+    return ''.join(f'{value >> 32:08x}' for value in heapq.nsmallest(NUM_PERMUTATIONS, hashes))
+
+
+def signature_slots(signature):
+    return {signature[i:i + 8] for i in range(0, len(signature), 8)}
+
+
+def signature_similarity(first, second):
+    """
+    Estimated Jaccard similarity of two sketches.
+
+    The NUM_PERMUTATIONS smallest hashes of the union are a uniform sample of
+    both shingle sets together; the share of them present in both sketches
+    estimates the share of shingles the two texts have in common.
+    """
+    if not first or not second:
+        return 0.0
+    first_slots, second_slots = signature_slots(first), signature_slots(second)
+    union = heapq.nsmallest(NUM_PERMUTATIONS, first_slots | second_slots)
+    return sum(slot in first_slots and slot in second_slots for slot in union) / len(union)
+
+
+def duplicate_candidates(complaint):
+    """Open complaints of the same type near the new one, as ``(id, text_signature)`` pairs"""
+    from .models import Complaint
+
+    if complaint.latitude is not None and complaint.longitude is not None:
+        # Repeat the type in every cell range so each OR branch is a complete
+        # (complaint_type, geohash) index range and no other index looks cheaper.
+        # Closed and duplicate rows pile up in the same cells, so they are filtered
+        # out before the slice rather than after it.
+        neighbourhood = Q()
+        for cell in covering_cells(*radius_bbox(complaint.latitude, complaint.longitude, DUPLICATE_RADIUS_M)):
+            neighbourhood |= Q(
+                complaint_type=complaint.complaint_type, status__in=OPEN_STATUSES,
+                geohash__gte=cell, geohash__lt=cell + RANGE_END,
+            )
+        rows = open_candidates(Complaint.objects.filter(neighbourhood), complaint).values_list(
+            'id', 'text_signature', 'latitude', 'longitude'
+        )[:MAX_CANDIDATES]
+        return [
+            (pk, signature) for pk, signature, lat, lon in rows
+            if haversine_m(complaint.latitude, complaint.longitude, lat, lon) <= DUPLICATE_RADIUS_M
+        ]
+
+    candidates = Complaint.objects.filter(
+        complaint_type=complaint.complaint_type,
+        status__in=OPEN_STATUSES,
+        location__iexact=complaint.location.strip(),
+        created_at__gte=timezone.now() - LOCATION_WINDOW,
+    )
+    return list(open_candidates(candidates, complaint).values_list('id', 'text_signature')[:MAX_CANDIDATES])
+
+
+def open_candidates(candidates, complaint):
+    """Newest first, without ``complaint`` itself or rows that have no signature to compare"""
+    candidates = candidates.exclude(text_signature='')
+    if complaint.pk:
+        candidates = candidates.exclude(pk=complaint.pk)
+    return candidates.order_by('-created_at')
+
+
+def find_duplicate(complaint):
+    """
+    Return the existing complaint this one most likely duplicates, or None.
+
+    Also fills in ``complaint.text_signature``, which saving it then reuses.
+    """
+    from .models import Complaint
+
+    complaint.refresh_text_signature()
+    best_id, best_score = None, DUPLICATE_THRESHOLD
+    for candidate_id, signature in duplicate_candidates(complaint):
+        score = signature_similarity(complaint.text_signature, signature)
+        if score >= best_score:
+            best_id, best_score = candidate_id, score
+    if best_id is None:
+        return None
+    return Complaint.objects.filter(pk=best_id).first()
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Complaint, Notification
+from .pagination import decode_cursor, encode_cursor
+
+# Events buffered per connection before new ones are dropped; the database
+# poll still delivers every notification, so only the wake-up is lost.
+SUBSCRIBER_QUEUE_SIZE = 100
+# How often a stream re-reads the notifications table when nothing woke it.
+# Catches rows written by other processes, which the in-process broker never sees.
+POLL_INTERVAL = 30
+STREAM_BATCH_SIZE = 50
+# Streams end after this long and the browser reconnects from its last event id,
+# so a connection whose client vanished without a clean close cannot linger forever.
+MAX_STREAM_SECONDS = 600
+# Reconnect delay the browser is told to use, in milliseconds
+RETRY_MS = 5000
+# Event id of a stream that started before the user had any notifications:
+# resuming from it sends every notification, so none written in between is lost.
+START_EVENT_ID = 'start'
+STATUS_LABELS = dict(Complaint.STATUS_CHOICES)
+
+
+class Subscription:
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Runs on the subscriber's event loop"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+class Broker:
+    """
+    In-process pub/sub between request threads and the SSE streams of one worker.
+
+    Publishing is thread-safe and never blocks: events are handed to each
+    subscriber's event loop with ``call_soon_threadsafe``. Events only wake
+    a stream early; what it sends is always read from the database.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The loop has shut down; the stream is gone
+                self.unsubscribe(subscription)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = Broker()
+
+
+def publish_after_commit(user_id, event):
+    transaction.on_commit(lambda: broker.publish(user_id, event))
+
+
+def notifications_published(user_ids):
+    """Wake the streams of users who just received notifications"""
+    for user_id in set(user_ids):
+        publish_after_commit(user_id, {'type': 'notification'})
+
+
+def high_water_mark(user_id, last_event_id=None):
+    """
+    ``(created_at, id)`` after which a stream starts sending notifications.
+
+    A reconnecting browser resumes from its Last-Event-ID; a new stream
+    starts after the user's newest notification rather than replaying history.
+    None means before every notification.
+    """
+    if last_event_id == START_EVENT_ID:
+        return None
+    if last_event_id:
+        mark = decode_cursor(last_event_id)
+        if mark is not None:
+            return mark
+    return (
+        Notification.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+        .values_list('created_at', 'id').first()
+    )
+
+
+def event_id(mark):
+    """SSE id of a high-water mark, including the mark before every notification"""
+    return encode_cursor(*mark) if mark is not None else START_EVENT_ID
+
+
+def notifications_after(user_id, mark, limit=STREAM_BATCH_SIZE):
+    """Notifications newer than ``mark``, oldest first, read through the (user, created_at, id) index"""
+    rows = Notification.objects.filter(user_id=user_id)
+    if mark is not None:
+        created_at, pk = mark
+        rows = rows.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    return list(
+        rows.order_by('created_at', 'id')
+        .values(
+            'id', 'notification_type', 'title', 'message', 'complaint_id', 'complaint__status', 'created_at',
+        )[:limit]
+    )
+
+
+def format_event(event_type, data, event_id=None):
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def notification_events(rows):
+    """
+    SSE messages for notification rows plus the mark after the last one.
+
+    Every status change notifies the complaint's reporter, so status events
+    come from the same rows: the first notification naming a complaint is
+    preceded by a ``status`` event with the complaint's current status.
+    Until that notification's id is acknowledged a reconnect replays both,
+    so no status change is lost, whichever process made it.
+    """
+    messages = []
+    mark = None
+    seen = set()
+    for row in rows:
+        status = row.pop('complaint__status')
+        mark = (row['created_at'], row['id'])
+        if status and row['complaint_id'] not in seen:
+            seen.add(row['complaint_id'])
+            messages.append(format_event('status', {
+                'type': 'status', 'complaint': row['complaint_id'], 'status': status, 'label': STATUS_LABELS[status],
+            }))
+        messages.append(format_event('notification', row, encode_cursor(*mark)))
+    return messages, mark
+
+
+async def stream_events(user_id, mark):
+    """
+    Async generator behind the SSE response.
+
+    The database is the source of truth for notifications and status
+    changes: a broker wake-up or the poll timeout both lead to one read from
+    the high-water mark, so nothing is sent twice or skipped.
+    """
+    subscription = broker.subscribe(user_id)
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        yield format_event('ready', {}, event_id(mark))
+        while time.monotonic() < deadline:
+            rows = await sync_to_async(notifications_after, thread_sensitive=False)(user_id, mark)
+            events, new_mark = notification_events(rows)
+            for event in events:
+                yield event
+            mark = new_mark or mark
+            if len(rows) == STREAM_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(subscription.queue.get(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
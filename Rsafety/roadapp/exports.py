@@ -0,0 +1,178 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import (
+    ArchivedAssignment, ArchivedComplaint, ArchivedUpdate, Complaint, ComplaintAssignment, ComplaintUpdate,
+)
+
+# Rows fetched per round trip; the cursor never holds more than this in memory
+EXPORT_CHUNK_SIZE = 2000
+# Output is handed on in pieces of roughly this many bytes
+EXPORT_BUFFER_SIZE = 64 * 1024
+EXPORT_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+class Export:
+    """
+    One exportable table: its columns and how the common filters map onto it.
+
+    ``status_field`` and ``type_field`` point at the complaint's status and
+    type, through the relation for assignments and updates.
+    """
+
+    def __init__(self, model, columns, date_field, status_field, type_field):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.status_field = status_field
+        self.type_field = type_field
+
+    def queryset(self, params):
+        """Rows matching ``status``, ``type``, ``from`` and ``to``; raises ValidationError on bad values"""
+        rows = self.model.objects.all()
+        status = params.get('status')
+        if status:
+            if status not in dict(Complaint.STATUS_CHOICES):
+                raise ValidationError(f'Unknown status {status!r}.')
+            rows = rows.filter(**{self.status_field: status})
+        complaint_type = params.get('type')
+        if complaint_type:
+            if complaint_type not in dict(Complaint.COMPLAINT_TYPES):
+                raise ValidationError(f'Unknown complaint type {complaint_type!r}.')
+            rows = rows.filter(**{self.type_field: complaint_type})
+        # Whole days in the current time zone; "to" is inclusive
+        start, end = export_date(params, 'from'), export_date(params, 'to')
+        if start:
+            rows = rows.filter(**{f'{self.date_field}__gte': start_of_day(start)})
+        if end:
+            rows = rows.filter(**{f'{self.date_field}__lt': start_of_day(end + timedelta(days=1))})
+        return rows.order_by('id')
+
+    def rows(self, params, chunk_size=EXPORT_CHUNK_SIZE):
+        """Tuples in column order, streamed from the database ``chunk_size`` at a time"""
+        return self.queryset(params).values_list(*self.columns).iterator(chunk_size=chunk_size)
+
+
+COMPLAINT_COLUMNS = [
+    'id', 'title', 'description', 'location', 'complaint_type', 'priority', 'status', 'latitude',
+    'longitude', 'user_id', 'verified_at', 'duplicate_of_id', 'created_at', 'updated_at',
+]
+ASSIGNMENT_COLUMNS = [
+    'id', 'complaint_id', 'contractor_id', 'assigned_by_id', 'assigned_at', 'estimated_completion_date',
+    'status_update', 'work_started_at', 'work_completed_at', 'is_active', 'updated_at',
+]
+UPDATE_COLUMNS = ['id', 'complaint_id', 'contractor_id', 'update_text', 'update_image', 'created_at']
+
+EXPORTS = {
+    'complaints': Export(
+        Complaint, columns=COMPLAINT_COLUMNS,
+        date_field='created_at', status_field='status', type_field='complaint_type',
+    ),
+    'assignments': Export(
+        ComplaintAssignment, columns=ASSIGNMENT_COLUMNS,
+        date_field='assigned_at', status_field='complaint__status', type_field='complaint__complaint_type',
+    ),
+    'updates': Export(
+        ComplaintUpdate, columns=UPDATE_COLUMNS,
+        date_field='created_at', status_field='complaint__status', type_field='complaint__complaint_type',
+    ),
+    # Closed complaints moved out of the live tables by roadapp.archive
+    'archived_complaints': Export(
+        ArchivedComplaint, columns=[*COMPLAINT_COLUMNS, 'archived_at'],
+        date_field='created_at', status_field='status', type_field='complaint_type',
+    ),
+    'archived_assignments': Export(
+        ArchivedAssignment, columns=[*ASSIGNMENT_COLUMNS, 'archived_at'],
+        date_field='assigned_at', status_field='complaint__status', type_field='complaint__complaint_type',
+    ),
+    'archived_updates': Export(
+        ArchivedUpdate, columns=[*UPDATE_COLUMNS, 'archived_at'],
+        date_field='created_at', status_field='complaint__status', type_field='complaint__complaint_type',
+    ),
+}
+
+
+def export_date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValidationError(f'{name} must be a date like 2025-01-31.')
+    return parsed
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def buffered(lines, size=EXPORT_BUFFER_SIZE):
+    """Join lines into byte chunks of about ``size`` so each write is worth a syscall"""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    """Gzip a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(name, params, export_format='csv', compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Byte chunks of one export.
+
+    Validation happens up front, so a bad filter raises ValidationError here
+    rather than halfway through a response. After that memory stays flat:
+    rows come off a chunked cursor and are formatted, buffered and optionally
+    compressed one piece at a time.
+    """
+    export = EXPORTS[name]
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    rows = export.rows(params, chunk_size)
+    lines = csv_lines(export.columns, rows) if export_format == 'csv' else jsonl_lines(export.columns, rows)
+    chunks = buffered(lines)
+    return gzipped(chunks) if compress else chunks
+
+
+def export_filename(name, export_format, compress):
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+    return f"{name}-{stamp}.{export_format}{'.gz' if compress else ''}"
@@ -1,7 +1,18 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.template.defaultfilters import filesizeformat
 from .models import Complaint, Contractor, ComplaintUpdate, ComplaintAssignment
+from .uploads import max_upload_size
+
+class UploadImageField(forms.ImageField):
+    """ImageField that rejects files HashingUploadHandler stopped storing, before Pillow opens them"""
+    def to_python(self, data):
+        if getattr(data, 'oversized', False) or (data and getattr(data, 'size', 0) > max_upload_size()):
+            raise forms.ValidationError(
+                f'The image is larger than {filesizeformat(max_upload_size())}.', code='file_too_large'
+            )
+        return super().to_python(data)
 
 class UserRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -28,7 +39,8 @@ class ContractorRegistrationForm(UserCreationForm):
 class ComplaintForm(forms.ModelForm):
     class Meta:
         model = Complaint
-        fields = ['title', 'description', 'location', 'complaint_type', 'priority', 'image']
+        fields = ['title', 'description', 'location', 'complaint_type', 'priority', 'image', 'latitude', 'longitude']
+        field_classes = {'image': UploadImageField}
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
@@ -36,17 +48,25 @@ class ComplaintForm(forms.ModelForm):
             'complaint_type': forms.Select(attrs={'class': 'form-control'}),
             'priority': forms.Select(attrs={'class': 'form-control'}),
             'image': forms.FileInput(attrs={'class': 'form-control'}),
+            # Filled in from the browser's geolocation when the reporter allows it
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
         }
 
 class ComplaintUpdateForm(forms.ModelForm):
     class Meta:
         model = ComplaintUpdate
         fields = ['update_text', 'update_image']
+        field_classes = {'update_image': UploadImageField}
         widgets = {
             'update_text': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'update_image': forms.FileInput(attrs={'class': 'form-control'}),
         }
 
+def contractor_choice_label(contractor):
+    workload = getattr(contractor, 'workload', None)
+    return f"{contractor} ({workload.active if workload else 0} active)"
+
 class ComplaintAssignmentForm(forms.ModelForm):
     class Meta:
         model = ComplaintAssignment
@@ -55,4 +75,10 @@ class ComplaintAssignmentForm(forms.ModelForm):
             'contractor': forms.Select(attrs={'class': 'form-control'}),
             'estimated_completion_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'status_update': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
-        } 
\ No newline at end of file
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Contractor.__str__ reads the user, so load it (and the workload shown next to it) with the choices
+        self.fields['contractor'].queryset = Contractor.objects.select_related('user', 'workload')
+        self.fields['contractor'].label_from_instance = contractor_choice_label 
\ No newline at end of file
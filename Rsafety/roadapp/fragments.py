@@ -0,0 +1,97 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'fragments:version:{}'
+STATS_KEY = 'fragments:stats:{}:{}'
+DEFAULT_TIMEOUT = 300
+# Fragments whose hit/miss counters fragment_stats() reports
+FRAGMENT_NAMES = [
+    'admin_complaints', 'admin_contractors', 'admin_bulk_contractors',
+    'contractor_stats', 'contractor_assignments', 'contractor_recent',
+    'user_stats', 'user_complaints',
+]
+
+
+def timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def admin_scopes():
+    return ['role:admin']
+
+
+def contractor_scopes(contractor_id):
+    return ['role:contractor', f'contractor:{contractor_id}']
+
+
+def reporter_scopes(user_id):
+    return ['role:reporter', f'reporter:{user_id}']
+
+
+def versions(scopes):
+    """
+    Current version of each scope.
+
+    A scope missing from the cache (never bumped, or evicted) starts from the
+    current time in milliseconds, so it never reuses a number an older
+    fragment was stored under.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, int(time.time() * 1000), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def fragment_key(name, scopes, vary_on=()):
+    """
+    Cache key of one rendering of fragment ``name``.
+
+    Scope names go into the key next to their versions: two users' scopes may
+    well sit at the same version number.
+    """
+    parts = [f'{scope}={version}' for scope, version in zip(scopes, versions(scopes))]
+    parts.extend(str(value) for value in vary_on)
+    return f"fragment:{name}:{hashlib.md5('|'.join(parts).encode()).hexdigest()}"
+
+
+def bump(*scopes):
+    """Invalidate every fragment cached under ``scopes`` once the transaction commits"""
+    def apply():
+        for scope in set(scopes):
+            key = VERSION_KEY.format(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, int(time.time() * 1000), None)
+    transaction.on_commit(apply)
+
+
+def record(name, hit):
+    key = STATS_KEY.format(name, 'hits' if hit else 'misses')
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def fragment_stats():
+    """``{name: {'hits': n, 'misses': n, 'hit_rate': r}}`` as recorded in the cache"""
+    keys = [STATS_KEY.format(name, kind) for name in FRAGMENT_NAMES for kind in ('hits', 'misses')]
+    found = cache.get_many(keys)
+    stats = {}
+    for name in FRAGMENT_NAMES:
+        hits = found.get(STATS_KEY.format(name, 'hits'), 0)
+        misses = found.get(STATS_KEY.format(name, 'misses'), 0)
+        stats[name] = {
+            'hits': hits, 'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
@@ -0,0 +1,83 @@
+import math
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+# Most geohash prefix ranges one bounding-box query will OR together
+MAX_COVERING_CELLS = 32
+# Sorts after every geohash character, so prefix + RANGE_END bounds a prefix range
+RANGE_END = '~'
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        interval, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(lat_degrees, lon_degrees) covered by one geohash cell"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def covering_cells(south, west, north, east, max_cells=MAX_COVERING_CELLS):
+    """
+    Geohash prefixes that together cover the bounding box.
+
+    Picks the longest prefix length that needs at most ``max_cells`` cells,
+    so small viewports get tight cells and large ones a few coarse ones.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = math.floor(north / lat_step) - math.floor(south / lat_step) + 1
+        cols = math.floor(east / lon_step) - math.floor(west / lon_step) + 1
+        if rows * cols <= max_cells:
+            break
+    cells = set()
+    for row in range(rows):
+        lat = min((math.floor(south / lat_step) + row + 0.5) * lat_step, 90.0)
+        for col in range(cols):
+            lon = min((math.floor(west / lon_step) + col + 0.5) * lon_step, 180.0)
+            cells.add(encode_geohash(lat, lon, precision))
+    return sorted(cells)
+
+
+def radius_bbox(latitude, longitude, radius_m):
+    """(south, west, north, east) of the box enclosing a circle"""
+    latitude, longitude = float(latitude), float(longitude)
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    return (
+        max(latitude - dlat, -90.0), max(longitude - dlon, -180.0),
+        min(latitude + dlat, 90.0), min(longitude + dlon, 180.0),
+    )
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, map(float, (lat1, lon1, lat2, lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
@@ -0,0 +1,311 @@
+import csv
+import json
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import fragments, search, workload
+from .dedup import text_signature
+from .geo import encode_geohash
+from .models import Complaint, ComplaintAssignment, Contractor, ImportCheckpoint
+from .stats import record_status_change
+
+# Rows validated by one worker task and written in one transaction
+IMPORT_CHUNK_SIZE = 5000
+# Statuses under which a row may name the contractor it was assigned to
+ASSIGNED_STATUSES = {'assigned', 'in_progress', 'completed'}
+COMPLAINT_TYPES = [code for code, _ in Complaint.COMPLAINT_TYPES]
+PRIORITIES = [code for code, _ in Complaint.PRIORITY_CHOICES]
+STATUSES = [code for code, _ in Complaint.STATUS_CHOICES]
+# auto_now/auto_now_add fields whose values come from the file
+COMPLAINT_TIMESTAMPS = ['created_at', 'updated_at']
+ASSIGNMENT_TIMESTAMPS = ['assigned_at', 'updated_at']
+# Rows per UPDATE when the file's timestamps are written back
+TIMESTAMP_BATCH_SIZE = 2000
+
+
+class RowError(ValueError):
+    pass
+
+
+class MissingActor(Exception):
+    """A chunk has assignments to write but no staff user to record as their assigned_by"""
+
+
+def read_rows(path, start=0):
+    """``(row_number, dict)`` for each data row of a CSV or JSON-lines file after the first ``start``"""
+    with open(path, newline='', encoding='utf-8') as source:
+        if path.endswith(('.jsonl', '.ndjson')):
+            rows = (json.loads(line) for line in source if line.strip())
+        else:
+            rows = csv.DictReader(source)
+        for number, row in enumerate(rows, 1):
+            if number > start:
+                yield number, row
+
+
+def chunks(rows, size=IMPORT_CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def text(row, name, max_length, required=False):
+    value = str(row.get(name) or '').strip()
+    if required and not value:
+        raise RowError(f'{name} is required')
+    if len(value) > max_length:
+        raise RowError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+def choice(row, name, choices, default):
+    value = str(row.get(name) or '').strip() or default
+    if value not in choices:
+        raise RowError(f'{name} {value!r} is not one of {", ".join(choices)}')
+    return value
+
+
+def coordinate(row, name, limit):
+    value = row.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = Decimal(str(value)).quantize(Decimal('0.000001'))
+    except InvalidOperation:
+        raise RowError(f'{name} {value!r} is not a number')
+    if not -limit <= value <= limit:
+        raise RowError(f'{name} {value} is out of range')
+    return value
+
+
+def moment(row, name):
+    value = row.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        day = parse_date(str(value))
+        if day is None:
+            raise RowError(f'{name} {value!r} is not a date')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+def day(row, name):
+    value = row.get(name)
+    if not value:
+        return None
+    parsed = parse_date(str(value)[:10])
+    if parsed is None:
+        raise RowError(f'{name} {value!r} is not a date')
+    return parsed
+
+
+def validate_row(row):
+    """
+    Clean one input row into the values of a Complaint (and maybe an assignment).
+
+    Pure Python with no database access, so it runs in the worker processes;
+    this is also where the CPU-heavy geohash and MinHash signature are made.
+    """
+    cleaned = {
+        'title': text(row, 'title', 200, required=True),
+        'description': text(row, 'description', 100000, required=True),
+        'location': text(row, 'location', 255, required=True),
+        'reporter': text(row, 'reporter', 150, required=True),
+        'reporter_email': text(row, 'reporter_email', 254),
+        'complaint_type': choice(row, 'complaint_type', COMPLAINT_TYPES, 'other'),
+        'priority': choice(row, 'priority', PRIORITIES, 'medium'),
+        'status': choice(row, 'status', STATUSES, 'pending'),
+        'latitude': coordinate(row, 'latitude', 90),
+        'longitude': coordinate(row, 'longitude', 180),
+        'created_at': moment(row, 'created_at'),
+        'contractor': text(row, 'contractor', 150),
+        'assigned_at': moment(row, 'assigned_at'),
+        'estimated_completion_date': day(row, 'estimated_completion_date'),
+    }
+    if (cleaned['latitude'] is None) != (cleaned['longitude'] is None):
+        raise RowError('latitude and longitude must be given together')
+    if cleaned['contractor'] and cleaned['status'] not in ASSIGNED_STATUSES:
+        raise RowError(f"a contractor is only allowed for {', '.join(sorted(ASSIGNED_STATUSES))} complaints")
+    cleaned['geohash'] = (
+        encode_geohash(cleaned['latitude'], cleaned['longitude']) if cleaned['latitude'] is not None else ''
+    )
+    cleaned['text_signature'] = text_signature(cleaned['title'], cleaned['description'])
+    return cleaned
+
+
+def validate_chunk(chunk):
+    """``(row_number, cleaned, error)`` for every row of a chunk; runs in a worker process"""
+    results = []
+    for number, row in chunk:
+        try:
+            results.append((number, validate_row(row), None))
+        except RowError as exc:
+            results.append((number, None, str(exc)))
+    return results
+
+
+def validated_chunks(rows, workers, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validate chunks in a process pool while the caller writes earlier ones.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    however large the file is. ``workers=0`` validates in this process.
+    """
+    if not workers:
+        for chunk in chunks(rows, chunk_size):
+            yield validate_chunk(chunk)
+        return
+    # Forked workers must not share this process's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks(rows, chunk_size):
+            pending.append(pool.submit(validate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class Lookups:
+    """Reporter and contractor ids by username, filled with one query per chunk of unseen names"""
+
+    def __init__(self):
+        self.users = {}
+        self.contractors = {}
+
+    def resolve(self, rows):
+        usernames = {row['reporter'] for row in rows} - self.users.keys()
+        if usernames:
+            self.users.update(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+            missing = {}
+            for row in rows:
+                if row['reporter'] in usernames and row['reporter'] not in self.users:
+                    missing.setdefault(row['reporter'], row['reporter_email'])
+            if missing:
+                # Historical reporters get accounts without a usable password
+                created = User.objects.bulk_create(
+                    [User(username=username, email=email, password='!') for username, email in missing.items()]
+                )
+                search.index_user_emails(created)
+                self.users.update((user.username, user.pk) for user in created)
+        names = {row['contractor'] for row in rows if row['contractor']} - self.contractors.keys()
+        if names:
+            found = dict(Contractor.objects.filter(user__username__in=names).values_list('user__username', 'id'))
+            self.contractors.update((name, found.get(name)) for name in names)
+
+
+def stamped(objects, fields):
+    """The ``fields`` values of each object, taken before bulk_create overwrites them"""
+    return [[getattr(obj, field) for field in fields] for obj in objects]
+
+
+def restore_timestamps(objects, fields, values):
+    """
+    Write the timestamps read from the file back over the import time.
+
+    bulk_create lets auto_now/auto_now_add stamp every row with the time of
+    the import, so the file's values go back with one UPDATE ... FROM VALUES
+    per batch, joined on the primary key.
+    """
+    if not objects:
+        return
+    model = type(objects[0])
+    connection = connections[model.objects.db]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(model._meta.get_field(field).column) for field in fields]
+    assignments = ', '.join(f'{column} = v.column{i}' for i, column in enumerate(columns, 2))
+    row_sql = '(' + ', '.join(['%s'] * (len(fields) + 1)) + ')'
+    with connection.cursor() as cursor:
+        for start in range(0, len(objects), TIMESTAMP_BATCH_SIZE):
+            stop = start + TIMESTAMP_BATCH_SIZE
+            params = []
+            for obj, row in zip(objects[start:stop], values[start:stop]):
+                params.append(obj.pk)
+                params.extend(connection.ops.adapt_datetimefield_value(value) for value in row)
+            rows_sql = ', '.join([row_sql] * len(objects[start:stop]))
+            cursor.execute(
+                f'UPDATE {table} SET {assignments} FROM (VALUES {rows_sql}) AS v '
+                f'WHERE {table}.{quote(model._meta.pk.column)} = v.column1',
+                params,
+            )
+    for obj, row in zip(objects, values):
+        for field, value in zip(fields, row):
+            setattr(obj, field, value)
+
+
+@transaction.atomic
+def write_chunk(rows, lookups, actor):
+    """
+    Insert one chunk of cleaned rows in one transaction and return the errors.
+
+    ``actor`` may be None as long as no row of the chunk names a contractor;
+    otherwise MissingActor is raised before anything is written.
+
+    bulk_create sends no signals, so the status counters, search index,
+    workload counters and dashboard fragments are brought up to date here.
+    """
+    lookups.resolve([row for _, row, _ in rows])
+    now = timezone.now()
+    complaints, assignments, errors = [], [], []
+    for number, row, _ in rows:
+        contractor_id = lookups.contractors.get(row['contractor']) if row['contractor'] else None
+        if row['contractor'] and contractor_id is None:
+            errors.append((number, f"unknown contractor {row['contractor']!r}"))
+            continue
+        created_at = row['created_at'] or now
+        complaints.append(Complaint(
+            user_id=lookups.users[row['reporter']], title=row['title'], description=row['description'],
+            location=row['location'], complaint_type=row['complaint_type'], priority=row['priority'],
+            status=row['status'], latitude=row['latitude'], longitude=row['longitude'], geohash=row['geohash'],
+            text_signature=row['text_signature'], created_at=created_at, updated_at=created_at,
+        ))
+        assignments.append((number, contractor_id, row))
+
+    if actor is None:
+        named = next((number for number, contractor_id, _ in assignments if contractor_id), None)
+        if named is not None:
+            raise MissingActor(f'Row {named} names a contractor, but there is no staff user to record as assigned_by.')
+
+    complaint_times = stamped(complaints, COMPLAINT_TIMESTAMPS)
+    Complaint.objects.bulk_create(complaints)
+    restore_timestamps(complaints, COMPLAINT_TIMESTAMPS, complaint_times)
+    links = [
+        ComplaintAssignment(
+            complaint_id=complaint.pk, contractor_id=contractor_id, assigned_by=actor,
+            assigned_at=row['assigned_at'] or complaint.created_at, updated_at=complaint.created_at,
+            estimated_completion_date=row['estimated_completion_date'],
+        )
+        for complaint, (_, contractor_id, row) in zip(complaints, assignments) if contractor_id
+    ]
+    link_times = stamped(links, ASSIGNMENT_TIMESTAMPS)
+    ComplaintAssignment.objects.bulk_create(links)
+    restore_timestamps(links, ASSIGNMENT_TIMESTAMPS, link_times)
+    for status, count in Counter(complaint.status for complaint in complaints).items():
+        record_status_change(None, status, count)
+    search.index_complaints(complaint.pk for complaint in complaints)
+    workload.schedule_refresh(link.contractor_id for link in links)
+    fragments.bump('role:admin', 'role:reporter', 'role:contractor')
+    return len(complaints), errors
+
+
+def load_checkpoint(source):
+    """The checkpoint an earlier import of ``source`` left, or a new unsaved one"""
+    return ImportCheckpoint.objects.filter(source=source).first() or ImportCheckpoint(source=source)
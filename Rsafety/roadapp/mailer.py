@@ -0,0 +1,109 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+SEND_BATCH_SIZE = 50
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+# A claimed batch that is neither sent nor rescheduled by then is picked up again
+LEASE_DURATION = timedelta(minutes=10)
+
+
+def enqueue_mail(subject, body, to, from_email=None):
+    """Put one message in the outbox; the send_queued_mail worker delivers it"""
+    if isinstance(to, str):
+        to = [to]
+    return OutboundEmail.objects.create(
+        subject=subject, body=body, to=list(to), from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the ``attempts``-th failure"""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def claim_batch(batch_size=SEND_BATCH_SIZE):
+    """
+    Lease up to ``batch_size`` due messages to this worker.
+
+    The conditional UPDATE stamps a fresh lease on rows nobody else holds,
+    then the rows carrying that lease are read back, so two workers polling
+    at once never get the same message.
+    """
+    now = timezone.now()
+    lease = uuid.uuid4().hex
+    due = OutboundEmail.objects.filter(status='queued', next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    due.filter(id__in=ids).update(lease=lease, next_attempt_at=now + LEASE_DURATION)
+    return list(OutboundEmail.objects.filter(lease=lease).order_by('id'))
+
+
+def send_batch(batch_size=SEND_BATCH_SIZE, connection=None):
+    """
+    Deliver one batch over a single connection and return ``(sent, failed)``.
+
+    The connection is opened once and reused for every message; each message
+    still goes through its own ``send_messages`` call so one bad recipient
+    only reschedules that message.
+    """
+    outbox = claim_batch(batch_size)
+    if not outbox:
+        return 0, 0
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        for email in outbox:
+            record_failure(email, exc)
+        return 0, len(outbox)
+    sent = failed = 0
+    try:
+        for email in outbox:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email or None, email.to, connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as exc:
+                failed += 1
+                record_failure(email, exc)
+            else:
+                sent += 1
+                OutboundEmail.objects.filter(pk=email.pk).update(status='sent', sent_at=timezone.now(), lease='')
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def record_failure(email, exc):
+    attempts = email.attempts + 1
+    logger.warning('Sending email %s failed (attempt %s): %s', email.pk, attempts, exc)
+    fields = {'attempts': attempts, 'last_error': f'{type(exc).__name__}: {exc}', 'lease': ''}
+    if attempts >= MAX_ATTEMPTS:
+        fields['status'] = 'failed'
+    else:
+        fields['next_attempt_at'] = timezone.now() + retry_delay(attempts)
+    OutboundEmail.objects.filter(pk=email.pk).update(**fields)
+
+
+def send_queued(batch_size=SEND_BATCH_SIZE):
+    """Drain every message that is currently due, one pooled connection per batch"""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = send_batch(batch_size)
+        if not sent and not failed:
+            return total_sent, total_failed
+        total_sent += sent
+        total_failed += failed
@@ -0,0 +1,39 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from roadapp.archive import ARCHIVE_BATCH_SIZE, Archive, archive_after, archive_candidates
+
+
+class Command(BaseCommand):
+    help = (
+        'Move completed and rejected complaints older than ARCHIVE_AFTER_DAYS, with their assignments, '
+        'updates and notifications, into the archive tables in batches. Run nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help=f'Archive complaints closed more than this many days ago (default {archive_after().days})',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Complaints per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Roll every batch back and only report counts')
+
+    def handle(self, *args, **options):
+        age = timedelta(days=options['days']) if options['days'] is not None else None
+        archive = Archive(dry_run=options['dry_run'])
+        total = Counter()
+        started = time.monotonic()
+        for batch, moved in enumerate(archive.run(archive_candidates(age), options['batch_size']), 1):
+            total.update(moved)
+            summary = ', '.join(f'{label} {count:,}' for label, count in sorted(moved.items()))
+            self.stdout.write(f'batch {batch:>6}  {summary}')
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {total['roadapp.Complaint']:,} complaint(s), {total['roadapp.ComplaintAssignment']:,} "
+            f"assignment(s), {total['roadapp.ComplaintUpdate']:,} update(s) and "
+            f"{total['roadapp.Notification']:,} notification(s) in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from roadapp.autoassign import auto_assign
+from roadapp.models import Contractor
+
+
+class Command(BaseCommand):
+    help = (
+        'Assign verified complaints to verified contractors by specialization, '
+        'balancing active workload, most urgent complaints first'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Assign at most this many complaints')
+        parser.add_argument('--max-active', type=int, help='Do not give a contractor more active assignments than this')
+        parser.add_argument('--actor', help='Username recorded as assigned_by (default: the first superuser)')
+        parser.add_argument('--dry-run', action='store_true', help='Print the plan without assigning anything')
+
+    def handle(self, *args, **options):
+        if options['actor']:
+            actor = User.objects.filter(username=options['actor'], is_staff=True).first()
+        else:
+            actor = User.objects.filter(is_superuser=True).order_by('id').first()
+        if actor is None:
+            raise CommandError('No staff user to record as assigned_by; pass --actor.')
+
+        plan = auto_assign(actor, options['limit'], options['max_active'], options['dry_run'])
+        if not plan:
+            self.stdout.write('Nothing to assign.')
+            return
+        names = dict(Contractor.objects.filter(pk__in=plan).values_list('id', 'company_name'))
+        for contractor_id, complaint_ids in sorted(plan.items(), key=lambda item: -len(item[1])):
+            self.stdout.write(f'{names.get(contractor_id, contractor_id):<40}{len(complaint_ids):>8}')
+        total = sum(len(complaint_ids) for complaint_ids in plan.values())
+        verb = 'Would assign' if options['dry_run'] else 'Assigned'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {total} complaint(s) to {len(plan)} contractor(s).'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from roadapp.geo import encode_geohash
+from roadapp.models import Complaint
+
+
+class Command(BaseCommand):
+    help = 'Fill in Complaint.geohash for rows saved before it existed or whose coordinates were bulk-updated'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--all', action='store_true', help='Recompute every row, not only those missing a geohash')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        complaints = Complaint.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        if not options['all']:
+            complaints = complaints.filter(geohash='')
+
+        last_id = 0
+        updated = 0
+        while True:
+            rows = list(
+                complaints.filter(id__gt=last_id).order_by('id').values_list('id', 'latitude', 'longitude')[:batch_size]
+            )
+            if not rows:
+                break
+            batch = [Complaint(id=pk, geohash=encode_geohash(lat, lon)) for pk, lat, lon in rows]
+            with transaction.atomic():
+                Complaint.objects.bulk_update(batch, ['geohash'])
+            last_id = rows[-1][0]
+            updated += len(batch)
+            self.stdout.write(f'{updated} complaint(s) updated...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled geohash for {updated} complaint(s).'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from roadapp.dedup import text_signature
+from roadapp.models import Complaint
+
+
+class Command(BaseCommand):
+    help = 'Compute the MinHash text signature used for duplicate detection on complaints that lack one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        complaints = Complaint.objects.filter(text_signature='')
+        last_id = 0
+        updated = 0
+        while True:
+            rows = list(
+                complaints.filter(id__gt=last_id).order_by('id').values_list('id', 'title', 'description')[:batch_size]
+            )
+            if not rows:
+                break
+            batch = [Complaint(id=pk, text_signature=text_signature(title, description)) for pk, title, description in rows]
+            with transaction.atomic():
+                Complaint.objects.bulk_update(batch, ['text_signature'])
+            last_id = rows[-1][0]
+            updated += len(batch)
+            self.stdout.write(f'{updated} complaint(s) updated...')
+
+        self.stdout.write(self.style.SUCCESS(f'Computed text signatures for {updated} complaint(s).'))
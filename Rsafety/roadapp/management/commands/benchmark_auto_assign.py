@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from roadapp.autoassign import auto_assign, plan_assignments
+from roadapp.models import Complaint, Contractor
+from roadapp.seeding import SeedData, test_database
+
+TYPES = [code for code, _ in Complaint.COMPLAINT_TYPES]
+PRIORITIES = [code for code, _ in Complaint.PRIORITY_CHOICES]
+# The goal: a 100k backlog assigned "in seconds", read as under ten of them
+TARGET_COMPLAINTS = 100000
+TARGET_SECONDS = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the assignment planner on a synthetic backlog; '
+        'with --apply also seed a throwaway database and write the assignments. '
+        'Both stages are checked against the 100k-in-seconds target'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=100000)
+        parser.add_argument('--contractors', type=int, default=200)
+        parser.add_argument('--max-active', type=int)
+        parser.add_argument('--apply', action='store_true', help='Also run the full job against a seeded database')
+
+    def handle(self, *args, **options):
+        count, contractor_count = options['complaints'], options['contractors']
+        rng = random.Random(0)
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        backlog = [
+            (i, rng.choice(TYPES), rng.choice(PRIORITIES), start + timedelta(seconds=i))
+            for i in range(count)
+        ]
+        # Half the contractors specialize in one type, the rest take anything
+        contractors = {
+            i: {TYPES[i % (len(TYPES) - 1)]} if i % 2 else set() for i in range(contractor_count)
+        }
+        workloads = {i: rng.randrange(20) for i in range(contractor_count)}
+
+        started = time.perf_counter()
+        plan = plan_assignments(backlog, contractors, workloads, options['max_active'])
+        elapsed = time.perf_counter() - started
+        self.report('plan (in memory)', sum(map(len, plan.values())), elapsed)
+        loads = [workloads[i] + len(plan.get(i, ())) for i in contractors]
+        self.stdout.write(f'workload after: min {min(loads)}, max {max(loads)}')
+
+        if options['apply']:
+            self.apply(backlog, contractors, options['max_active'])
+
+    def apply(self, backlog, contractors, max_active):
+        with test_database():
+            data = SeedData()
+            Contractor.objects.update(is_verified=False)
+            users = User.objects.bulk_create(User(username=f'bench_firm{i}') for i in contractors)
+            Contractor.objects.bulk_create(
+                Contractor(
+                    user=user, company_name=f'Firm {i}', phone='0', address='-',
+                    specialization=', '.join(sorted(types)) or 'general', is_verified=True,
+                )
+                for user, (i, types) in zip(users, contractors.items())
+            )
+            Complaint.objects.bulk_create(
+                (
+                    Complaint(
+                        user=data.reporter, title=f'Benchmark {i}', description='-', location='Main St',
+                        complaint_type=complaint_type, priority=priority, status='verified',
+                    )
+                    for i, complaint_type, priority, _ in backlog
+                ),
+                batch_size=1000,
+            )
+            started = time.perf_counter()
+            plan = auto_assign(data.admin, max_active=max_active)
+            self.report('plan and write', sum(map(len, plan.values())), time.perf_counter() - started)
+
+    def report(self, label, assigned, elapsed):
+        rate = assigned / elapsed if elapsed else float('inf')
+        self.stdout.write(f'{label:<20}{elapsed:>8.2f}s {assigned:>10,} assigned {rate:>12,.0f}/s')
+        # Extrapolated linearly; both stages are linear in the backlog size
+        projected = TARGET_COMPLAINTS / rate if rate else float('inf')
+        verdict = f'{TARGET_COMPLAINTS:,} in {projected:.1f}s vs a {TARGET_SECONDS}s target: '
+        if projected <= TARGET_SECONDS:
+            self.stdout.write(self.style.SUCCESS(verdict + 'met'))
+        else:
+            self.stdout.write(self.style.ERROR(verdict + 'NOT met'))
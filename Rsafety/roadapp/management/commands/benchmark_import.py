@@ -0,0 +1,74 @@
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from roadapp.imports import IMPORT_CHUNK_SIZE, read_rows, validated_chunks
+from roadapp.models import Complaint
+from roadapp.seeding import SeedData, test_database
+
+WORDS = [
+    'pothole', 'crack', 'drain', 'kerb', 'verge', 'culvert', 'lane', 'junction', 'sign', 'streetlight',
+    'flooding', 'debris', 'marking', 'barrier', 'footpath', 'bridge', 'railing', 'tyres', 'deep', 'broken',
+]
+TYPES = [code for code, _ in Complaint.COMPLAINT_TYPES]
+# A million-row file, the size the rate is projected to
+PROJECTED_ROWS = 1000000
+
+
+class Command(BaseCommand):
+    help = (
+        'Time import_complaints on a synthetic CSV in a throwaway database: '
+        'validation alone, then the full import, each with its rows/s and the projected time for 1M rows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'complaints.csv')
+            self.write_file(path, options['rows'])
+
+            started = time.perf_counter()
+            for _ in validated_chunks(read_rows(path), options['workers'], options['chunk_size']):
+                pass
+            self.report('validate', options['rows'], time.perf_counter() - started)
+
+            with test_database():
+                data = SeedData()
+                before = Complaint.objects.count()
+                started = time.perf_counter()
+                call_command(
+                    'import_complaints', path, workers=options['workers'], chunk_size=options['chunk_size'],
+                    actor=data.admin.username, stdout=io.StringIO(),
+                )
+                elapsed = time.perf_counter() - started
+                self.report('validate and write', Complaint.objects.count() - before, elapsed)
+
+    def write_file(self, path, rows):
+        rng = random.Random(0)
+        with open(path, 'w', newline='') as target:
+            writer = csv.writer(target)
+            writer.writerow(['title', 'description', 'location', 'reporter', 'complaint_type', 'latitude', 'longitude'])
+            for i in range(rows):
+                writer.writerow([
+                    f'{rng.choice(WORDS).title()} on road {i % 500}',
+                    ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(10, 120))),
+                    f'{i % 500} Main St', f'reporter{i % 1000}', rng.choice(TYPES),
+                    f'{rng.uniform(12.8, 13.1):.6f}', f'{rng.uniform(77.4, 77.8):.6f}',
+                ])
+
+    def report(self, label, rows, elapsed):
+        rate = rows / elapsed if elapsed else float('inf')
+        self.stdout.write(
+            f'{label:<20}{elapsed:>8.2f}s {rows:>10,} rows {rate:>10,.0f} rows/s  '
+            f'{PROJECTED_ROWS:,} rows in {PROJECTED_ROWS / rate / 60:.1f} min'
+        )
@@ -0,0 +1,86 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from roadapp.models import Complaint, ComplaintAssignment, Notification
+from roadapp.notifications import TRANSITION_EVENTS, NotificationBatch, notify_transition
+from roadapp.seeding import SeedData, test_database
+
+TARGET_PER_MINUTE = 10000
+STATUS_CYCLE = ['verified', 'assigned', 'in_progress', 'completed']
+
+
+class Command(BaseCommand):
+    help = (
+        'Time notification fan-out for N status transitions in a throwaway database: '
+        'per-row saves, one batch per transition and one batch for all of them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transitions', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        count = options['transitions']
+        with test_database():
+            data = SeedData()
+            complaints = Complaint.objects.bulk_create(
+                Complaint(user=data.reporter, title=f'Benchmark {i}', description='-', location='Main St')
+                for i in range(count)
+            )
+            ComplaintAssignment.objects.bulk_create(
+                ComplaintAssignment(complaint=complaint, contractor=data.contractor, assigned_by=data.admin)
+                for complaint in complaints
+            )
+            transitions = [(complaint, STATUS_CYCLE[i % len(STATUS_CYCLE)]) for i, complaint in enumerate(complaints)]
+
+            self.report('per-row save', count, lambda: self.per_row(transitions, data))
+            self.report('batch per transition', count, lambda: self.per_transition(transitions, data))
+            self.report('one batch', count, lambda: self.one_batch(transitions, data))
+
+    def report(self, label, count, run):
+        Notification.objects.all().delete()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed * 60
+        verdict = self.style.SUCCESS('ok') if rate >= TARGET_PER_MINUTE else self.style.ERROR('below target')
+        self.stdout.write(
+            f'{label:<22}{elapsed:>8.2f}s {rate:>12,.0f} transitions/min '
+            f'{Notification.objects.count():>8} notifications  {verdict}'
+        )
+
+    def per_row(self, transitions, data):
+        """The naive approach this replaces: same recipients and de-duplication, one row at a time"""
+        for complaint, status in transitions:
+            with transaction.atomic():
+                for role, notification_type, title, message in TRANSITION_EVENTS[status]:
+                    if role == 'reporter':
+                        users = [complaint.user_id]
+                    elif role == 'contractor':
+                        users = ComplaintAssignment.objects.filter(complaint=complaint, is_active=True).values_list(
+                            'contractor__user_id', flat=True
+                        )
+                    else:
+                        users = User.objects.filter(is_staff=True, is_active=True).values_list('id', flat=True)
+                    for user_id in users:
+                        fields = {
+                            'user_id': user_id, 'complaint': complaint,
+                            'notification_type': notification_type, 'title': title,
+                        }
+                        if Notification.objects.filter(is_read=False, **fields).exists():
+                            continue
+                        Notification.objects.create(
+                            message=message.format(title=complaint.title, location=complaint.location), **fields
+                        )
+
+    def per_transition(self, transitions, data):
+        for complaint, status in transitions:
+            with transaction.atomic():
+                notify_transition(complaint, status)
+
+    def one_batch(self, transitions, data):
+        with transaction.atomic(), NotificationBatch() as batch:
+            for complaint, status in transitions:
+                batch.add(complaint, status)
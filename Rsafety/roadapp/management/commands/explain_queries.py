@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.exceptions import AmbiguityError
+from django.db.migrations.loader import MigrationLoader
+
+from roadapp.queryplan import explain_view_queries
+from roadapp.seeding import SeedData, test_database
+
+
+def index_names(state):
+    """``{table: {index name}}`` of the indexes Django creates for the roadapp models in ``state``"""
+    editor = connection.schema_editor()
+    names = {}
+    for model in state.apps.get_models():
+        if model._meta.app_label != 'roadapp':
+            continue
+        table = model._meta.db_table
+        found = names.setdefault(table, set())
+        for field in model._meta.local_fields:
+            if field.db_index and not field.unique:
+                found.add(editor._create_index_name(table, [field.column]))
+        found.update(index.name for index in model._meta.indexes)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN QUERY PLAN on the SELECTs every view issues against a seeded test database, '
+        'optionally comparing the plans with the indexes of an earlier roadapp migration'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50, help='Rows to seed (default 50)')
+        parser.add_argument(
+            '--before', metavar='MIGRATION',
+            help=(
+                "Also explain today's queries with the roadapp indexes added after this migration "
+                'dropped, e.g. 0002'
+            ),
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only problems')
+
+    def handle(self, *args, **options):
+        with test_database():
+            data = SeedData()
+            data.seed(options['rows'])
+            self.analyze()
+
+            if options['before']:
+                migration = self.migration(options['before'])
+                # The views and their SQL are today's; only the indexes go back in time, and
+                # dropping them inside a rolled-back transaction leaves the schema untouched
+                with transaction.atomic():
+                    self.drop_indexes_added_since(migration)
+                    self.analyze()
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'Before (roadapp indexes as of {migration})'))
+                    before = self.report(explain_view_queries(data.requests()), options['verbose_plans'])
+                    transaction.set_rollback(True)
+                # Both runs start with cold fragment caches, so they issue the same SELECTs
+                cache.clear()
+                self.stdout.write(self.style.MIGRATE_HEADING('After (all migrations applied)'))
+
+            after = self.report(explain_view_queries(data.requests()), options['verbose_plans'])
+
+        if options['before']:
+            self.stdout.write(f'Problem plan steps: {before} before, {after} after.')
+        elif after:
+            self.stdout.write(self.style.WARNING(f'{after} problem plan step(s) found.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full table scans or temporary sorts found.'))
+
+    def migration(self, prefix):
+        loader = MigrationLoader(connection)
+        try:
+            return loader.get_migration_by_prefix('roadapp', prefix).name
+        except AmbiguityError:
+            raise CommandError(f"More than one roadapp migration matches '{prefix}'.")
+        except KeyError:
+            raise CommandError(f"Cannot find a roadapp migration matching '{prefix}'.")
+
+    def drop_indexes_added_since(self, migration):
+        loader = MigrationLoader(connection)
+        then = index_names(loader.project_state(('roadapp', migration)))
+        now = index_names(loader.project_state())
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.table_names(cursor))
+            for table in sorted(now):
+                if table not in then:
+                    # Tables created after the migration keep their indexes; the views read them either way
+                    self.stdout.write(f'{table} did not exist yet; its indexes are kept.')
+                    continue
+                for name in sorted(now[table] - then[table]):
+                    if table in existing:
+                        cursor.execute(f'DROP INDEX IF EXISTS {quote(name)}')
+
+    def analyze(self):
+        # Give the planner real statistics for the seeded tables
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def report(self, report, verbose):
+        total = 0
+        for view, queries in report.items():
+            problems = [(q['sql'], step) for q in queries for step in q['problems']]
+            total += len(problems)
+            status = self.style.ERROR(f'{len(problems)} problem(s)') if problems else self.style.SUCCESS('ok')
+            self.stdout.write(f'{view}: {len(queries)} SELECT(s), {status}')
+            for query in queries:
+                if verbose or query['problems']:
+                    self.stdout.write(f"  {query['sql'][:160]}")
+                    for step in query['plan']:
+                        marker = '!' if step in query['problems'] else ' '
+                        self.stdout.write(f'   {marker} {step}')
+        return total
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from roadapp.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, EXPORTS, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Stream complaints, assignments or updates to a CSV or JSON-lines file with flat memory use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=sorted(EXPORTS), default='complaints')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output on the fly')
+        parser.add_argument('--status', help='Only complaints in this status')
+        parser.add_argument('--type', help='Only complaints of this type')
+        parser.add_argument('--from', dest='from', help='First day to include, e.g. 2025-01-01')
+        parser.add_argument('--to', help='Last day to include')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per round trip')
+        parser.add_argument('--output', '-o', default='-', help='File to write; - for standard output')
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in ('status', 'type', 'from', 'to') if options[name]}
+        try:
+            stream = export_stream(
+                options['table'], params, options['format'], options['gzip'], options['chunk_size'],
+            )
+        except ValidationError as exc:
+            raise CommandError(' '.join(exc.messages))
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        written = 0
+        try:
+            for chunk in stream:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written:,} bytes to {options['output']}."))
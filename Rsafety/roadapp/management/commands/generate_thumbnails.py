@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from roadapp.thumbnails import THUMBNAIL_FIELDS, process
+
+
+class Command(BaseCommand):
+    help = 'Create the resized WebP/JPEG copies of complaint and update images uploaded before they existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--all', action='store_true', help='Regenerate every image, not only those missing thumbnails')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for label, (image_field, thumbnails_field) in THUMBNAIL_FIELDS.items():
+            model = apps.get_model(label)
+            rows = model.objects.exclude(**{f'{image_field}__isnull': True}).exclude(**{image_field: ''})
+            for pk, name, thumbnails in rows.values_list('pk', image_field, thumbnails_field).iterator():
+                if options['all'] or (thumbnails or {}).get('source') != name:
+                    jobs.append((label, pk))
+
+        self.stdout.write(f'{len(jobs)} image(s) to process with {options["workers"]} worker(s)...')
+        done = failed = 0
+        # Pillow releases the GIL while decoding, resizing and encoding, so threads scale here
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for result in executor.map(lambda job: process(*job), jobs):
+                if result is None:
+                    failed += 1
+                else:
+                    done += 1
+                if (done + failed) % 100 == 0:
+                    self.stdout.write(f'{done + failed} image(s) processed...')
+
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {done} image(s), {failed} failed.'))
@@ -0,0 +1,87 @@
+import csv
+import os
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from roadapp.imports import (
+    IMPORT_CHUNK_SIZE, Lookups, MissingActor, load_checkpoint, read_rows, validated_chunks, write_chunk,
+)
+from roadapp.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Load historical complaints from a CSV or JSON-lines file: rows are validated in a process pool '
+        'and written with bulk_create, one transaction per chunk, resuming from a checkpoint after a failure'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or .jsonl/.ndjson')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Validation processes; 0 validates inline')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over')
+        parser.add_argument('--errors', help='Write rejected rows to this CSV file')
+        parser.add_argument('--actor', help='Staff username recorded as assigned_by (default: the first superuser)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        if options['actor']:
+            actor = User.objects.filter(username=options['actor'], is_staff=True).first()
+            if actor is None:
+                raise CommandError(f"{options['actor']!r} is not a staff user.")
+        else:
+            # Only needed once a row names a contractor; write_chunk raises MissingActor then
+            actor = User.objects.filter(is_superuser=True).order_by('id').first()
+
+        source = os.path.abspath(path)
+        if options['restart']:
+            ImportCheckpoint.objects.filter(source=source).delete()
+        checkpoint = load_checkpoint(source)
+        if checkpoint.row:
+            self.stdout.write(f'Resuming after row {checkpoint.row:,} ({checkpoint.imported:,} already imported).')
+
+        errors = open(options['errors'], 'a', newline='') if options['errors'] else None
+        error_writer = csv.writer(errors) if errors else None
+        lookups = Lookups()
+        started = time.perf_counter()
+        imported = rejected = 0
+        try:
+            rows = read_rows(path, start=checkpoint.row)
+            for results in validated_chunks(rows, options['workers'], options['chunk_size']):
+                valid = [result for result in results if result[2] is None]
+                problems = [(number, error) for number, _, error in results if error is not None]
+                # The checkpoint commits with the chunk, so a resumed import never writes it twice
+                with transaction.atomic():
+                    try:
+                        written, unresolved = write_chunk(valid, lookups, actor)
+                    except MissingActor as exc:
+                        raise CommandError(f'{exc} Pass --actor and run again to resume.')
+                    problems.extend(unresolved)
+                    checkpoint.row = results[-1][0]
+                    checkpoint.imported += written
+                    checkpoint.rejected += len(problems)
+                    checkpoint.save()
+
+                imported += written
+                rejected += len(problems)
+                if error_writer:
+                    error_writer.writerows(sorted(problems))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"row {checkpoint.row:>10,}  imported {imported:>10,}  rejected {rejected:>8,}  "
+                    f'{imported / elapsed:>10,.0f} rows/s'
+                )
+        finally:
+            if errors:
+                errors.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported:,} complaint(s) in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:,.0f} rows/s); '
+            f'{rejected:,} row(s) rejected.'
+        ))
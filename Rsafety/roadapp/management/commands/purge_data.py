@@ -0,0 +1,106 @@
+import time
+from collections import Counter
+from datetime import date, datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from roadapp.models import Complaint
+from roadapp.purge import PURGE_BATCH_SIZE, Purge
+
+
+def start_of_day(value):
+    return timezone.make_aware(datetime.combine(value, datetime.min.time()))
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete complaints or users and everything that depends on them in bounded primary-key batches, '
+        'one transaction per batch, keeping the counters, search indexes and media blobs consistent.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=['complaints', 'users'])
+        parser.add_argument('--before', type=date.fromisoformat, help='Only rows created before this day')
+        parser.add_argument('--after', type=date.fromisoformat, help='Only rows created on or after this day')
+        parser.add_argument('--status', action='append', help='Only complaints in this status; repeatable')
+        parser.add_argument('--user', action='append', help='Only this username (complaints: reporter); repeatable')
+        parser.add_argument('--keep-superusers', action='store_true', help='Never delete superuser accounts')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Root rows per transaction')
+        parser.add_argument(
+            '--dry-run', action='store_true', help='Run every batch in a rolled-back transaction and only report counts',
+        )
+        parser.add_argument('--no-input', action='store_false', dest='interactive', help='Do not ask for confirmation')
+
+    def handle(self, *args, **options):
+        if options['target'] == 'complaints':
+            rows = self.complaints(options)
+            phases = [rows]
+        else:
+            rows = self.users(options)
+            # A reporter's complaints go first in complaint-sized batches, so a prolific
+            # reporter does not turn one user batch into one huge transaction
+            phases = [Complaint.objects.filter(user__in=rows), rows]
+            if options['dry_run']:
+                # Nothing is really deleted, so the user batches would cascade to the
+                # same complaints again and count them twice
+                phases = [rows]
+
+        if not options['dry_run'] and options['interactive']:
+            answer = input(
+                f"This deletes {rows.count():,} {options['target']} and everything that depends on them. "
+                "Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError('Purge cancelled.')
+
+        purge = Purge(dry_run=options['dry_run'])
+        total = Counter()
+        started = time.monotonic()
+        batches = 0
+        for queryset in phases:
+            for deleted in purge.run(queryset, options['batch_size']):
+                batches += 1
+                total.update(deleted)
+                elapsed = time.monotonic() - started
+                rate = sum(total.values()) / elapsed if elapsed else 0
+                summary = ', '.join(f'{label} {count:,}' for label, count in sorted(deleted.items())) or 'nothing'
+                self.stdout.write(f'batch {batches:>6}  {summary}  ({rate:,.0f} rows/s)')
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        for label, count in sorted(total.items()):
+            self.stdout.write(f'{label}: {count:,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sum(total.values()):,} row(s) in {batches} batch(es) in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def complaints(self, options):
+        if options['keep_superusers']:
+            raise CommandError('--keep-superusers only applies to users.')
+        rows = Complaint.objects.all()
+        if options['status']:
+            unknown = set(options['status']) - dict(Complaint.STATUS_CHOICES).keys()
+            if unknown:
+                raise CommandError(f"Unknown status: {', '.join(sorted(unknown))}")
+            rows = rows.filter(status__in=options['status'])
+        if options['user']:
+            rows = rows.filter(user__username__in=options['user'])
+        return self.created(rows, 'created_at', options)
+
+    def users(self, options):
+        if options['status']:
+            raise CommandError('--status only applies to complaints.')
+        rows = User.objects.all()
+        if options['user']:
+            rows = rows.filter(username__in=options['user'])
+        if options['keep_superusers']:
+            rows = rows.exclude(is_superuser=True)
+        return self.created(rows, 'date_joined', options)
+
+    def created(self, rows, field, options):
+        if options['before']:
+            rows = rows.filter(**{f'{field}__lt': start_of_day(options['before'])})
+        if options['after']:
+            rows = rows.filter(**{f'{field}__gte': start_of_day(options['after'])})
+        return rows
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from roadapp.stats import STATUSES, aggregate_status_counts, complaint_status_counts, rebuild_status_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-status complaint counters and report any drift from the complaints table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the counters with the complaints table; exit non-zero on drift',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stored = complaint_status_counts()
+            actual = aggregate_status_counts()
+            drift = {s: (stored[s], actual[s]) for s in STATUSES if stored[s] != actual[s]}
+        else:
+            drift = rebuild_status_counts()
+
+        for status, (stored, actual) in drift.items():
+            self.stdout.write(f"{status}: stored={stored} actual={actual}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Complaint status counters are in sync.'))
+        elif options['check']:
+            self.stderr.write(self.style.ERROR(f'{len(drift)} status counter(s) out of sync.'))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drift)} status counter(s).'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from roadapp.workload import rebuild_workloads, workload_drift
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the per-contractor workload counters and report any drift from the assignments table. '
+        'Run daily so overdue counts follow the calendar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the counters with the assignments table; exit non-zero on drift',
+        )
+
+    def handle(self, *args, **options):
+        drift = workload_drift() if options['check'] else rebuild_workloads()
+
+        for contractor_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"contractor {contractor_id}: stored={stored} actual={actual}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Contractor workload counters are in sync.'))
+        elif options['check']:
+            self.stderr.write(self.style.ERROR(f'{len(drift)} workload counter(s) out of sync.'))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drift)} workload counter(s).'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from roadapp.notifications import rebuild_unread_counts, unread_count_drift
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user unread notification counters and report any drift from the notifications table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the counters with the notifications table; exit non-zero on drift',
+        )
+
+    def handle(self, *args, **options):
+        drift = unread_count_drift() if options['check'] else rebuild_unread_counts()
+
+        for user_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f"user {user_id}: stored={stored} actual={actual}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Unread notification counters are in sync.'))
+        elif options['check']:
+            self.stderr.write(self.style.ERROR(f'{len(drift)} unread counter(s) out of sync.'))
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drift)} unread counter(s).'))
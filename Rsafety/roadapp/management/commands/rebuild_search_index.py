@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from roadapp.search import fts_available, rebuild_complaint_index, rebuild_email_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite FTS5 search indexes from their source tables'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Search indexes are only maintained on SQLite; other databases search directly.')
+        rebuild_email_index()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the user email index.'))
+        rebuild_complaint_index()
+        self.stdout.write(self.style.SUCCESS('Rebuilt the complaint text index.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from roadapp.mailer import SEND_BATCH_SIZE, send_queued
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound email over pooled connections, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SEND_BATCH_SIZE, help='Messages sent per connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} email(s), {failed} failed.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        if not options['loop'] and not (sent or failed):
+            self.stdout.write('Outbox is empty.')
@@ -0,0 +1,88 @@
+from django.db import models
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+from .geo import EARTH_RADIUS_M, RANGE_END, covering_cells, radius_bbox
+
+# Columns each list template reads. Keeping them next to the querysets makes it
+# obvious what to touch when a template starts showing a new field.
+COMPLAINT_ROW_FIELDS = [
+    'id', 'title', 'description', 'location', 'complaint_type', 'priority',
+    'image', 'status', 'created_at', 'user_id',
+]
+USER_NAME_FIELDS = ['username', 'first_name', 'last_name', 'email']
+
+
+class ComplaintQuerySet(models.QuerySet):
+    def for_admin_list(self):
+        """Rows of the admin dashboard and email search tables, reporter included"""
+        return self.select_related('user').only(
+            *COMPLAINT_ROW_FIELDS, *[f'user__{name}' for name in USER_NAME_FIELDS]
+        )
+
+    def for_user_list(self):
+        """Rows of a reporter's own dashboard"""
+        return self.only(*COMPLAINT_ROW_FIELDS)
+
+    def for_detail(self):
+        return self.select_related('user', 'verified_by')
+
+    def within_bbox(self, south, west, north, east):
+        """
+        Complaints inside a map viewport.
+
+        The geohash prefix ranges prune candidates through the geohash index;
+        the latitude/longitude comparisons then trim the cell edges exactly.
+        """
+        if south > north or west > east:
+            raise ValueError('Bounding box must satisfy south <= north and west <= east.')
+        cells = Q()
+        for cell in covering_cells(south, west, north, east):
+            cells |= Q(geohash__gte=cell, geohash__lt=cell + RANGE_END)
+        return self.filter(
+            cells,
+            latitude__gte=south, latitude__lte=north,
+            longitude__gte=west, longitude__lte=east,
+        )
+
+    def near(self, latitude, longitude, radius_m):
+        """Complaints within ``radius_m`` metres, annotated with ``distance`` and nearest first"""
+        lat0 = Value(float(latitude), output_field=FloatField())
+        lon0 = Value(float(longitude), output_field=FloatField())
+        lat = Cast(F('latitude'), FloatField())
+        lon = Cast(F('longitude'), FloatField())
+        half_chord = (
+            Power(Sin((Radians(lat) - Radians(lat0)) / 2), 2)
+            + Cos(Radians(lat0)) * Cos(Radians(lat)) * Power(Sin((Radians(lon) - Radians(lon0)) / 2), 2)
+        )
+        return (
+            self.within_bbox(*radius_bbox(latitude, longitude, radius_m))
+            .annotate(distance=2 * EARTH_RADIUS_M * ASin(Sqrt(half_chord)))
+            .filter(distance__lte=radius_m)
+            .order_by('distance')
+        )
+
+
+class ComplaintAssignmentQuerySet(models.QuerySet):
+    def for_contractor_dashboard(self):
+        """Assignment rows with the complaint columns the contractor dashboard shows"""
+        return self.select_related('complaint').only(
+            'id', 'assigned_at', 'status_update', 'is_active', 'complaint_id', 'contractor_id',
+            *[f'complaint__{name}' for name in COMPLAINT_ROW_FIELDS],
+        )
+
+    def for_update_form(self):
+        return self.select_related('complaint')
+
+
+class ComplaintUpdateQuerySet(models.QuerySet):
+    def for_complaint_detail(self):
+        return self.select_related('contractor').only(
+            'id', 'update_text', 'update_image', 'update_image_thumbnails', 'created_at', 'complaint_id',
+            'contractor_id', 'contractor__company_name',
+        )
+
+
+class NotificationQuerySet(models.QuerySet):
+    def for_inbox(self):
+        return self.only('id', 'title', 'message', 'is_read', 'created_at', 'user_id', 'complaint_id')
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:29
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_status_counts(apps, schema_editor):
+    Complaint = apps.get_model('roadapp', 'Complaint')
+    ComplaintStatusCount = apps.get_model('roadapp', 'ComplaintStatusCount')
+    counts = dict(Complaint.objects.values_list('status').annotate(n=Count('id')).order_by())
+    ComplaintStatusCount.objects.bulk_create([
+        ComplaintStatusCount(status=status, count=counts.get(status, 0))
+        for status, _ in Complaint._meta.get_field('status').choices
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('assigned', 'Assigned to Contractor'), ('in_progress', 'Work In Progress'), ('completed', 'Completed'), ('rejected', 'Rejected')], max_length=20, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_status_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0002_complaintstatuscount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at', 'id'], name='complaint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='complaint_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='complaint_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaintassignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['contractor', 'assigned_at', 'id'], name='assignment_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaintupdate',
+            index=models.Index(fields=['complaint', 'created_at'], name='update_complaint_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contractor',
+            index=models.Index(fields=['created_at'], name='contractor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notification_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user'], name='notification_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS roadapp_useremail_fts USING fts5(email, tokenize='trigram')"
+    )
+    schema_editor.execute(
+        "INSERT INTO roadapp_useremail_fts (rowid, email) SELECT id, email FROM auth_user WHERE email != ''"
+    )
+
+
+def drop_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS roadapp_useremail_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('roadapp', '0003_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_email_index, drop_email_index),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_complaint_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS roadapp_complaint_fts '
+        "USING fts5(title, description, location, updates, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        'INSERT INTO roadapp_complaint_fts (rowid, title, description, location, updates) '
+        'SELECT c.id, c.title, c.description, c.location, '
+        "(SELECT group_concat(u.update_text, ' ') FROM roadapp_complaintupdate u WHERE u.complaint_id = c.id) "
+        'FROM roadapp_complaint c'
+    )
+
+
+def drop_complaint_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS roadapp_complaint_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0004_useremail_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_complaint_index, drop_complaint_index),
+    ]
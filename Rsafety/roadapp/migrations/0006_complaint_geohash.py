@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0005_complaint_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+    ]
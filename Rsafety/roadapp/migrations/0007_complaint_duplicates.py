@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0006_complaint_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='roadapp.complaint'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='text_signature',
+            field=models.CharField(blank=True, default='', editable=False, max_length=256),
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('assigned', 'Assigned to Contractor'), ('in_progress', 'Work In Progress'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('duplicate', 'Duplicate')], default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='complaintstatuscount',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('assigned', 'Assigned to Contractor'), ('in_progress', 'Work In Progress'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('duplicate', 'Duplicate')], max_length=20, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['complaint_type', 'geohash'], name='complaint_type_geohash_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0007_complaint_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='image_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='complaintupdate',
+            name='update_image_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:57
+
+from django.db import migrations, models
+import roadapp.uploads
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0008_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=roadapp.uploads.get_upload_storage, upload_to='complaints/'),
+        ),
+        migrations.AlterField(
+            model_name='complaintupdate',
+            name='update_image',
+            field=models.ImageField(blank=True, null=True, storage=roadapp.uploads.get_upload_storage, upload_to='updates/'),
+        ),
+    ]
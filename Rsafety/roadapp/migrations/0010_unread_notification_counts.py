@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def seed_unread_counts(apps, schema_editor):
+    Notification = apps.get_model('roadapp', 'Notification')
+    UnreadNotificationCount = apps.get_model('roadapp', 'UnreadNotificationCount')
+    counts = Notification.objects.filter(is_read=False).values_list('user_id').annotate(n=Count('id')).order_by()
+    UnreadNotificationCount.objects.bulk_create([
+        UnreadNotificationCount(user_id=user_id, count=count) for user_id, count in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('roadapp', '0009_content_addressed_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadNotificationCount',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_notification_count', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0011_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaintassignment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaintassignment',
+            index=models.Index(fields=['contractor', 'assigned_at', 'id'], name='assignment_contractor_idx'),
+        ),
+    ]
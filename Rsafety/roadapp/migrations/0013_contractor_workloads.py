@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:17
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def seed_workloads(apps, schema_editor):
+    ComplaintAssignment = apps.get_model('roadapp', 'ComplaintAssignment')
+    ContractorWorkload = apps.get_model('roadapp', 'ContractorWorkload')
+    counts = ComplaintAssignment.objects.filter(is_active=True).values('contractor_id').annotate(
+        active=Count('id'),
+        assigned=Count('id', filter=Q(complaint__status='assigned')),
+        in_progress=Count('id', filter=Q(complaint__status='in_progress')),
+        completed=Count('id', filter=Q(complaint__status='completed')),
+        overdue=Count('id', filter=Q(
+            complaint__status__in=['assigned', 'in_progress'], estimated_completion_date__lt=timezone.localdate(),
+        )),
+    ).order_by()
+    ContractorWorkload.objects.bulk_create([ContractorWorkload(**row) for row in counts])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0012_updated_at_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractorWorkload',
+            fields=[
+                ('contractor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='workload', serialize=False, to='roadapp.contractor')),
+                ('active', models.PositiveIntegerField(default=0)),
+                ('assigned', models.PositiveIntegerField(default=0)),
+                ('in_progress', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_workloads, migrations.RunPython.noop),
+    ]
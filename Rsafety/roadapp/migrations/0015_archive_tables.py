@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import roadapp.uploads
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('roadapp', '0014_import_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComplaint',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('location', models.CharField(max_length=255)),
+                ('complaint_type', models.CharField(choices=[('pothole', 'Pothole'), ('construction', 'Construction'), ('maintenance', 'Maintenance'), ('traffic_signal', 'Traffic Signal'), ('street_light', 'Street Light'), ('other', 'Other')], max_length=20)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], max_length=10)),
+                ('image', models.ImageField(blank=True, null=True, storage=roadapp.uploads.get_upload_storage, upload_to='complaints/')),
+                ('image_thumbnails', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('assigned', 'Assigned to Contractor'), ('in_progress', 'Work In Progress'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('duplicate', 'Duplicate')], max_length=20)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('duplicate_of_id', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_complaints', to=settings.AUTH_USER_MODEL)),
+                ('verified_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_verified_complaints', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('notification_type', models.CharField(choices=[('complaint_status', 'Complaint Status Update'), ('assignment', 'New Assignment'), ('verification', 'Complaint Verified'), ('completion', 'Work Completed')], max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('complaint', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='roadapp.archivedcomplaint')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAssignment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('assigned_at', models.DateTimeField()),
+                ('estimated_completion_date', models.DateField(blank=True, null=True)),
+                ('status_update', models.TextField(blank=True)),
+                ('work_started_at', models.DateTimeField(blank=True, null=True)),
+                ('work_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assigned_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='roadapp.archivedcomplaint')),
+                ('contractor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='roadapp.contractor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedUpdate',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('update_text', models.TextField()),
+                ('update_image', models.ImageField(blank=True, null=True, storage=roadapp.uploads.get_upload_storage, upload_to='updates/')),
+                ('update_image_thumbnails', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='roadapp.archivedcomplaint')),
+                ('contractor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='roadapp.contractor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['complaint', 'created_at'], name='archived_update_created_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomplaint',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='archived_user_created_idx'),
+        ),
+    ]
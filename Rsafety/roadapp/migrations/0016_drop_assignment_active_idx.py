@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0015_archive_tables'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='complaintassignment',
+            name='assignment_active_idx',
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from roadapp.dedup import text_signature
+
+BATCH_SIZE = 2000
+
+
+def resign_complaints(apps, schema_editor):
+    # Signatures are now bottom-k sketches of a bounded text prefix; the old
+    # ones are not comparable with them, so every stored one is recomputed
+    Complaint = apps.get_model('roadapp', 'Complaint')
+    rows = Complaint.objects.exclude(text_signature='').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id).values_list('id', 'title', 'description')[:BATCH_SIZE])
+        if not batch:
+            break
+        Complaint.objects.bulk_update(
+            [Complaint(id=pk, text_signature=text_signature(title, description)) for pk, title, description in batch],
+            ['text_signature'],
+        )
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0016_drop_assignment_active_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(resign_complaints, migrations.RunPython.noop),
+    ]
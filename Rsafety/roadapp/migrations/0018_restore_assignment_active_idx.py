@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0017_resign_complaint_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaintassignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['contractor', 'assigned_at', 'id'], name='assignment_active_idx'),
+        ),
+    ]
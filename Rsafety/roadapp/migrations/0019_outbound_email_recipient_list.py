@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:57
+
+import json
+from email.utils import formataddr, getaddresses
+
+from django.db import migrations, models
+
+
+def split_recipients(apps, schema_editor):
+    # Queued rows hold comma-joined addresses; getaddresses keeps quoted
+    # display names with commas in them together
+    OutboundEmail = apps.get_model('roadapp', 'OutboundEmail')
+    for pk, to in OutboundEmail.objects.values_list('id', 'to'):
+        recipients = [formataddr(pair) for pair in getaddresses([to]) if pair[1]]
+        OutboundEmail.objects.filter(pk=pk).update(to=json.dumps(recipients))
+
+
+def join_recipients(apps, schema_editor):
+    OutboundEmail = apps.get_model('roadapp', 'OutboundEmail')
+    for pk, to in OutboundEmail.objects.values_list('id', 'to'):
+        OutboundEmail.objects.filter(pk=pk).update(to=', '.join(json.loads(to)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadapp', '0018_restore_assignment_active_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_recipients, join_recipients),
+        migrations.AlterField(
+            model_name='outboundemail',
+            name='to',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
+from .dedup import text_signature
+from .geo import encode_geohash
+from .uploads import get_upload_storage
+from .managers import ComplaintAssignmentQuerySet, ComplaintQuerySet, ComplaintUpdateQuerySet, NotificationQuerySet
 
 class Contractor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -11,6 +15,11 @@ class Contractor(models.Model):
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='contractor_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.company_name} - {self.user.username}"
 
@@ -31,6 +40,7 @@ class Complaint(models.Model):
         ('in_progress', 'Work In Progress'),
         ('completed', 'Completed'),
         ('rejected', 'Rejected'),
+        ('duplicate', 'Duplicate'),
     ]
     
     PRIORITY_CHOICES = [
@@ -46,18 +56,99 @@ class Complaint(models.Model):
     location = models.CharField(max_length=255)
     complaint_type = models.CharField(max_length=20, choices=COMPLAINT_TYPES, default='other')
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
-    image = models.ImageField(upload_to='complaints/', blank=True, null=True)
+    image = models.ImageField(upload_to='complaints/', storage=get_upload_storage, blank=True, null=True)
+    # Resized WebP/JPEG copies of image, written by roadapp.thumbnails
+    image_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Geohash of latitude/longitude, kept in sync on save; see roadapp.geo
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     verified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='verified_complaints')
     verified_at = models.DateTimeField(null=True, blank=True)
+    # MinHash of title + description used to spot re-reports; see roadapp.dedup
+    text_signature = models.CharField(max_length=256, blank=True, default='', editable=False)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates')
+
+    objects = ComplaintQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination walks (created_at, id), optionally within a reporter or a status
+            models.Index(fields=['created_at', 'id'], name='complaint_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='complaint_user_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='complaint_status_created_idx'),
+            # Duplicate detection looks for the same kind of issue in nearby geohash cells
+            models.Index(fields=['complaint_type', 'geohash'], name='complaint_type_geohash_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so status transitions can be counted on save
+        instance._loaded_status = instance.__dict__.get('status')
+        if 'image' in instance.__dict__:
+            # Remember the stored image so replacing it releases the old blob
+            instance._loaded_image = instance.__dict__['image'] or ''
+        if instance.__dict__.get('text_signature'):
+            # The stored signature was computed from the stored text
+            instance._signed_text = (instance.__dict__.get('title'), instance.__dict__.get('description'))
+        return instance
+
+    def refresh_text_signature(self):
+        """Recompute text_signature unless it was already computed from the current title and description"""
+        text = (self.__dict__.get('title'), self.__dict__.get('description'))
+        if getattr(self, '_signed_text', None) != text:
+            self.text_signature = text_signature(self.title, self.description)
+            self._signed_text = text
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Saving a partly loaded row only writes its loaded fields, which may not include the text
+            if not {'title', 'description', 'text_signature'} & self.get_deferred_fields():
+                self.refresh_text_signature()
+        elif {'title', 'description'} & set(update_fields):
+            self.refresh_text_signature()
+        if update_fields is not None:
+            derived = set()
+            if {'latitude', 'longitude'} & set(update_fields):
+                derived.add('geohash')
+            if {'title', 'description'} & set(update_fields):
+                derived.add('text_signature')
+            kwargs['update_fields'] = set(update_fields) | derived
+        # Keep the row and the status counters in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} - {self.status}"
 
+class MediaBlob(models.Model):
+    """One stored upload, shared by every image field that references the same content"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class ComplaintStatusCount(models.Model):
+    """Running number of complaints per status, maintained by roadapp.stats"""
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES, unique=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
 class ComplaintAssignment(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE)
     contractor = models.ForeignKey(Contractor, on_delete=models.CASCADE)
@@ -68,17 +159,60 @@ class ComplaintAssignment(models.Model):
     work_started_at = models.DateTimeField(null=True, blank=True)
     work_completed_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ComplaintAssignmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['contractor', 'assigned_at', 'id'], condition=models.Q(is_active=True),
+                name='assignment_active_idx',
+            ),
+            # The API pages through every assignment of a contractor, inactive ones included
+            models.Index(fields=['contractor', 'assigned_at', 'id'], name='assignment_contractor_idx'),
+        ]
 
     def __str__(self):
         return f"{self.complaint.title} - {self.contractor.company_name}"
 
+class ContractorWorkload(models.Model):
+    """Active assignments of one contractor by complaint status, maintained by roadapp.workload"""
+    contractor = models.OneToOneField(Contractor, on_delete=models.CASCADE, primary_key=True, related_name='workload')
+    active = models.PositiveIntegerField(default=0)
+    assigned = models.PositiveIntegerField(default=0)
+    in_progress = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    # Open assignments past their estimated completion date as of updated_at
+    overdue = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.contractor_id}: {self.active} active"
+
 class ComplaintUpdate(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE)
     contractor = models.ForeignKey(Contractor, on_delete=models.CASCADE)
     update_text = models.TextField()
-    update_image = models.ImageField(upload_to='updates/', blank=True, null=True)
+    update_image = models.ImageField(upload_to='updates/', storage=get_upload_storage, blank=True, null=True)
+    update_image_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ComplaintUpdateQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint', 'created_at'], name='update_complaint_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored image so replacing it releases the old blob
+        if 'update_image' in instance.__dict__:
+            instance._loaded_image = instance.__dict__['update_image'] or ''
+        return instance
+
     def __str__(self):
         return f"Update for {self.complaint.title} by {self.contractor.company_name}"
 
@@ -97,6 +231,155 @@ class Notification(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = NotificationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='notification_user_created_idx'),
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored read flag so the unread counters can follow changes
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        return instance
+
+    def __str__(self):
+        return f"{self.title} - {self.user.username}"
+
+class UnreadNotificationCount(models.Model):
+    """Running number of unread notifications per user, maintained by roadapp.notifications"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_notification_count')
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count}" 
+
+class ArchivedComplaint(models.Model):
+    """A closed complaint moved out of the live table by roadapp.archive, under its original id"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_complaints')
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    location = models.CharField(max_length=255)
+    complaint_type = models.CharField(max_length=20, choices=Complaint.COMPLAINT_TYPES)
+    priority = models.CharField(max_length=10, choices=Complaint.PRIORITY_CHOICES)
+    # Still holds its MediaBlob reference: archiving moves the reference, it does not release it
+    image = models.ImageField(upload_to='complaints/', storage=get_upload_storage, blank=True, null=True)
+    image_thumbnails = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    verified_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_verified_complaints'
+    )
+    verified_at = models.DateTimeField(null=True, blank=True)
+    # Either a live or an archived complaint, so not a foreign key
+    duplicate_of_id = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='archived_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.status} (archived)"
+
+class ArchivedAssignment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    complaint = models.ForeignKey(ArchivedComplaint, on_delete=models.CASCADE)
+    contractor = models.ForeignKey(Contractor, on_delete=models.CASCADE)
+    assigned_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    assigned_at = models.DateTimeField()
+    estimated_completion_date = models.DateField(null=True, blank=True)
+    status_update = models.TextField(blank=True)
+    work_started_at = models.DateTimeField(null=True, blank=True)
+    work_completed_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived assignment {self.pk} of complaint {self.complaint_id}"
+
+class ArchivedUpdate(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    complaint = models.ForeignKey(ArchivedComplaint, on_delete=models.CASCADE)
+    contractor = models.ForeignKey(Contractor, on_delete=models.CASCADE)
+    update_text = models.TextField()
+    update_image = models.ImageField(upload_to='updates/', storage=get_upload_storage, blank=True, null=True)
+    update_image_thumbnails = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint', 'created_at'], name='archived_update_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived update {self.pk} of complaint {self.complaint_id}"
+
+class ArchivedNotification(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    complaint = models.ForeignKey(ArchivedComplaint, on_delete=models.CASCADE, null=True, blank=True)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived notification {self.pk} for {self.user_id}"
+
+class OutboundEmail(models.Model):
+    """A message waiting in the outbox for the send_queued_mail worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    # Recipient addresses as a list, so display names may contain commas
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set by the worker that claimed the row, so concurrent workers never send it twice
+    lease = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+class ImportCheckpoint(models.Model):
+    """How far import_complaints got through a source file, written in the same transaction as each chunk"""
+    source = models.CharField(max_length=1024, unique=True)
+    # Number of the last source row whose chunk was committed
+    row = models.BigIntegerField(default=0)
+    imported = models.BigIntegerField(default=0)
+    rejected = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.title} - {self.user.username}" 
\ No newline at end of file
+        return f"{self.source} at row {self.row}"
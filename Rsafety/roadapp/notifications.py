@@ -0,0 +1,269 @@
+from collections import Counter, defaultdict
+from string import Formatter
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import events
+from .models import Complaint, ComplaintAssignment, Contractor, Notification, UnreadNotificationCount
+
+UNREAD_CACHE_KEY = 'notifications:unread:{}'
+# The default cache is per process, so a short timeout bounds how long another
+# process can show a stale badge after this one changes a counter.
+UNREAD_CACHE_TIMEOUT = 60
+# Ids per IN list; keeps statements well under SQLite's bound-variable limit
+IN_CHUNK_SIZE = 500
+
+# Who hears about a complaint reaching each status:
+# (recipient role, notification_type, title, message template)
+TRANSITION_EVENTS = {
+    'verified': [
+        ('reporter', 'verification', 'Complaint verified', 'Your complaint "{title}" has been verified.'),
+    ],
+    'rejected': [
+        ('reporter', 'complaint_status', 'Complaint rejected', 'Your complaint "{title}" was rejected after review.'),
+    ],
+    'assigned': [
+        ('reporter', 'complaint_status', 'Contractor assigned', 'A contractor has been assigned to "{title}".'),
+        ('contractor', 'assignment', 'New assignment', 'You have been assigned "{title}" at {location}.'),
+    ],
+    'in_progress': [
+        ('reporter', 'complaint_status', 'Work started', 'Work has started on "{title}".'),
+    ],
+    'completed': [
+        ('reporter', 'completion', 'Work completed', 'Work on "{title}" has been completed.'),
+        ('watchers', 'completion', 'Work completed', '"{title}" at {location} was marked completed.'),
+    ],
+}
+
+
+class NotificationBatch:
+    """
+    Collect the notifications of any number of status transitions and write
+    them with a single ``bulk_create`` once the transaction commits.
+
+    Used as a context manager around the transition::
+
+        with transaction.atomic(), NotificationBatch(actor=request.user) as batch:
+            complaint.status = 'verified'
+            complaint.save(update_fields=['status', 'updated_at'])
+            batch.add(complaint)
+
+    Recipients are resolved in bulk when the batch is written, so a batch
+    costs the same handful of queries for one transition or ten thousand.
+    The same notification is only written once per batch, and not at all
+    while an identical one is still unread.
+    """
+
+    def __init__(self, actor=None):
+        self.actor_id = getattr(actor, 'pk', actor)
+        self.events = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.events:
+            transaction.on_commit(self.flush)
+
+    def add(self, complaint, status=None, contractor_user_id=None):
+        """Queue the notifications for ``complaint`` reaching ``status`` (its current one by default)"""
+        status = status or complaint.status
+        if status in TRANSITION_EVENTS:
+            self.events.append((complaint, status, contractor_user_id))
+
+    def recipients(self):
+        """Map each queued event to ``{role: [user_id, ...]}``"""
+        roles = {role for _, status, _ in self.events for role, *_ in TRANSITION_EVENTS[status]}
+        contractors = {}
+        if 'contractor' in roles:
+            missing = [complaint.pk for complaint, _, user_id in self.events if user_id is None]
+            contractors = dict(
+                ComplaintAssignment.objects.filter(complaint_id__in=missing, is_active=True)
+                .order_by('assigned_at').values_list('complaint_id', 'contractor__user_id')
+            )
+        watchers = []
+        if 'watchers' in roles:
+            watchers = list(User.objects.filter(is_staff=True, is_active=True).values_list('id', flat=True))
+        for complaint, status, contractor_user_id in self.events:
+            contractor = contractor_user_id or contractors.get(complaint.pk)
+            yield complaint, status, {
+                'reporter': [complaint.user_id],
+                'contractor': [contractor] if contractor else [],
+                'watchers': watchers,
+            }
+
+    def build(self):
+        notifications = {}
+        for complaint, status, recipients in self.recipients():
+            for role, notification_type, title, message in TRANSITION_EVENTS[status]:
+                for user_id in recipients[role]:
+                    if user_id == self.actor_id:
+                        continue
+                    key = (user_id, complaint.pk, notification_type, title)
+                    notifications.setdefault(key, Notification(
+                        user_id=user_id, complaint_id=complaint.pk, notification_type=notification_type,
+                        title=title, message=message.format(title=complaint.title, location=complaint.location),
+                    ))
+        keys = sorted(notifications)
+        for start in range(0, len(keys), IN_CHUNK_SIZE):
+            chunk = keys[start:start + IN_CHUNK_SIZE]
+            unread = Notification.objects.filter(
+                is_read=False,
+                user_id__in={key[0] for key in chunk},
+                complaint_id__in={key[1] for key in chunk},
+            ).values_list('user_id', 'complaint_id', 'notification_type', 'title')
+            for key in unread:
+                notifications.pop(key, None)
+        return list(notifications.values())
+
+    def flush(self):
+        notifications = self.build() if self.events else []
+        self.events = []
+        if notifications:
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications)
+                # bulk_create sends no post_save, so count the new rows here
+                adjust_unread_counts(Counter(notification.user_id for notification in notifications))
+                events.notifications_published(notification.user_id for notification in notifications)
+        return notifications
+
+
+def message_sql(template, columns):
+    """SQL concatenating ``template`` with its ``{field}``s replaced by ``columns``, and its parameters"""
+    parts, params = [], []
+    for literal, field, _, _ in Formatter().parse(template):
+        if literal:
+            parts.append('%s')
+            params.append(literal)
+        if field:
+            parts.append(columns[field])
+    return ' || '.join(parts), params
+
+
+def notify_planned_assignments(plan_table, actor=None):
+    """
+    Write the notifications of complaints just assigned from ``plan_table`` with INSERT ... SELECT.
+
+    ``plan_table`` has ``complaint_id`` and ``contractor_id`` columns. This is
+    NotificationBatch for the assigned status done in SQL: recipients come from
+    a join, the same notification is skipped while an identical one is
+    unread, and the unread counters and streams are updated for the rows
+    written. Returns the number of notifications written.
+    """
+    actor_id = getattr(actor, 'pk', actor)
+    quote = connection.ops.quote_name
+    complaints = quote(Complaint._meta.db_table)
+    contractors = quote(Contractor._meta.db_table)
+    table = quote(Notification._meta.db_table)
+    recipients = {'reporter': 'c.user_id', 'contractor': 'k.user_id'}
+    columns = {'title': 'c.title', 'location': 'c.location'}
+    selects, params = [], []
+    for role, notification_type, title, template in TRANSITION_EVENTS['assigned']:
+        recipient = recipients[role]
+        message, message_params = message_sql(template, columns)
+        selects.append(
+            f'SELECT {recipient} AS user_id, c.id AS complaint_id, %s AS notification_type, %s AS title, '
+            f'{message} AS message '
+            f'FROM {quote(plan_table)} p JOIN {complaints} c ON c.id = p.complaint_id '
+            f'JOIN {contractors} k ON k.id = p.contractor_id '
+            f'WHERE {recipient} IS NOT NULL AND (%s IS NULL OR {recipient} <> %s) AND NOT EXISTS ('
+            f'SELECT 1 FROM {table} n WHERE n.is_read = %s AND n.user_id = {recipient} '
+            f'AND n.complaint_id = c.id AND n.notification_type = %s AND n.title = %s)'
+        )
+        params.extend([
+            notification_type, title, *message_params, actor_id, actor_id, False, notification_type, title,
+        ])
+    source = ' UNION ALL '.join(selects)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Counted before the insert, from the same rows, so the counters match what is written
+        cursor.execute(f'SELECT user_id, COUNT(*) FROM ({source}) s GROUP BY user_id', params)
+        deltas = dict(cursor.fetchall())
+        if not deltas:
+            return 0
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, complaint_id, notification_type, title, message, is_read, '
+            f'created_at, updated_at) SELECT user_id, complaint_id, notification_type, title, message, %s, %s, %s '
+            f'FROM ({source}) s',
+            [False, now, now, *params],
+        )
+        adjust_unread_counts(deltas)
+        events.notifications_published(deltas)
+    return sum(deltas.values())
+
+
+def notify_transition(complaint, status=None, actor=None, contractor_user_id=None):
+    """Notify everyone concerned by one complaint's status change after commit"""
+    with NotificationBatch(actor) as batch:
+        batch.add(complaint, status, contractor_user_id)
+
+
+def unread_count(user_id):
+    """Unread notifications of one user, served from the cache when possible"""
+    key = UNREAD_CACHE_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = UnreadNotificationCount.objects.filter(user_id=user_id).values_list('count', flat=True).first() or 0
+        cache.set(key, count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def adjust_unread_counts(deltas):
+    """Apply ``{user_id: delta}`` to the counters with one UPDATE per distinct delta and chunk of users"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        by_delta[delta].append(user_id)
+    with transaction.atomic():
+        # Only users gaining unread notifications may lack a counter row; a user
+        # whose notifications are being purged along with the account must not get one
+        UnreadNotificationCount.objects.bulk_create(
+            [UnreadNotificationCount(user_id=user_id) for user_id, delta in deltas.items() if delta > 0],
+            ignore_conflicts=True,
+        )
+        for delta, user_ids in by_delta.items():
+            for start in range(0, len(user_ids), IN_CHUNK_SIZE):
+                UnreadNotificationCount.objects.filter(
+                    user_id__in=user_ids[start:start + IN_CHUNK_SIZE]
+                ).update(count=F('count') + delta)
+    keys = [UNREAD_CACHE_KEY.format(user_id) for user_id in deltas]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def mark_read(user, ids=None):
+    """Mark ``user``'s notifications read (only ``ids`` when given) with one UPDATE"""
+    notifications = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    with transaction.atomic():
+        marked = notifications.update(is_read=True, updated_at=timezone.now())
+        adjust_unread_counts({user.pk: -marked})
+    return marked
+
+
+def unread_count_drift():
+    """``{user_id: (stored, actual)}`` for every counter that disagrees with the notifications table"""
+    actual = dict(
+        Notification.objects.filter(is_read=False).values_list('user_id').annotate(n=Count('id')).order_by()
+    )
+    stored = dict(UnreadNotificationCount.objects.values_list('user_id', 'count'))
+    return {
+        user_id: (stored.get(user_id), actual.get(user_id, 0))
+        for user_id in actual.keys() | stored.keys() if stored.get(user_id, 0) != actual.get(user_id, 0)
+    }
+
+
+def rebuild_unread_counts():
+    """Recompute the counters that drifted from the notifications table and return that drift"""
+    with transaction.atomic():
+        drift = unread_count_drift()
+        for user_id, (_, actual) in drift.items():
+            UnreadNotificationCount.objects.update_or_create(user_id=user_id, defaults={'count': actual})
+    cache.delete_many([UNREAD_CACHE_KEY.format(user_id) for user_id in drift])
+    return drift
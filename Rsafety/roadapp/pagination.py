@@ -0,0 +1,134 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)`` for a cursor string, or None if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, page_size, query_params=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+        self.query_params = query_params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _querystring(self, **params):
+        query = self.query_params.copy() if self.query_params is not None else {}
+        for name in ('after', 'before'):
+            query.pop(name, None)
+        query.update(params)
+        if hasattr(query, 'urlencode'):
+            return '?' + query.urlencode()
+        return '?' + '&'.join(f'{k}={v}' for k, v in query.items())
+
+    @property
+    def next_querystring(self):
+        return self._querystring(after=self.next_cursor) if self.has_next() else ''
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(before=self.previous_cursor) if self.has_previous() else ''
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest-first on ``(key, id)`` without OFFSET.
+
+    Each page is a range scan starting at the cursor, so page 1000 costs the
+    same as page 1 and rows inserted meanwhile never shift the page boundaries.
+    """
+
+    def __init__(self, queryset, key='created_at', page_size=DEFAULT_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE):
+        self.queryset = queryset
+        self.key = key
+        self.max_page_size = max_page_size
+        self.page_size = self.clamp_page_size(page_size)
+
+    def clamp_page_size(self, page_size):
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            return DEFAULT_PAGE_SIZE
+        return max(1, min(page_size, self.max_page_size))
+
+    def page(self, after=None, before=None, query_params=None):
+        key = self.key
+        size = self.page_size
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before and not after else None
+
+        if before:
+            value, pk = before
+            rows = list(
+                self.queryset.filter(Q(**{f'{key}__gt': value}) | Q(**{key: value, 'id__gt': pk}))
+                .order_by(key, 'id')[:size + 1]
+            )
+            has_more = len(rows) > size
+            rows = rows[:size][::-1]
+            next_cursor = self.cursor_for(rows[-1]) if rows else None
+            previous_cursor = self.cursor_for(rows[0]) if rows and has_more else None
+        else:
+            queryset = self.queryset
+            if after:
+                value, pk = after
+                queryset = queryset.filter(Q(**{f'{key}__lt': value}) | Q(**{key: value, 'id__lt': pk}))
+            rows = list(queryset.order_by(f'-{key}', '-id')[:size + 1])
+            has_more = len(rows) > size
+            rows = rows[:size]
+            next_cursor = self.cursor_for(rows[-1]) if rows and has_more else None
+            previous_cursor = self.cursor_for(rows[0]) if rows and after else None
+
+        return KeysetPage(rows, next_cursor, previous_cursor, size, query_params)
+
+    def cursor_for(self, obj):
+        if isinstance(obj, dict):
+            return encode_cursor(obj[self.key], obj['id'])
+        return encode_cursor(getattr(obj, self.key), obj.pk)
+
+
+def paginate_keyset(request, queryset, key='created_at', page_size=DEFAULT_PAGE_SIZE):
+    """Build a KeysetPage from the ``after``/``before``/``page_size`` query parameters"""
+    paginator = KeysetPaginator(queryset, key=key, page_size=request.GET.get('page_size', page_size))
+    return paginator.page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        query_params=request.GET,
+    )
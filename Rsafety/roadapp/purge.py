@@ -0,0 +1,207 @@
+import json
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import connection, models, transaction
+
+from . import fragments, notifications, search, workload
+from .bulk import BULK_CHUNK_SIZE, chunked
+from .models import Complaint, ComplaintAssignment, ComplaintUpdate, Notification
+from .stats import record_status_change
+from .thumbnails import THUMBNAIL_FIELDS, delete_derivatives
+from .uploads import upload_storage
+
+# Root rows per transaction; everything that cascades from them goes with them
+PURGE_BATCH_SIZE = 500
+# Complaints whose search rows must be rebuilt, kept in SQL so a batch that
+# cascades to any number of complaints does not hold their ids in memory
+REINDEX_TABLE = 'purge_reindex'
+
+
+class DryRun(Exception):
+    """Raised inside a batch's transaction to roll it back after counting"""
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def cascading_relations(model):
+    """Relations pointing at ``model``, including hidden ones such as auto-created m2m tables"""
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete and (field.one_to_one or field.one_to_many)
+    ]
+
+
+class Purge:
+    """
+    Delete rows and everything that depends on them in primary-key batches.
+
+    Django's deletion collector loads every related object into memory to
+    cascade and send signals. Here each relation becomes one DELETE (or an
+    UPDATE for SET_NULL) whose WHERE clause selects the parent rows with a
+    subquery, issued children first, so memory stays flat however much a
+    batch cascades to. No signals are sent, so just before each DELETE the
+    rows it removes are summarized with grouped queries, and the status,
+    unread and workload counters, search indexes, media blobs and dashboard
+    fragments are brought up to date before the batch commits.
+    """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.collectors = {
+            Complaint: self.collect_complaints,
+            ComplaintAssignment: self.collect_assignments,
+            ComplaintUpdate: self.collect_updates,
+            Notification: self.collect_notifications,
+            User: self.collect_users,
+        }
+
+    def run(self, queryset, batch_size=PURGE_BATCH_SIZE):
+        """Purge ``queryset`` batch by batch, yielding a Counter of deleted rows per model after each"""
+        last = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last is not None:
+                batch = batch.filter(pk__gt=last)
+            ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            # Keyset pagination also moves a dry run forward, where nothing is really deleted
+            last = ids[-1]
+            yield self.purge_batch(queryset.model, ids)
+
+    def purge_batch(self, model, ids):
+        self.deleted = Counter()
+        self.statuses = Counter()
+        self.unread = Counter()
+        self.contractor_ids = set()
+        self.user_ids = set()
+        self.images = []
+        try:
+            with transaction.atomic():
+                self.execute(f'CREATE TEMP TABLE IF NOT EXISTS {REINDEX_TABLE} (complaint_id INTEGER PRIMARY KEY)', [])
+                self.process(model, ids)
+                self.finish()
+                if self.dry_run:
+                    raise DryRun
+        except DryRun:
+            pass
+        return self.deleted
+
+    def process(self, model, ids):
+        placeholders = ', '.join(['%s'] * len(ids))
+        self.delete(model, f'{quote(model._meta.pk.column)} IN ({placeholders})', ids)
+
+    def execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def fetch(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def delete(self, model, where, params):
+        """Delete the ``model`` rows matching ``where``, after the rows that depend on them"""
+        table = quote(model._meta.db_table)
+        for relation in cascading_relations(model):
+            related = relation.related_model
+            field = relation.field
+            selects = (
+                f'{quote(field.column)} IN '
+                f'(SELECT {quote(field.target_field.column)} FROM {table} WHERE {where})'
+            )
+            if relation.on_delete is models.CASCADE:
+                self.delete(related, selects, params)
+            elif relation.on_delete is models.SET_NULL:
+                self.execute(
+                    f'UPDATE {quote(related._meta.db_table)} SET {quote(field.column)} = NULL WHERE {selects}',
+                    params,
+                )
+            elif relation.on_delete is not models.DO_NOTHING:
+                raise ValueError(f'Cannot purge {related._meta.label}.{field.name}: {relation.on_delete.__name__}')
+        collect = self.collectors.get(model)
+        if collect:
+            collect(table, where, params)
+        if model._meta.label in THUMBNAIL_FIELDS:
+            self.collect_images(model, table, where, params)
+        deleted = self.execute(f'DELETE FROM {table} WHERE {where}', params)
+        if deleted:
+            self.deleted[model._meta.label] += deleted
+
+    def collect_complaints(self, table, where, params):
+        self.statuses.update(dict(
+            self.fetch(f'SELECT status, COUNT(*) FROM {table} WHERE {where} GROUP BY status', params)
+        ))
+        self.queue_reindex(f'SELECT id FROM {table} WHERE {where}', params)
+
+    def collect_assignments(self, table, where, params):
+        self.contractor_ids.update(
+            pk for pk, in self.fetch(f'SELECT DISTINCT contractor_id FROM {table} WHERE {where}', params)
+        )
+
+    def collect_updates(self, table, where, params):
+        # A complaint that survives its updates still needs their text dropped from the search index
+        self.queue_reindex(f'SELECT complaint_id FROM {table} WHERE {where}', params)
+
+    def queue_reindex(self, select, params):
+        self.execute(f'INSERT INTO {REINDEX_TABLE} (complaint_id) {select} ON CONFLICT DO NOTHING', params)
+
+    def collect_notifications(self, table, where, params):
+        rows = self.fetch(
+            f'SELECT user_id, COUNT(*) FROM {table} WHERE ({where}) AND NOT is_read GROUP BY user_id', params
+        )
+        self.unread.update(dict(rows))
+
+    def collect_users(self, table, where, params):
+        self.user_ids.update(pk for pk, in self.fetch(f'SELECT id FROM {table} WHERE {where}', params))
+
+    def collect_images(self, model, table, where, params):
+        image, thumbnails = (
+            quote(model._meta.get_field(name).column) for name in THUMBNAIL_FIELDS[model._meta.label]
+        )
+        self.images.extend(
+            self.fetch(f"SELECT {image}, {thumbnails} FROM {table} WHERE ({where}) AND {image} != ''", params)
+        )
+
+    def finish(self):
+        """Bring the derived data in line with what the batch deleted"""
+        for status, count in self.statuses.items():
+            record_status_change(status, None, count)
+        notifications.adjust_unread_counts({user_id: -count for user_id, count in self.unread.items()})
+        self.reindex_complaints()
+        for chunk in chunked(self.user_ids):
+            search.unindex_user_emails(chunk)
+        workload.schedule_refresh(self.contractor_ids)
+        self.release_images()
+        if self.deleted:
+            fragments.bump('role:admin', 'role:reporter', 'role:contractor')
+
+    def reindex_complaints(self):
+        """Drop deleted complaints from the search index and rebuild survivors whose updates went"""
+        last = 0
+        while True:
+            ids = [pk for pk, in self.fetch(
+                f'SELECT complaint_id FROM {REINDEX_TABLE} WHERE complaint_id > %s ORDER BY complaint_id LIMIT %s',
+                [last, BULK_CHUNK_SIZE],
+            )]
+            if not ids:
+                break
+            search.index_complaints(ids)
+            last = ids[-1]
+        self.execute(f'DELETE FROM {REINDEX_TABLE}', [])
+
+    def release_images(self):
+        """Drop the deleted rows' blob references; files and thumbnails go after commit"""
+        removed = upload_storage.release_many(name for name, _ in self.images)
+        derivatives = {name: thumbnails for name, thumbnails in self.images if name in removed}
+
+        def delete_thumbnails():
+            for thumbnails in derivatives.values():
+                delete_derivatives(json.loads(thumbnails or '{}'))
+
+        if derivatives:
+            transaction.on_commit(delete_thumbnails)
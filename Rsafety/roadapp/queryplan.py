@@ -0,0 +1,212 @@
+import re
+
+from django.db import connection
+from django.test import Client
+
+# Plan steps that mean the query touches every row or sorts outside an index
+FULL_SCAN = 'SCAN'
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class SQLCapture:
+    """Database execute wrapper that keeps the SELECT statements a request runs"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def capture_view_queries(requests):
+    """Request each ``(url_name, user, url)`` and return ``{url_name: [(sql, params), ...]}``"""
+    captured = {}
+    for name, user, url in requests:
+        client = Client()
+        client.force_login(user)
+        capture = SQLCapture()
+        with connection.execute_wrapper(capture):
+            client.get(url)
+        captured[name] = capture.queries
+    return captured
+
+
+def explain(sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for one statement"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    """Plan steps that read a whole table or sort in a temporary B-tree"""
+    problems = []
+    for step in plan:
+        # Full-text MATCH lookups show up as scans of the FTS5 virtual table
+        if step.startswith(FULL_SCAN) and ' USING ' not in step and 'VIRTUAL TABLE' not in step:
+            problems.append(step)
+        elif step.startswith(TEMP_SORT):
+            problems.append(step)
+    return problems
+
+
+def explain_view_queries(requests):
+    """Capture and explain every SELECT the given views issue"""
+    report = {}
+    for name, queries in capture_view_queries(requests).items():
+        report[name] = []
+        for sql, params in queries:
+            plan = explain(sql, params)
+            report[name].append({'sql': sql, 'plan': plan, 'problems': plan_problems(plan)})
+    return report
+
+
+# "table" alias in FROM/JOIN clauses; Django aliases repeated tables as T2, T3, ...
+TABLE_REFERENCE = re.compile(r'(?:FROM|JOIN)\s+"(\w+)"(?:\s+(T\d+)\b)?')
+# "alias"."column" followed by a comparison, or standing alone as a boolean test
+PREDICATE = re.compile(
+    r'"(\w+)"\."(\w+)"\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b|(?=\)|\s+AND\b|\s+OR\b|\s*$))', re.IGNORECASE
+)
+ORDER_COLUMN = re.compile(r'"(\w+)"\."(\w+)"')
+EQUALITY_OPERATORS = {'=', 'IN', 'IS', ''}
+
+
+def table_aliases(sql):
+    """``{alias: table}`` for every table in ``sql``; an unaliased table is its own alias"""
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(sql):
+        aliases[alias or table] = table
+    return aliases
+
+
+def plan_table(step, sql):
+    """``(alias, table)`` a plan step is about; temporary sorts are charged to the first table"""
+    aliases = table_aliases(sql)
+    match = re.match(r'(?:SCAN|SEARCH) (\w+)', step)
+    if match and match.group(1) in aliases:
+        return match.group(1), aliases[match.group(1)]
+    if step.startswith(TEMP_SORT) and aliases:
+        alias = next(iter(aliases))
+        return alias, aliases[alias]
+    return None, None
+
+
+# Keywords that end a top-level WHERE clause
+CLAUSE_ENDS = (' GROUP BY ', ' HAVING ', ' ORDER BY ', ' LIMIT ')
+
+
+def top_level_clause(sql, keyword, ends=CLAUSE_ENDS):
+    """
+    The text after the top-level ``keyword`` up to the next top-level clause, or ''.
+
+    Parenthesised subqueries and JOIN ... ON conditions do not count, so
+    their WHERE and ORDER BY clauses never stand in for the outer query's.
+    """
+    depth, start, index = 0, None, 0
+    while index < len(sql):
+        char = sql[index]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0:
+            if start is None and sql.startswith(keyword, index):
+                start = index + len(keyword)
+                index = start
+                continue
+            if start is not None and sql.startswith(ends, index):
+                return sql[start:index]
+        index += 1
+    return sql[start:] if start is not None else ''
+
+
+def index_columns(sql, alias, primary_key=None):
+    """
+    Columns of ``alias`` in the order one composite index would serve them.
+
+    Equality tests in the WHERE clause come first, the primary key ahead of
+    the rest, then range comparisons, then the top-level ORDER BY columns: a
+    B-tree can match the equalities, walk the range and hand rows back
+    already sorted only in that order. JOIN ... ON conditions are left out;
+    they are how the other table is reached, not filters on this one.
+    """
+    equality, ranges = [], []
+    for table, column, operator in PREDICATE.findall(top_level_clause(sql, ' WHERE ')):
+        if table != alias:
+            continue
+        target = equality if operator.upper() in EQUALITY_OPERATORS else ranges
+        if column not in equality and column not in ranges:
+            target.append(column)
+    if primary_key in equality:
+        equality.remove(primary_key)
+        equality.insert(0, primary_key)
+    order_by = top_level_clause(sql, ' ORDER BY ', (' LIMIT ',))
+    ordering = [
+        column for table, column in ORDER_COLUMN.findall(order_by)
+        if table == alias and column not in equality and column not in ranges
+    ]
+    return equality + ranges + ordering
+
+
+def primary_key_search(plan, alias):
+    """Whether ``plan`` already looks ``alias`` up by its INTEGER PRIMARY KEY"""
+    return any(
+        step.startswith((f'SEARCH {alias} USING INTEGER PRIMARY KEY', f'SEARCH {alias} USING PRIMARY KEY'))
+        for step in plan
+    )
+
+
+def primary_key(table):
+    """The INTEGER PRIMARY KEY (rowid) column of ``table``, or None"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA table_info({connection.ops.quote_name(table)})')
+        columns = [(name, col_type) for _, name, col_type, _, _, pk in cursor.fetchall() if pk]
+    if len(columns) == 1 and columns[0][1].upper() == 'INTEGER':
+        return columns[0][0]
+    return None
+
+
+def existing_indexes(table):
+    """
+    ``{index name: [columns]}`` of the full (non-partial) indexes on ``table``.
+
+    An INTEGER PRIMARY KEY is the rowid: it counts as an index of its own and
+    trails every other index's columns, since each index entry ends with it.
+    """
+    quote = connection.ops.quote_name
+    rowid_column = primary_key(table)
+    rowid = [rowid_column] if rowid_column else []
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA index_list({quote(table)})')
+        names = [row[1] for row in cursor.fetchall() if not row[4]]
+        indexes = {'PRIMARY KEY': rowid} if rowid else {}
+        for name in names:
+            cursor.execute(f'PRAGMA index_info({quote(name)})')
+            indexes[name] = [row[2] for row in sorted(cursor.fetchall())] + rowid
+    return indexes
+
+
+def suggest_index(sql, step, plan=()):
+    """
+    An index that could replace a problem plan step, as a dict, or None.
+
+    No index is suggested for a table the ``plan`` already reaches through
+    its primary key: at most one row is read, so a temporary sort of it is free.
+    ``covered_by`` names an existing index that already leads with the
+    suggested columns; the planner then skipped it for want of statistics
+    or selectivity, and another index will not help.
+    """
+    alias, table = plan_table(step, sql)
+    if table is None or primary_key_search(plan, alias):
+        return None
+    columns = index_columns(sql, alias, primary_key(table))
+    if not columns:
+        return None
+    covered_by = None
+    for name, indexed in existing_indexes(table).items():
+        if indexed[:len(columns)] == columns:
+            covered_by = name
+            break
+    return {'table': table, 'columns': columns, 'covered_by': covered_by}
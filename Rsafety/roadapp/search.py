@@ -0,0 +1,211 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Complaint, ComplaintUpdate, Contractor
+
+EMAIL_INDEX_TABLE = 'roadapp_useremail_fts'
+COMPLAINT_INDEX_TABLE = 'roadapp_complaint_fts'
+# The trigram tokenizer cannot match anything shorter than three characters
+MIN_TRIGRAM_LENGTH = 3
+SEARCH_RESULT_LIMIT = 50
+# bm25() column weights for title, description, location and update text
+COMPLAINT_RANK_WEIGHTS = (10.0, 4.0, 6.0, 1.0)
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def fts_phrase(term):
+    """Quote ``term`` as a single FTS5 phrase so punctuation in emails is literal"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every word, the last one as a prefix"""
+    words = text.split()
+    if not words:
+        return ''
+    phrases = [fts_phrase(word) for word in words]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def index_user_email(user_id, email):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {EMAIL_INDEX_TABLE} WHERE rowid = %s', [user_id])
+        if email:
+            cursor.execute(f'INSERT INTO {EMAIL_INDEX_TABLE} (rowid, email) VALUES (%s, %s)', [user_id, email])
+
+
+def unindex_user_email(user_id):
+    index_user_email(user_id, None)
+
+
+def index_user_emails(users):
+    """Index users created by ``bulk_create``, which sends no post_save"""
+    rows = [(user.pk, user.email) for user in users if user.email]
+    if not fts_available() or not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {EMAIL_INDEX_TABLE} (rowid, email) VALUES (%s, %s)', rows)
+
+
+def unindex_user_emails(user_ids):
+    user_ids = list(user_ids)
+    if not fts_available() or not user_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {EMAIL_INDEX_TABLE} WHERE rowid IN ({placeholders})', user_ids)
+
+
+def rebuild_email_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {EMAIL_INDEX_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {EMAIL_INDEX_TABLE} (rowid, email) '
+            f'SELECT id, email FROM {User._meta.db_table} WHERE email != %s', ['']
+        )
+
+
+def matching_user_ids(term, limit=SEARCH_RESULT_LIMIT):
+    """IDs of users whose email contains ``term``, newest accounts first"""
+    term = term.strip()
+    if not term:
+        return []
+    if fts_available() and len(term) >= MIN_TRIGRAM_LENGTH:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {EMAIL_INDEX_TABLE} WHERE email MATCH %s ORDER BY rowid DESC LIMIT %s',
+                [fts_phrase(term), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return list(
+        User.objects.filter(email__icontains=term).order_by('-id').values_list('id', flat=True)[:limit]
+    )
+
+
+def email_search(term, limit=SEARCH_RESULT_LIMIT):
+    """
+    Users, contractors and complaints for an email fragment.
+
+    The matching user IDs are resolved once from the email index and reused
+    as an ``IN`` list for the lookups, so no query has to scan or join on
+    ``auth_user.email``. The returned querysets are lazy and capped at ``limit``.
+    """
+    user_ids = matching_user_ids(term, limit)
+    return {
+        'users': User.objects.select_related('contractor').filter(id__in=user_ids).order_by('-id'),
+        'contractors': Contractor.objects.select_related('user').filter(user_id__in=user_ids).order_by('-id')[:limit],
+        'complaints': Complaint.objects.for_admin_list().filter(user_id__in=user_ids).order_by('-id')[:limit],
+    }
+
+
+def _complaint_index_insert(where):
+    complaint_table = Complaint._meta.db_table
+    update_table = ComplaintUpdate._meta.db_table
+    return (
+        f'INSERT INTO {COMPLAINT_INDEX_TABLE} (rowid, title, description, location, updates) '
+        f'SELECT c.id, c.title, c.description, c.location, '
+        f"(SELECT group_concat(u.update_text, ' ') FROM {update_table} u WHERE u.complaint_id = c.id) "
+        f'FROM {complaint_table} c {where}'
+    )
+
+
+def index_complaint(complaint_id):
+    """Refresh one complaint's row, including the text of all its updates"""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMPLAINT_INDEX_TABLE} WHERE rowid = %s', [complaint_id])
+        cursor.execute(_complaint_index_insert('WHERE c.id = %s'), [complaint_id])
+
+
+def index_complaints(complaint_ids):
+    """Refresh the rows of many complaints with one DELETE and one INSERT ... SELECT"""
+    complaint_ids = list(complaint_ids)
+    if not fts_available() or not complaint_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(complaint_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMPLAINT_INDEX_TABLE} WHERE rowid IN ({placeholders})', complaint_ids)
+        cursor.execute(_complaint_index_insert(f'WHERE c.id IN ({placeholders})'), complaint_ids)
+
+
+def unindex_complaint(complaint_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMPLAINT_INDEX_TABLE} WHERE rowid = %s', [complaint_id])
+
+
+def rebuild_complaint_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {COMPLAINT_INDEX_TABLE}')
+        cursor.execute(_complaint_index_insert(''))
+
+
+def complaint_text_filter(text):
+    """icontains fallback used where there is no FTS5 index"""
+    condition = Q()
+    for word in text.split():
+        condition &= Q(title__icontains=word) | Q(description__icontains=word) | Q(location__icontains=word)
+    return condition
+
+
+def complaint_search_count(text):
+    if not fts_available():
+        return Complaint.objects.filter(complaint_text_filter(text)).count() if text.split() else 0
+    query = fts_query(text)
+    if not query:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {COMPLAINT_INDEX_TABLE} WHERE {COMPLAINT_INDEX_TABLE} MATCH %s', [query])
+        return cursor.fetchone()[0]
+
+
+def complaint_search(text, limit=SEARCH_RESULT_LIMIT, offset=0):
+    """
+    Rank complaints for ``text`` with BM25.
+
+    Returns ``(complaint_id, score, snippet)`` tuples in rank order; lower
+    scores are better matches, as bm25() reports them. Matched words in the
+    snippet are wrapped in SNIPPET_START/SNIPPET_END.
+    """
+    if not fts_available():
+        if not text.split():
+            return []
+        rows = Complaint.objects.filter(complaint_text_filter(text)).order_by('-id')
+        return [(pk, 0.0, description[:120]) for pk, description in rows.values_list('id', 'description')[offset:offset + limit]]
+    query = fts_query(text)
+    if not query:
+        return []
+    weights = ', '.join(str(weight) for weight in COMPLAINT_RANK_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, bm25({COMPLAINT_INDEX_TABLE}, {weights}) AS score, '
+            f"snippet({COMPLAINT_INDEX_TABLE}, -1, %s, %s, '...', 12) "
+            f'FROM {COMPLAINT_INDEX_TABLE} WHERE {COMPLAINT_INDEX_TABLE} MATCH %s '
+            f'ORDER BY score LIMIT %s OFFSET %s',
+            [SNIPPET_START, SNIPPET_END, query, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def matching_complaint_ids(text, limit):
+    """IDs of the ``limit`` best-ranked complaints for ``text``"""
+    return [complaint_id for complaint_id, _, _ in complaint_search(text, limit)]
+
+
+def snippet_html(snippet):
+    """Escape a search snippet and turn its match markers into <mark> tags"""
+    html = escape(snippet or '').replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+    return mark_safe(html)
@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from .archive import Archive
+from .models import Complaint, ComplaintAssignment, ComplaintUpdate, Contractor, Notification
+
+
+@contextmanager
+def test_database():
+    """Run the block against a freshly migrated throwaway database"""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+class SeedData:
+    """Rows shared by every seeded batch: one admin, one reporter and one contractor"""
+
+    def __init__(self):
+        # Users are logged in with force_login, so skip the slow password hashing
+        self.admin = User.objects.create(username='budget_admin', email='admin@budget.test', is_staff=True)
+        self.reporter = User.objects.create(username='budget_user', email='user@budget.test')
+        contractor_user = User.objects.create(username='budget_contractor', email='contractor@budget.test')
+        self.contractor = Contractor.objects.create(
+            user=contractor_user, company_name='Budget Roads', phone='0', address='-',
+            specialization='pothole', is_verified=True,
+        )
+        self.complaint = None
+        self.assignment = None
+        self.seeded = 0
+        self.archived = self.archived_complaint()
+
+    def archived_complaint(self):
+        """A completed complaint moved to the archive tables, so detail pages cover the archive fallback"""
+        complaint = Complaint.objects.create(
+            user=self.reporter, title='Archived complaint', description='Seeded', location='Main St',
+            status='completed', complaint_type='pothole',
+        )
+        ComplaintAssignment.objects.create(complaint=complaint, contractor=self.contractor, assigned_by=self.admin)
+        ComplaintUpdate.objects.create(complaint=complaint, contractor=self.contractor, update_text='Done')
+        for _ in Archive().run(Complaint.objects.filter(pk=complaint.pk)):
+            pass
+        return complaint
+
+    def seed(self, rows):
+        """Add ``rows`` complaints, each with an assignment, an update and notifications"""
+        for i in range(self.seeded, self.seeded + rows):
+            other = User.objects.create(username=f'budget_other{i}', email=f'other{i}@budget.test')
+            Contractor.objects.create(
+                user=User.objects.create(username=f'budget_firm{i}', email=f'firm{i}@budget.test'),
+                company_name=f'Firm {i}', phone='0', address='-', specialization='other',
+            )
+            for reporter in (self.reporter, other):
+                complaint = Complaint.objects.create(
+                    user=reporter, title=f'Complaint {i}', description='Seeded', location='Main St',
+                    status='assigned', complaint_type='pothole',
+                )
+                assignment = ComplaintAssignment.objects.create(
+                    complaint=complaint, contractor=self.contractor, assigned_by=self.admin,
+                )
+                ComplaintUpdate.objects.create(complaint=complaint, contractor=self.contractor, update_text='Seeded')
+                Notification.objects.create(
+                    user=reporter, notification_type='assignment', title='Assigned', message='Seeded',
+                    complaint=complaint,
+                )
+                Notification.objects.create(
+                    user=self.contractor.user, notification_type='assignment', title='Assigned',
+                    message='Seeded', complaint=complaint,
+                )
+            if self.complaint is None:
+                self.complaint, self.assignment = complaint, assignment
+            # Keep piling updates onto one complaint so detail pages grow too
+            ComplaintUpdate.objects.create(complaint=self.complaint, contractor=self.contractor, update_text='More')
+        self.seeded += rows
+
+    def requests(self):
+        """(url_name, user, url) for every budgeted view"""
+        admin, reporter, contractor = self.admin, self.reporter, self.contractor.user
+        return [
+            ('home', reporter, reverse('home')),
+            ('admin_dashboard', admin, reverse('admin_dashboard') + '?search_email=budget.test'),
+            ('search_by_email', admin, reverse('search_by_email') + '?email=budget.test'),
+            ('search_complaints', admin, reverse('search_complaints') + '?q=complaint seeded'),
+            ('view_contractors', admin, reverse('view_contractors')),
+            ('assign_contractor', admin, reverse('assign_contractor', args=[self.complaint.id])),
+            ('complaint_detail', admin, reverse('complaint_detail', args=[self.complaint.id])),
+            ('complaint_detail_archived', reporter, reverse('complaint_detail', args=[self.archived.id])),
+            ('user_dashboard', reporter, reverse('user_dashboard')),
+            ('user_notifications', reporter, reverse('user_notifications')),
+            ('contractor_dashboard', contractor, reverse('contractor_dashboard')),
+            ('contractor_notifications', contractor, reverse('contractor_notifications')),
+            ('update_status', contractor, reverse('update_status', args=[self.assignment.id])),
+            ('api_complaints', reporter, reverse('api_complaints')),
+            ('api_assignments', contractor, reverse('api_assignments')),
+            ('api_updates', admin, reverse('api_updates') + f'?complaint_id={self.complaint.id}'),
+            ('api_notifications', reporter, reverse('api_notifications') + '?is_read=false'),
+        ]
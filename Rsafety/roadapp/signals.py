@@ -0,0 +1,205 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import events, fragments, notifications, search, thumbnails, workload
+from .uploads import upload_storage
+from .models import (
+    ArchivedComplaint, ArchivedUpdate, Complaint, ComplaintAssignment, ComplaintUpdate, Contractor, Notification,
+)
+from .stats import forget_verified_contractor_count, record_status_change
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_complaint_status(sender, instance, raw, update_fields, **kwargs):
+    if raw or instance.pk is None or hasattr(instance, '_loaded_status'):
+        return
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    # Instance was built by hand rather than loaded, so read the stored status
+    instance._loaded_status = (
+        sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Complaint)
+def count_complaint_status(sender, instance, created, raw, update_fields, **kwargs):
+    if raw:
+        return
+    if created:
+        record_status_change(None, instance.status)
+    elif update_fields is None or 'status' in update_fields:
+        old_status = getattr(instance, '_loaded_status', None)
+        record_status_change(old_status, instance.status)
+        if old_status != instance.status:
+            workload.complaint_status_changed(instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Complaint)
+def uncount_complaint_status(sender, instance, **kwargs):
+    record_status_change(getattr(instance, '_loaded_status', instance.status), None)
+
+
+@receiver(post_save, sender=Complaint)
+def index_complaint(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and not {'title', 'description', 'location'} & set(update_fields):
+        return
+    search.index_complaint(instance.pk)
+
+
+@receiver(post_delete, sender=Complaint)
+def unindex_complaint(sender, instance, **kwargs):
+    search.unindex_complaint(instance.pk)
+
+
+@receiver(post_save, sender=ComplaintUpdate)
+@receiver(post_delete, sender=ComplaintUpdate)
+def reindex_updated_complaint(sender, instance, **kwargs):
+    search.index_complaint(instance.complaint_id)
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_save, sender=ComplaintUpdate)
+def queue_thumbnails(sender, instance, raw, **kwargs):
+    if not raw and thumbnails.needs_thumbnails(instance):
+        thumbnails.schedule(instance)
+
+
+@receiver(pre_save, sender=Complaint)
+@receiver(pre_save, sender=ComplaintUpdate)
+def remember_image(sender, instance, raw, update_fields, **kwargs):
+    image_field, _ = thumbnails.THUMBNAIL_FIELDS[sender._meta.label]
+    if raw or (update_fields is not None and image_field not in update_fields):
+        return
+    # A new upload is committed to storage, taking a blob reference, during this save
+    instance._image_uploaded = not getattr(instance, image_field)._committed
+    if instance.pk is None or hasattr(instance, '_loaded_image'):
+        return
+    # Instance was built by hand rather than loaded, so read the stored image
+    instance._loaded_image = (
+        sender.objects.filter(pk=instance.pk).values_list(image_field, flat=True).first() or ''
+    )
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_save, sender=ComplaintUpdate)
+def release_replaced_image(sender, instance, raw, update_fields, **kwargs):
+    image_field, thumbnails_field = thumbnails.THUMBNAIL_FIELDS[sender._meta.label]
+    if raw or (update_fields is not None and image_field not in update_fields):
+        return
+    old_name = getattr(instance, '_loaded_image', '')
+    name = getattr(instance, image_field).name or ''
+    instance._loaded_image = name
+    # Re-uploading the same content keeps the name but still took a second reference
+    if old_name and (old_name != name or getattr(instance, '_image_uploaded', False)):
+        if upload_storage.release(old_name):
+            derivatives = getattr(instance, thumbnails_field)
+            if derivatives.get('source') == old_name:
+                transaction.on_commit(lambda: thumbnails.delete_derivatives(derivatives))
+
+
+@receiver(post_delete, sender=Complaint)
+@receiver(post_delete, sender=ComplaintUpdate)
+@receiver(post_delete, sender=ArchivedComplaint)
+@receiver(post_delete, sender=ArchivedUpdate)
+def release_image(sender, instance, **kwargs):
+    image_field, thumbnails_field = thumbnails.THUMBNAIL_FIELDS[sender._meta.label]
+    name = getattr(instance, image_field).name
+    if name and upload_storage.release(name):
+        derivatives = getattr(instance, thumbnails_field)
+        transaction.on_commit(lambda: thumbnails.delete_derivatives(derivatives))
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+def invalidate_complaint_fragments(sender, instance, created=False, **kwargs):
+    scopes = ['role:admin', f'reporter:{instance.user_id}']
+    if not created and kwargs['signal'] is post_save:
+        contractor_ids = ComplaintAssignment.objects.filter(complaint_id=instance.pk).values_list('contractor_id', flat=True)
+        scopes.extend(f'contractor:{contractor_id}' for contractor_id in contractor_ids)
+    fragments.bump(*scopes)
+
+
+@receiver(post_save, sender=ComplaintAssignment)
+@receiver(post_delete, sender=ComplaintAssignment)
+def invalidate_assignment_fragments(sender, instance, **kwargs):
+    reporter_id = Complaint.objects.filter(pk=instance.complaint_id).values_list('user_id', flat=True).first()
+    scopes = ['role:admin', f'contractor:{instance.contractor_id}']
+    if reporter_id is not None:
+        scopes.append(f'reporter:{reporter_id}')
+    fragments.bump(*scopes)
+
+
+@receiver(post_save, sender=ComplaintAssignment)
+@receiver(post_delete, sender=ComplaintAssignment)
+def recount_contractor_workload(sender, instance, raw=False, **kwargs):
+    if not raw:
+        workload.schedule_refresh([instance.contractor_id])
+
+
+@receiver(post_save, sender=ComplaintUpdate)
+@receiver(post_delete, sender=ComplaintUpdate)
+def invalidate_update_fragments(sender, instance, **kwargs):
+    fragments.bump(f'contractor:{instance.contractor_id}')
+
+
+@receiver(post_save, sender=Contractor)
+@receiver(post_delete, sender=Contractor)
+def invalidate_contractor_fragments(sender, instance, **kwargs):
+    fragments.bump('role:admin', f'contractor:{instance.pk}')
+    forget_verified_contractor_count()
+
+
+@receiver(pre_save, sender=Notification)
+def remember_notification_read(sender, instance, raw, update_fields, **kwargs):
+    if raw or instance.pk is None or hasattr(instance, '_loaded_is_read'):
+        return
+    if update_fields is not None and 'is_read' not in update_fields:
+        return
+    instance._loaded_is_read = (
+        sender.objects.filter(pk=instance.pk).values_list('is_read', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, raw, update_fields, **kwargs):
+    if raw:
+        return
+    if created:
+        was_unread = False
+    elif update_fields is None or 'is_read' in update_fields:
+        was_unread = getattr(instance, '_loaded_is_read', None) is False
+    else:
+        return
+    notifications.adjust_unread_counts({instance.user_id: int(not instance.is_read) - int(was_unread)})
+    if created:
+        events.notifications_published([instance.user_id])
+    instance._loaded_is_read = instance.is_read
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_unread_notification(sender, instance, **kwargs):
+    if not getattr(instance, '_loaded_is_read', instance.is_read):
+        notifications.adjust_unread_counts({instance.user_id: -1})
+
+
+@receiver(post_save, sender=User)
+def index_user_email(sender, instance, raw, update_fields, **kwargs):
+    if update_fields is not None and 'email' not in update_fields:
+        return
+    search.index_user_email(instance.pk, instance.email)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user_email(sender, instance, **kwargs):
+    search.unindex_user_email(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_fragments(sender, instance, raw, update_fields, **kwargs):
+    # The admin tables show reporters' and contractors' names and emails
+    if update_fields is not None and not {'username', 'first_name', 'last_name', 'email'} & set(update_fields):
+        return
+    fragments.bump('role:admin')
@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Complaint, ComplaintStatusCount, Contractor
+
+STATUSES = [status for status, _ in Complaint.STATUS_CHOICES]
+VERIFIED_CONTRACTORS_CACHE_KEY = 'stats:verified_contractors'
+# The default cache is per process, so a short timeout bounds how long another
+# process can show a stale count after this one changes a contractor.
+VERIFIED_CONTRACTORS_CACHE_TIMEOUT = 60
+
+
+def aggregate_status_counts(queryset=None):
+    """Count complaints per status with a single conditional-aggregation query"""
+    if queryset is None:
+        queryset = Complaint.objects.all()
+    aggregates = {'total': Count('id')}
+    for status in STATUSES:
+        aggregates[status] = Count('id', filter=Q(status=status))
+    return queryset.aggregate(**aggregates)
+
+
+def complaint_status_counts():
+    """Return the per-status counters plus a total, falling back to a live aggregate"""
+    rows = dict(ComplaintStatusCount.objects.values_list('status', 'count'))
+    if not rows:
+        return aggregate_status_counts()
+    counts = {status: rows.get(status, 0) for status in STATUSES}
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def adjust_status_count(status, delta):
+    if not status or not delta:
+        return
+    if status not in STATUSES:
+        raise ValueError(f'Unknown complaint status: {status!r}')
+    updated = ComplaintStatusCount.objects.filter(status=status).update(count=F('count') + delta)
+    if not updated:
+        counter, created = ComplaintStatusCount.objects.get_or_create(status=status, defaults={'count': delta})
+        if not created:
+            ComplaintStatusCount.objects.filter(pk=counter.pk).update(count=F('count') + delta)
+
+
+def record_status_change(old_status, new_status, count=1):
+    """Move ``count`` complaints from ``old_status`` to ``new_status`` in the counters"""
+    if old_status == new_status:
+        return
+    with transaction.atomic():
+        adjust_status_count(old_status, -count)
+        adjust_status_count(new_status, count)
+
+
+def rebuild_status_counts():
+    """Recompute every counter from the complaints table and return the drift that was fixed"""
+    with transaction.atomic():
+        actual = aggregate_status_counts()
+        stored = dict(ComplaintStatusCount.objects.values_list('status', 'count'))
+        drift = {}
+        for status in STATUSES:
+            if stored.get(status) != actual[status]:
+                drift[status] = (stored.get(status), actual[status])
+                ComplaintStatusCount.objects.update_or_create(status=status, defaults={'count': actual[status]})
+        ComplaintStatusCount.objects.exclude(status__in=STATUSES).delete()
+    return drift
+
+
+def verified_contractor_count():
+    """Verified contractors, served from the cache when possible"""
+    count = cache.get(VERIFIED_CONTRACTORS_CACHE_KEY)
+    if count is None:
+        count = Contractor.objects.filter(is_verified=True).count()
+        cache.set(VERIFIED_CONTRACTORS_CACHE_KEY, count, VERIFIED_CONTRACTORS_CACHE_TIMEOUT)
+    return count
+
+
+def forget_verified_contractor_count():
+    transaction.on_commit(lambda: cache.delete(VERIFIED_CONTRACTORS_CACHE_KEY))
@@ -0,0 +1,49 @@
+from django import template
+
+from roadapp import fragments
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, scopes, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.scopes = scopes
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        scopes = self.scopes.resolve(context)
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        key = fragments.fragment_key(name, scopes, vary_on)
+        html = fragments.cache.get(key)
+        fragments.record(name, html is not None)
+        if html is None:
+            html = self.nodelist.render(context)
+            fragments.cache.set(key, html, fragments.timeout())
+        return html
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Cache a block under the versions of the view's scopes::
+
+        {% cachedfragment "admin_complaints" fragment_scopes request.GET.urlencode %}
+            ...
+        {% endcachedfragment %}
+
+    Bumping any of the scopes (see roadapp.fragments.bump) retires the cached
+    copy; the remaining arguments are extra values the block varies on. Keep
+    per-request tokens such as {% csrf_token %} out of cached blocks.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and a scopes variable")
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(
+        nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(sizes):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in sizes)
+
+
+@register.simple_tag
+def responsive_image(image, thumbnails, alt='', css_class='img-fluid', max_width=300):
+    """
+    ``<picture>`` for an uploaded image that lets the browser pick a derivative.
+
+    WebP and JPEG srcsets come from the thumbnails recorded on the model; until
+    the worker has produced them the original upload is served as before.
+    """
+    style = f'max-width: {max_width}px;'
+    variants = (thumbnails or {}).get('variants') if (thumbnails or {}).get('source') == image.name else None
+    if not variants or not variants.get('jpg'):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="lazy" decoding="async">',
+            image.url, alt, css_class, style,
+        )
+    jpeg = sorted((int(width), name) for width, name in variants['jpg'].items())
+    webp = sorted((int(width), name) for width, name in variants.get('webp', {}).items())
+    fallback = next((name for width, name in jpeg if width >= max_width), jpeg[-1][1])
+    sizes = f'(max-width: {max_width}px) 100vw, {max_width}px'
+    webp_source = format_html(
+        '<source type="image/webp" srcset="{}" sizes="{}">', _srcset(webp), sizes
+    ) if webp else ''
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" style="{}" '
+        'loading="lazy" decoding="async"></picture>',
+        webp_source, default_storage.url(fallback), _srcset(jpeg), sizes, alt, css_class, style,
+    )
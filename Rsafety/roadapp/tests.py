@@ -0,0 +1,1074 @@
+import csv
+import io
+import json
+import random
+import re
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from decimal import Decimal
+from smtplib import SMTPRecipientsRefused
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import bulk, mailer, notifications, thumbnails
+from .autoassign import auto_assign, plan_assignments
+from .bulk import chunked as bulk_chunked
+from .dedup import NUM_PERMUTATIONS, text_signature
+from .fragments import fragment_stats, versions
+from .geo import cell_size, haversine_m
+from .management.commands import explain_queries
+from .middleware import query_budgets
+from .models import (
+    ArchivedComplaint, ArchivedUpdate, Complaint, ComplaintAssignment, ComplaintUpdate, Contractor,
+    ComplaintStatusCount, ContractorWorkload, ImportCheckpoint, MediaBlob, Notification, OutboundEmail,
+    UnreadNotificationCount,
+)
+from .notifications import (
+    UNREAD_CACHE_KEY, NotificationBatch, adjust_unread_counts, notify_transition, unread_count, unread_count_drift,
+)
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .queryplan import index_columns, suggest_index
+from .search import complaint_search, complaint_search_count, matching_user_ids
+from .seeding import SeedData
+from .stats import (
+    aggregate_status_counts, complaint_status_counts, rebuild_status_counts, record_status_change,
+    verified_contractor_count,
+)
+from .uploads import upload_storage
+from .workload import workload_drift
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+    """
+    Every budgeted view stays within query_budgets.json and runs the same
+    number of queries with N and 10N seeded rows.
+
+    QueryBudgetMiddleware raises QueryBudgetExceeded here, so a view over
+    its query count fails the request itself. SQL time is only logged.
+    """
+
+    rows = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = SeedData()
+        cls.data.seed(cls.rows)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+    def measure(self):
+        counts = {}
+        for name, user, url in self.data.requests():
+            self.client.force_login(user)
+            # Every request starts cold, so a budget covers the first visit too
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.get(url)
+            counts[name] = len(queries)
+        return counts
+
+    def budget(self, url):
+        return query_budgets().get(resolve(url.split('?')[0]).url_name)
+
+    def test_every_view_has_a_budget(self):
+        for name, _, url in self.data.requests():
+            self.assertIsNotNone(self.budget(url), name)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small = self.measure()
+        self.data.seed(self.rows * 9)
+        for name, user, url in self.data.requests():
+            with self.subTest(view=name):
+                self.client.force_login(user)
+                cache.clear()
+                with self.assertNumQueries(small[name]):
+                    self.get(url)
+                self.assertLessEqual(small[name], self.budget(url)['queries'])
+
+
+class StatusCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reporter = User.objects.create(username='stats_reporter')
+        self.complaint = Complaint.objects.create(
+            user=self.reporter, title='Faded crossing', description='Paint gone', location='Stats Rd',
+            complaint_type='other',
+        )
+
+    def test_counters_follow_create_transition_and_delete(self):
+        self.assertEqual(complaint_status_counts()['pending'], 1)
+        self.complaint.status = 'verified'
+        self.complaint.save(update_fields=['status', 'updated_at'])
+        # A freshly loaded instance moves the counters from its stored status too
+        reloaded = Complaint.objects.get(pk=self.complaint.pk)
+        reloaded.status = 'rejected'
+        reloaded.save()
+        counts = complaint_status_counts()
+        self.assertEqual((counts['pending'], counts['verified'], counts['rejected'], counts['total']), (0, 0, 1, 1))
+        Complaint.objects.get(pk=self.complaint.pk).delete()
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+        self.assertEqual(complaint_status_counts()['total'], 0)
+
+    def test_rebuild_repairs_drift(self):
+        ComplaintStatusCount.objects.filter(status='pending').update(count=7)
+        ComplaintStatusCount.objects.create(status='gone', count=3)
+        self.assertEqual(rebuild_status_counts()['pending'], (7, 1))
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+        self.assertFalse(ComplaintStatusCount.objects.filter(status='gone').exists())
+        self.assertEqual(rebuild_status_counts(), {})
+
+    def test_verified_contractor_count_is_cached_until_a_contractor_changes(self):
+        contractor = Contractor.objects.create(
+            user=User.objects.create(username='stats_firm'), company_name='Stats Roads', phone='0', address='-',
+            specialization='other',
+        )
+        self.assertEqual(verified_contractor_count(), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(verified_contractor_count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            contractor.is_verified = True
+            contractor.save()
+        self.assertEqual(verified_contractor_count(), 1)
+
+
+class ExplainQueriesTests(TestCase):
+    # The test database stands in for the command's own throwaway one
+    @mock.patch.object(explain_queries, 'test_database', nullcontext)
+    def test_before_drops_later_indexes_only_for_the_comparison(self):
+        out = io.StringIO()
+        call_command('explain_queries', '--rows', '2', '--before', '0002', stdout=out)
+        before, after = map(int, re.search(r'(\d+) before, (\d+) after', out.getvalue()).groups())
+        self.assertGreater(before, after)
+        self.assertIn('roadapp_unreadnotificationcount did not exist yet', out.getvalue())
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, 'roadapp_complaint')
+        self.assertIn('complaint_created_idx', indexes)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        reporter = User.objects.create(username='keyset_reporter')
+        for i in range(5):
+            Complaint.objects.create(
+                user=reporter, title=f'Pothole {i}', description='Deep', location='Keyset Rd', complaint_type='pothole',
+            )
+        # One timestamp for every row, so only the id tiebreak orders them
+        self.created_at = timezone.now().replace(microsecond=123456)
+        Complaint.objects.update(created_at=self.created_at)
+        self.paginator = KeysetPaginator(Complaint.objects.all(), page_size=2)
+        self.ids = list(Complaint.objects.order_by('-id').values_list('id', flat=True))
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(self.created_at, 42)), (self.created_at, 42))
+        self.assertIsNone(decode_cursor('not a cursor'))
+
+    def test_pages_with_equal_timestamps_neither_skip_nor_repeat_rows(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(after=pages[-1].next_cursor))
+        self.assertEqual([[c.id for c in page] for page in pages], [self.ids[0:2], self.ids[2:4], self.ids[4:]])
+        self.assertFalse(pages[0].has_previous())
+
+        # Walking back from the last page returns the same pages in reverse
+        back = self.paginator.page(before=pages[-1].previous_cursor)
+        self.assertEqual([c.id for c in back], self.ids[2:4])
+        first = self.paginator.page(before=back.previous_cursor)
+        self.assertEqual([c.id for c in first], self.ids[0:2])
+        self.assertFalse(first.has_previous())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.reporter = User.objects.create(username='search_reporter', email='ann.lee@example.org')
+        self.in_title = Complaint.objects.create(
+            user=self.reporter, title='Flooded underpass', description='Water after rain', location='Low Rd',
+            complaint_type='other',
+        )
+        self.in_description = Complaint.objects.create(
+            user=self.reporter, title='Drain problem', description='The underpass drain overflows', location='Low Rd',
+            complaint_type='other',
+        )
+
+    def ids(self, text):
+        return [complaint_id for complaint_id, _, _ in complaint_search(text)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.ids('underpass'), [self.in_title.pk, self.in_description.pk])
+        # The last word is a prefix
+        self.assertEqual(self.ids('flooded under'), [self.in_title.pk])
+
+    def test_edits_and_deletes_reach_the_index(self):
+        self.in_title.description = 'Standing water near the culvert'
+        self.in_title.save(update_fields=['description'])
+        self.assertEqual(self.ids('culvert'), [self.in_title.pk])
+        self.in_title.title = 'Flooded subway'
+        self.in_title.save(update_fields=['title'])
+        self.assertEqual(self.ids('underpass'), [self.in_description.pk])
+        self.assertEqual(self.ids('subway'), [self.in_title.pk])
+        self.in_description.delete()
+        self.assertEqual(self.ids('drain'), [])
+        self.assertEqual(complaint_search_count('low'), 1)
+
+    def test_email_changes_and_deletes_reach_the_index(self):
+        self.assertEqual(matching_user_ids('lee@exa'), [self.reporter.pk])
+        self.reporter.email = 'ann.smith@example.org'
+        self.reporter.save(update_fields=['email'])
+        self.assertEqual(matching_user_ids('lee@exa'), [])
+        self.assertEqual(matching_user_ids('smith@'), [self.reporter.pk])
+        self.reporter.delete()
+        self.assertEqual(matching_user_ids('smith@'), [])
+
+    def test_email_search_view_runs_a_fixed_number_of_queries(self):
+        admin = User.objects.create(username='search_admin', is_staff=True, email='admin@example.net')
+        self.client.force_login(admin)
+        url = reverse('search_by_email')
+        for i in range(5):
+            user = User.objects.create(username=f'search_firm{i}', email=f'firm{i}@example.org')
+            Contractor.objects.create(
+                user=user, company_name=f'Firm {i}', phone='0', address='-', specialization='other',
+            )
+        # Session, user, unread badge, the index lookup, then one query each for users, contractors and complaints
+        cache.clear()
+        with self.assertNumQueries(7), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'email': 'example.org'})
+        self.assertEqual(len(response.context['results']['users']), 6)
+        self.assertFalse([q for q in queries if 'LIKE' in q['sql']])
+        cache.clear()
+        with self.assertNumQueries(7):
+            self.client.get(url, {'email': 'ann.lee'})
+
+    def test_fts_syntax_in_the_query_is_literal(self):
+        for text in ['"underpass', 'underpass AND', 'NOT drain', 'under* (pass', 'title:drain', '   ', '^', '"']:
+            with self.subTest(text=text):
+                complaint_search(text)
+                complaint_search_count(text)
+                matching_user_ids(text)
+        self.assertEqual(self.ids('NOT drain'), [])
+        self.assertEqual(matching_user_ids('"ann'), [])
+        # Too short for the trigram index, so the icontains fallback answers
+        self.assertEqual(matching_user_ids('nn'), [self.reporter.pk])
+
+
+class GeoQueryTests(TestCase):
+    def setUp(self):
+        reporter = User.objects.create(username='geo_reporter')
+        # Edges of the precision-6 geohash cell around (12.97, 77.59), where prefix pruning could slip
+        lat_step, lon_step = cell_size(6)
+        self.edge_lat = (12.97 // lat_step + 1) * lat_step
+        self.edge_lon = (77.59 // lon_step + 1) * lon_step
+        offsets = [-0.003, -0.000002, -0.000001, 0, 0.000001, 0.000002, 0.003]
+        for lat_offset in offsets:
+            for lon_offset in offsets:
+                Complaint.objects.create(
+                    user=reporter, title='Pothole', description='Deep', location='Geo Rd', complaint_type='pothole',
+                    latitude=Decimal(f'{self.edge_lat + lat_offset:.6f}'),
+                    longitude=Decimal(f'{self.edge_lon + lon_offset:.6f}'),
+                )
+        self.points = {
+            pk: (float(lat), float(lon)) for pk, lat, lon in Complaint.objects.values_list('id', 'latitude', 'longitude')
+        }
+
+    def test_bbox_matches_brute_force(self):
+        boxes = [
+            (self.edge_lat, self.edge_lon, self.edge_lat + 0.01, self.edge_lon + 0.01),
+            (self.edge_lat - 0.01, self.edge_lon - 0.01, self.edge_lat, self.edge_lon),
+            (self.edge_lat - 0.000001, self.edge_lon - 0.000001, self.edge_lat + 0.000001, self.edge_lon + 0.000001),
+            (self.edge_lat - 0.5, self.edge_lon - 0.5, self.edge_lat + 0.5, self.edge_lon + 0.5),
+        ]
+        for south, west, north, east in boxes:
+            with self.subTest(box=(south, west, north, east)):
+                expected = {
+                    pk for pk, (lat, lon) in self.points.items() if south <= lat <= north and west <= lon <= east
+                }
+                self.assertTrue(expected)
+                found = set(Complaint.objects.within_bbox(south, west, north, east).values_list('id', flat=True))
+                self.assertEqual(found, expected)
+
+    def test_near_matches_brute_force(self):
+        for radius_m in [0.1, 0.25, 50, 400]:
+            with self.subTest(radius_m=radius_m):
+                distances = {
+                    pk: haversine_m(self.edge_lat, self.edge_lon, lat, lon) for pk, (lat, lon) in self.points.items()
+                }
+                expected = {pk for pk, distance in distances.items() if distance <= radius_m}
+                found = list(Complaint.objects.near(self.edge_lat, self.edge_lon, radius_m))
+                self.assertEqual({complaint.pk for complaint in found}, expected)
+                for complaint in found:
+                    self.assertAlmostEqual(complaint.distance, distances[complaint.pk], places=3)
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        self.reporter = User.objects.create(username='dedup_reporter')
+        self.client.force_login(self.reporter)
+
+    def submit(self, title, description, **fields):
+        data = {
+            'title': title, 'description': description, 'location': 'Dedup Rd', 'complaint_type': 'pothole',
+            'priority': 'medium', 'latitude': '12.971600', 'longitude': '77.594600', **fields,
+        }
+        response = self.client.post(reverse('post_complaint'), data)
+        self.assertRedirects(response, reverse('user_dashboard'), fetch_redirect_response=False)
+        return Complaint.objects.latest('id')
+
+    def test_near_duplicate_is_linked_on_submit(self):
+        original = self.submit('Huge pothole near the bus stop', 'A deep pothole is damaging car tyres every day')
+        duplicate = self.submit('Huge pothole near the bus stop!', 'A deep pothole is damaging car tyres every day.')
+        self.assertEqual((duplicate.status, duplicate.duplicate_of_id), ('duplicate', original.pk))
+
+        other = self.submit('Streetlight out', 'The lamp at the corner has been dark for a week')
+        self.assertEqual((other.status, other.duplicate_of_id), ('pending', None))
+        # Too far away to be the same pothole
+        distant = self.submit(
+            'Huge pothole near the bus stop', 'A deep pothole is damaging car tyres every day', latitude='12.990000',
+        )
+        self.assertIsNone(distant.duplicate_of_id)
+
+    def test_long_description_is_signed_within_the_submission_budget(self):
+        words = [f'{word}{i}' for i, word in enumerate(['rut', 'drain', 'kerb', 'verge', 'culvert'] * 4000)]
+        description = ' '.join(words)
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            signature = text_signature('Collapsed road edge', description)
+            timings.append(time.perf_counter() - started)
+        # Best of five, so a busy machine does not fail it; the submission budget is 20 ms
+        self.assertLess(min(timings), 0.02)
+        self.assertEqual(len(signature), NUM_PERMUTATIONS * 8)
+        # Only the start of the text is signed, so a tail edit does not change it
+        self.assertEqual(signature, text_signature('Collapsed road edge', description + ' more'))
+
+
+class ApiConditionalGetTests(TestCase):
+    def setUp(self):
+        self.reporter = User.objects.create(username='api_reporter')
+        self.complaint = Complaint.objects.create(
+            user=self.reporter, title='Missing sign', description='Gone', location='Api Rd', complaint_type='other',
+        )
+        self.client.force_login(self.reporter)
+
+    def test_matching_etag_answers_304_until_the_collection_changes(self):
+        response = self.client.get(reverse('api_complaints'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.complaint.pk])
+        etag = response['ETag']
+
+        response = self.client.get(reverse('api_complaints'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        self.complaint.title = 'Missing stop sign'
+        self.complaint.save()
+        response = self.client.get(reverse('api_complaints'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reporter = User.objects.create(username='fragment_reporter')
+        self.client.force_login(self.reporter)
+
+    def dashboard(self):
+        response = self.client.get(reverse('user_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_miss_hit_bump_miss(self):
+        self.dashboard()
+        self.assertEqual(fragment_stats()['user_stats'], {'hits': 0, 'misses': 1, 'hit_rate': 0.0})
+        self.assertNotContains(self.dashboard(), 'Cracked lane')
+        self.assertEqual(fragment_stats()['user_stats'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+        # A new complaint bumps the reporter's scope once its transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Complaint.objects.create(
+                user=self.reporter, title='Cracked lane', description='Wide crack', location='Fragment Rd',
+                complaint_type='other',
+            )
+        self.assertContains(self.dashboard(), 'Cracked lane')
+        self.assertEqual(fragment_stats()['user_stats'], {'hits': 1, 'misses': 2, 'hit_rate': 0.333})
+
+
+class ImageReplacementTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name, THUMBNAIL_ASYNC=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.reporter = User.objects.create(username='image_reporter')
+
+    def png(self, colour, size=(8, 8)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, colour).save(buffer, 'PNG')
+        return SimpleUploadedFile(f'{colour}.png', buffer.getvalue(), content_type='image/png')
+
+    def test_thumbnails_are_generated_and_removed_with_the_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(
+                user=self.reporter, title='Sunken drain', description='Cover low', location='Image Rd',
+                complaint_type='other', image=self.png('green', (700, 350)),
+            )
+        complaint = Complaint.objects.get(pk=complaint.pk)
+        thumbnails = complaint.image_thumbnails
+        # Widths at or above the original's are skipped
+        self.assertEqual(thumbnails['width'], 700)
+        self.assertEqual(
+            {extension: sorted(sizes) for extension, sizes in thumbnails['variants'].items()},
+            {'webp': ['320', '640'], 'jpg': ['320', '640']},
+        )
+        names = [name for sizes in thumbnails['variants'].values() for name in sizes.values()]
+        with default_storage.open(thumbnails['variants']['jpg']['320']) as derivative:
+            self.assertEqual(Image.open(derivative).size, (320, 160))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=1024)
+    def test_complaint_view_caps_image_uploads_and_keeps_csrf(self):
+        noise = Image.frombytes('RGB', (64, 64), random.Random(0).randbytes(64 * 64 * 3))
+        buffer = io.BytesIO()
+        noise.save(buffer, 'PNG')
+        form = {
+            'title': 'Cracked kerb', 'description': 'Broken edge', 'location': 'Image Rd', 'complaint_type': 'other',
+            'priority': 'low', 'image': SimpleUploadedFile('noise.png', buffer.getvalue(), content_type='image/png'),
+        }
+        self.client.force_login(self.reporter)
+        response = self.client.post(reverse('post_complaint'), form)
+        self.assertContains(response, 'The image is larger than 1.0')
+        self.assertFalse(Complaint.objects.exists())
+        form['image'] = self.png('red')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse('post_complaint'), form).status_code, 302)
+        self.assertTrue(Complaint.objects.get().image.name.startswith('blobs/'))
+
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reporter)
+        form['image'] = self.png('blue')
+        self.assertEqual(client.post(reverse('post_complaint'), form).status_code, 403)
+
+    def test_stored_thumbnails_invalidate_the_dashboards(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(
+                user=self.reporter, title='Bent railing', description='Hit by van', location='Image Rd',
+                complaint_type='other', image=self.png('white'),
+            )
+        scopes = ['role:admin', f'reporter:{self.reporter.pk}']
+        before = versions(scopes)
+        Complaint.objects.filter(pk=complaint.pk).update(image_thumbnails={})
+        with self.captureOnCommitCallbacks(execute=True):
+            thumbnails.process('roadapp.Complaint', complaint.pk)
+        self.assertTrue(Complaint.objects.get(pk=complaint.pk).image_thumbnails['variants'])
+        self.assertTrue(all(after > old for after, old in zip(versions(scopes), before)))
+
+    def test_replacing_an_image_releases_the_old_blob(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(
+                user=self.reporter, title='Faded line', description='Paint gone', location='Image Rd',
+                complaint_type='other', image=self.png('red'),
+            )
+        complaint = Complaint.objects.get(pk=complaint.pk)
+        old_name = complaint.image.name
+        self.assertTrue(complaint.image_thumbnails['variants'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.image = self.png('blue')
+            complaint.save()
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(upload_storage.exists(old_name))
+        self.assertEqual(MediaBlob.objects.get(name=complaint.image.name).ref_count, 1)
+
+        # The same content uploaded again keeps one reference
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.image = self.png('blue')
+            complaint.save()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertTrue(upload_storage.exists(complaint.image.name))
+
+
+class QueryPlanTests(TestCase):
+    JOINED = (
+        'SELECT "roadapp_complaint"."id", "auth_user"."id", T3."id" FROM "roadapp_complaint" '
+        'INNER JOIN "auth_user" ON ("roadapp_complaint"."user_id" = "auth_user"."id") '
+        'LEFT OUTER JOIN "auth_user" T3 ON ("roadapp_complaint"."verified_by_id" = T3."id") '
+        'WHERE {where} ORDER BY "roadapp_complaint"."{order}" ASC LIMIT 1'
+    )
+
+    def test_join_conditions_are_not_filters(self):
+        sql = self.JOINED.format(where='"roadapp_complaint"."complaint_type" = %s', order='priority')
+        self.assertEqual(
+            suggest_index(sql, 'SCAN roadapp_complaint'),
+            {'table': 'roadapp_complaint', 'columns': ['complaint_type', 'priority'], 'covered_by': None},
+        )
+
+    def test_primary_key_lookup_needs_no_index(self):
+        sql = self.JOINED.format(
+            where='("roadapp_complaint"."user_id" = %s AND "roadapp_complaint"."id" = %s)', order='id',
+        )
+        self.assertEqual(index_columns(sql, 'roadapp_complaint', 'id'), ['id', 'user_id'])
+        plan = [
+            'SEARCH roadapp_complaint USING INTEGER PRIMARY KEY (rowid=?)',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'SEARCH T3 USING INTEGER PRIMARY KEY (rowid=?) LEFT-JOIN',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertIsNone(suggest_index(sql, plan[-1], plan))
+
+
+class CountingBackend(locmem.EmailBackend):
+    """locmem backend that counts the connections opened through it"""
+
+    opened = 0
+
+    def open(self):
+        type(self).opened += 1
+        return super().open()
+
+
+class RefusingBackend(locmem.EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPRecipientsRefused({'to@example.test': (550, b'No such user')})
+
+
+class OutboxTests(TestCase):
+    def queue(self, count):
+        return [mailer.enqueue_mail(f'Subject {i}', 'Body', f'to{i}@example.test') for i in range(count)]
+
+    def test_forgot_password_only_enqueues(self):
+        User.objects.create(username='forgetful', email='forgetful@example.test')
+        response = self.client.post(reverse('forgot_password'), {'email': 'forgetful@example.test'})
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboundEmail.objects.get().to, ['forgetful@example.test'])
+
+    def test_workers_never_claim_the_same_message(self):
+        self.queue(3)
+        first = mailer.claim_batch(2)
+        second = mailer.claim_batch(2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({email.pk for email in first} & {email.pk for email in second})
+        self.assertEqual(mailer.claim_batch(2), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        email, = self.queue(1)
+        claimed, = mailer.claim_batch()
+        self.assertEqual(mailer.claim_batch(), [])
+        # The worker holding the lease died without sending or rescheduling
+        OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        reclaimed, = mailer.claim_batch()
+        self.assertEqual(reclaimed.pk, email.pk)
+        self.assertNotEqual(reclaimed.lease, claimed.lease)
+
+    @override_settings(EMAIL_BACKEND='roadapp.tests.CountingBackend')
+    def test_batch_is_sent_over_one_connection(self):
+        self.queue(3)
+        CountingBackend.opened = 0
+        self.assertEqual(mailer.send_batch(), (3, 0))
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+
+    @override_settings(EMAIL_BACKEND='roadapp.tests.CountingBackend')
+    def test_display_names_with_commas_survive_the_queue(self):
+        recipients = ['"Lee, Ann" <ann@example.test>', 'bob@example.test']
+        mailer.enqueue_mail('Subject', 'Body', recipients)
+        self.assertEqual(mailer.send_batch(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, recipients)
+
+    def test_retry_delay_doubles_up_to_an_hour(self):
+        self.assertEqual(
+            [mailer.retry_delay(attempts) for attempts in range(1, 9)],
+            [timedelta(minutes=minutes) for minutes in (1, 2, 4, 8, 16, 32, 60, 60)],
+        )
+
+    @override_settings(EMAIL_BACKEND='roadapp.tests.RefusingBackend')
+    def test_failure_is_rescheduled_with_backoff(self):
+        email, = self.queue(1)
+        before = timezone.now()
+        with self.assertLogs('roadapp.mailer', 'WARNING'):
+            self.assertEqual(mailer.send_batch(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.lease), ('queued', 1, ''))
+        self.assertIn('SMTPRecipientsRefused', email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, before + mailer.retry_delay(1))
+        self.assertEqual(mailer.claim_batch(), [])
+
+    @override_settings(EMAIL_BACKEND='roadapp.tests.RefusingBackend')
+    def test_message_fails_after_max_attempts(self):
+        email, = self.queue(1)
+        OutboundEmail.objects.filter(pk=email.pk).update(attempts=mailer.MAX_ATTEMPTS - 1)
+        with self.assertLogs('roadapp.mailer', 'WARNING'):
+            self.assertEqual(mailer.send_batch(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', mailer.MAX_ATTEMPTS))
+        self.assertEqual(mailer.send_queued(), (0, 0))
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='archive_admin', is_staff=True)
+        self.reporter = User.objects.create(username='archive_reporter')
+        self.contractor = Contractor.objects.create(
+            user=User.objects.create(username='archive_firm'), company_name='Archive Roads', phone='0',
+            address='-', specialization='pothole', is_verified=True,
+        )
+        self.complaint = Complaint.objects.create(
+            user=self.reporter, title='Resurfaced lane', description='Fixed long ago', location='Old Rd',
+            status='completed', complaint_type='pothole',
+        )
+        ComplaintAssignment.objects.create(complaint=self.complaint, contractor=self.contractor, assigned_by=self.admin)
+        ComplaintUpdate.objects.create(complaint=self.complaint, contractor=self.contractor, update_text='Resurfaced')
+
+    def export(self, name):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_data', args=[name]))
+        self.assertEqual(response.status_code, 200)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_archive_detail_export_round_trip(self):
+        call_command('archive_complaints', days=0, stdout=io.StringIO())
+        self.assertFalse(Complaint.objects.filter(pk=self.complaint.pk).exists())
+        self.assertEqual(ArchivedComplaint.objects.get().pk, self.complaint.pk)
+
+        self.client.force_login(self.reporter)
+        response = self.client.get(reverse('complaint_detail', args=[self.complaint.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertContains(response, 'Resurfaced lane')
+        self.assertContains(response, 'Resurfaced')
+
+        complaint, = self.export('archived_complaints')
+        self.assertEqual((complaint['id'], complaint['title']), (str(self.complaint.pk), 'Resurfaced lane'))
+        assignment, = self.export('archived_assignments')
+        self.assertEqual(assignment['complaint_id'], str(self.complaint.pk))
+        update, = self.export('archived_updates')
+        self.assertEqual(update['update_text'], 'Resurfaced')
+        self.assertEqual(self.export('complaints'), [])
+        self.assertEqual(ArchivedUpdate.objects.get().complaint_id, self.complaint.pk)
+
+
+class BulkTransitionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='bulk_admin', is_staff=True)
+        self.reporter = User.objects.create(username='bulk_reporter')
+        self.contractor = Contractor.objects.create(
+            user=User.objects.create(username='bulk_firm'), company_name='Bulk Roads', phone='0',
+            address='-', specialization='pothole', is_verified=True,
+        )
+        self.complaints = [
+            Complaint.objects.create(
+                user=self.reporter, title=f'Pothole {i}', description='Deep', location=f'{i} Bulk St',
+                complaint_type='pothole',
+            )
+            for i in range(5)
+        ]
+        self.ids = [complaint.pk for complaint in self.complaints]
+
+    def transition(self, ids, action, **kwargs):
+        # Chunks of two, so five complaints take three UPDATEs
+        with mock.patch.object(bulk, 'chunked', lambda ids: bulk_chunked(ids, 2)), \
+                self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            changed = bulk.bulk_transition(ids, action, self.admin, **kwargs)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "roadapp_complaint"')]
+        return changed, len(updates)
+
+    def test_chunks_skip_ineligible_complaints(self):
+        Complaint.objects.filter(pk=self.ids[0]).update(status='rejected')
+        record_status_change('pending', 'rejected')
+        self.assertEqual(self.transition(self.ids, 'verify'), (4, 3))
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+        self.assertEqual(complaint_status_counts()['verified'], 4)
+        self.assertEqual(
+            Notification.objects.filter(user=self.reporter, notification_type='verification').count(), 4,
+        )
+
+    def test_assign_keeps_counters_and_workload(self):
+        self.transition(self.ids, 'verify')
+        self.assertEqual(self.transition(self.ids, 'assign', contractor=self.contractor), (5, 3))
+        self.assertEqual(ComplaintAssignment.objects.filter(contractor=self.contractor).count(), 5)
+        self.assertEqual(complaint_status_counts()['assigned'], 5)
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+        self.assertEqual(ContractorWorkload.objects.get(contractor=self.contractor).assigned, 5)
+        self.assertEqual(Notification.objects.filter(user=self.contractor.user, notification_type='assignment').count(), 5)
+        self.assertEqual(self.transition(self.ids, 'assign', contractor=self.contractor), (0, 0))
+
+    def test_message_counts_ineligible_complaints(self):
+        Complaint.objects.filter(pk=self.ids[0]).update(status='verified')
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('bulk_complaint_action'), {'action': 'verify', 'ids': self.ids}, follow=True,
+        )
+        self.assertContains(response, '4 complaint(s) verified. 1 skipped because they were not pending.')
+
+
+class AutoAssignTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='auto_admin', is_staff=True)
+        self.reporter = User.objects.create(username='auto_reporter')
+        self.contractor = Contractor.objects.create(
+            user=User.objects.create(username='auto_firm'), company_name='Auto Roads', phone='0',
+            address='-', specialization='pothole', is_verified=True,
+        )
+        self.complaints = [
+            Complaint.objects.create(
+                user=self.reporter, title=f'Pothole {i}', description='Deep', location=f'{i} Auto St',
+                complaint_type='pothole', status='verified',
+            )
+            for i in range(4)
+        ]
+
+    def test_plan_evens_out_load_and_respects_capacity(self):
+        now = timezone.now()
+        backlog = [(i, 'pothole', 'low', now + timedelta(minutes=i)) for i in range(1, 7)]
+        backlog.append((7, 'pothole', 'urgent', now + timedelta(days=1)))
+        # The least-loaded specialist takes each complaint, most urgent first, until the loads are level
+        plan = plan_assignments(backlog, {10: {'pothole'}, 11: {'pothole'}}, {10: 0, 11: 3})
+        self.assertEqual(plan[10][0], 7)
+        self.assertEqual((len(plan[10]), len(plan[11])), (5, 2))
+        # Full specialists fall back to anyone with room; what nobody has room for stays unplanned
+        contractors = {10: {'pothole'}, 11: {'pothole'}, 12: set()}
+        plan = plan_assignments(backlog, contractors, {10: 0, 11: 3, 12: 1}, max_active=3)
+        self.assertEqual({contractor_id: len(ids) for contractor_id, ids in plan.items()}, {10: 3, 12: 2})
+        self.assertEqual(plan[10], [7, 1, 2])
+
+    def test_plan_is_written_set_based_with_counters_kept(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_transition(self.complaints[0], 'assigned', actor=self.admin)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            plan = auto_assign(self.admin)
+        self.assertEqual(plan, {self.contractor.pk: [complaint.pk for complaint in self.complaints]})
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "roadapp_complaintassignment"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ComplaintAssignment.objects.filter(contractor=self.contractor, assigned_by=self.admin).count(), 4)
+        self.assertEqual(Complaint.objects.filter(status='assigned').count(), 4)
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+        self.assertEqual(ContractorWorkload.objects.get(contractor=self.contractor).assigned, 4)
+        # The reporter already had an unread notice for the first complaint, so it is not repeated
+        self.assertEqual(Notification.objects.filter(user=self.reporter, title='Contractor assigned').count(), 4)
+        self.assertEqual(
+            Notification.objects.get(user=self.contractor.user, complaint=self.complaints[1]).message,
+            'You have been assigned "Pothole 1" at 1 Auto St.',
+        )
+        self.assertEqual(unread_count_drift(), {})
+
+    def test_complaints_no_longer_verified_are_skipped(self):
+        Complaint.objects.filter(pk=self.complaints[0].pk).update(status='rejected')
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch('roadapp.autoassign.plan_assignments', return_value={
+                    self.contractor.pk: [complaint.pk for complaint in self.complaints],
+                }):
+            auto_assign(self.admin)
+        self.assertFalse(ComplaintAssignment.objects.filter(complaint=self.complaints[0]).exists())
+        self.assertEqual(ComplaintAssignment.objects.count(), 3)
+        self.assertEqual(Complaint.objects.get(pk=self.complaints[0].pk).status, 'rejected')
+        self.assertEqual(Notification.objects.filter(user=self.contractor.user).count(), 3)
+
+
+class WorkloadTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='workload_admin', is_staff=True)
+        self.contractor = Contractor.objects.create(
+            user=User.objects.create(username='workload_firm'), company_name='Load Roads', phone='0',
+            address='-', specialization='pothole', is_verified=True,
+        )
+        self.complaint = Complaint.objects.create(
+            user=User.objects.create(username='workload_reporter'), title='Pothole', description='Deep',
+            location='Load Rd', complaint_type='pothole', status='assigned',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment = ComplaintAssignment.objects.create(
+                complaint=self.complaint, contractor=self.contractor, assigned_by=self.admin,
+            )
+
+    def counters(self):
+        workload = ContractorWorkload.objects.get(contractor=self.contractor)
+        return workload.active, workload.assigned, workload.in_progress
+
+    def test_counters_follow_status_changes_and_assignment_deletes(self):
+        self.assertEqual(self.counters(), (1, 1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complaint.status = 'in_progress'
+            self.complaint.save(update_fields=['status', 'updated_at'])
+        self.assertEqual(self.counters(), (1, 0, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment.delete()
+        self.assertEqual(self.counters(), (0, 0, 0))
+        self.assertEqual(workload_drift(), {})
+
+    def test_contractor_may_set_any_status_the_form_offers(self):
+        self.client.force_login(self.contractor.user)
+        url = reverse('update_status', args=[self.assignment.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'status': 'in_progress'})
+            self.client.post(url, {'status': 'assigned'})
+        self.assertEqual(Complaint.objects.get(pk=self.complaint.pk).status, 'assigned')
+        self.assertEqual(self.counters(), (1, 1, 0))
+        self.assertRedirects(self.client.post(url, {'status': 'bogus'}), url)
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+
+
+@mock.patch.object(notifications, 'IN_CHUNK_SIZE', 2)
+class NotificationBatchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='batch_admin', is_staff=True)
+        self.reporter = User.objects.create(username='batch_reporter')
+        self.complaints = [
+            Complaint.objects.create(
+                user=self.reporter, title=f'Broken sign {i}', description='Bent', location='Batch Rd',
+                complaint_type='other', status='verified',
+            )
+            for i in range(5)
+        ]
+
+    def test_batch_is_deduplicated_and_flushed_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_transition(self.complaints[0], actor=self.admin)
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            with NotificationBatch(self.admin) as batch:
+                for complaint in self.complaints:
+                    batch.add(complaint)
+                # Queued twice, written once
+                batch.add(self.complaints[1])
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(callbacks), 1)
+        with CaptureQueriesContext(connection) as queries:
+            callbacks[0]()
+        # Five keys in chunks of two: three unread checks
+        checks = [q for q in queries if q['sql'].startswith('SELECT "roadapp_notification"."user_id"')]
+        self.assertEqual(len(checks), 3)
+        self.assertEqual(Notification.objects.filter(user=self.reporter, title='Complaint verified').count(), 5)
+        self.assertEqual(unread_count_drift(), {})
+
+    def test_unread_counters_are_updated_in_chunks(self):
+        users = [User.objects.create(username=f'batch_user{i}') for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            adjust_unread_counts({user.pk: 2 for user in users})
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "roadapp_unreadnotificationcount"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(
+            list(UnreadNotificationCount.objects.filter(user__in=users).values_list('count', flat=True)), [2] * 5,
+        )
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reporter = User.objects.create(username='unread_reporter')
+        self.other = User.objects.create(username='unread_other')
+        self.notifications = [
+            Notification.objects.create(
+                user=self.reporter, notification_type='complaint_status', title=f'Update {i}', message='-',
+            )
+            for i in range(4)
+        ]
+        self.foreign = Notification.objects.create(
+            user=self.other, notification_type='complaint_status', title='Other', message='-',
+        )
+        self.client.force_login(self.reporter)
+
+    def assertUnread(self, user, expected):
+        # Read once to fill the cache, then check the cached value agrees with the table
+        self.assertEqual(unread_count(user.pk), expected)
+        self.assertEqual(cache.get(UNREAD_CACHE_KEY.format(user.pk)), expected)
+        self.assertEqual(Notification.objects.filter(user=user, is_read=False).count(), expected)
+
+    def test_counter_and_cache_follow_mark_read_mark_all_and_delete(self):
+        self.assertUnread(self.reporter, 4)
+        self.assertUnread(self.other, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('mark_notifications_read'), {
+                'ids': [self.notifications[0].pk, self.notifications[0].pk, self.foreign.pk],
+            })
+        self.assertUnread(self.reporter, 3)
+        self.assertUnread(self.other, 1)
+
+        # One read and one unread notification, loaded as a view would before deleting them
+        with self.captureOnCommitCallbacks(execute=True):
+            for notification in Notification.objects.filter(pk__in=[n.pk for n in self.notifications[:2]]):
+                notification.delete()
+        self.assertUnread(self.reporter, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('mark_all_notifications_read'))
+        self.assertUnread(self.reporter, 0)
+        self.assertUnread(self.other, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.filter(user=self.reporter).delete()
+            self.foreign.delete()
+        self.assertUnread(self.reporter, 0)
+        self.assertUnread(self.other, 0)
+        self.assertEqual(unread_count_drift(), {})
+
+
+class NotificationStreamTests(TransactionTestCase):
+    # The stream reads the database from worker threads, which only see committed rows
+    def setUp(self):
+        self.reporter = User.objects.create(username='stream_reporter')
+        self.complaint = Complaint.objects.create(
+            user=self.reporter, title='Broken sign', description='Bent', location='Stream Rd', complaint_type='other',
+        )
+        self.client.force_login(self.reporter)
+
+    def poll(self, last_event_id=None):
+        headers = {'HTTP_LAST_EVENT_ID': last_event_id} if last_event_id else {}
+        response = self.client.get(reverse('notification_stream'), **headers)
+        self.assertEqual(response.status_code, 200)
+        return [
+            dict(line.split(': ', 1) for line in message.splitlines())
+            for message in response.content.decode().split('\n\n') if message.startswith(('id:', 'event:'))
+        ]
+
+    def transition(self, status):
+        Complaint.objects.filter(pk=self.complaint.pk).update(status=status)
+        notify_transition(self.complaint, status)
+
+    def test_status_change_is_read_from_the_notifications(self):
+        self.transition('verified')
+        ready, = self.poll()
+        self.assertEqual(ready['event'], 'ready')
+        self.transition('assigned')
+
+        status, notification = self.poll(ready['id'])
+        self.assertEqual(status['event'], 'status')
+        self.assertEqual(
+            json.loads(status['data']),
+            {'type': 'status', 'complaint': self.complaint.pk, 'status': 'assigned', 'label': 'Assigned to Contractor'},
+        )
+        self.assertEqual((notification['event'], json.loads(notification['data'])['title']), (
+            'notification', 'Contractor assigned',
+        ))
+        # Resuming from the notification's id sends neither again
+        self.assertEqual([message['event'] for message in self.poll(notification['id'])], ['ready'])
+
+
+    def test_first_notification_reaches_a_user_who_had_none(self):
+        ready, = self.poll()
+        self.assertEqual(ready['event'], 'ready')
+        self.transition('verified')
+
+        status, notification = self.poll(ready['id'])
+        self.assertEqual((status['event'], notification['event']), ('status', 'notification'))
+        self.assertEqual(json.loads(notification['data'])['title'], 'Complaint verified')
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.contractor = Contractor.objects.create(
+            user=User.objects.create(username='import_firm'), company_name='Import Roads', phone='0', address='-',
+            specialization='pothole', is_verified=True,
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/complaints.csv'
+        self.errors = f'{directory.name}/errors.csv'
+        rows = [
+            ('Sunken drain', 'pending', ''),
+            ('Leaning pole', 'not-a-status', ''),
+            ('Washed out verge', 'assigned', 'import_firm'),
+            ('Blocked culvert', 'verified', ''),
+            ('Broken railing', 'completed', 'import_firm'),
+        ]
+        with open(self.path, 'w', newline='') as source:
+            writer = csv.writer(source)
+            writer.writerow(['title', 'description', 'location', 'reporter', 'status', 'contractor', 'created_at'])
+            for title, status, contractor in rows:
+                writer.writerow([title, 'Historic report', 'Import Ln', 'import_reporter', status, contractor, '2020-01-02'])
+
+    def run_import(self, *args):
+        call_command(
+            'import_complaints', self.path, '--workers', '0', '--chunk-size', '2', '--errors', self.errors, *args,
+            stdout=io.StringIO(),
+        )
+
+    def test_resume_after_a_failed_chunk_writes_no_chunk_twice(self):
+        # No superuser: the first chunk has no assignment and commits, the second needs an actor and fails
+        with self.assertRaisesMessage(CommandError, 'Row 3 names a contractor'):
+            self.run_import()
+        self.assertEqual(ImportCheckpoint.objects.get().row, 2)
+        self.assertEqual(Complaint.objects.count(), 1)
+
+        User.objects.create(username='import_admin', is_staff=True)
+        self.run_import('--actor', 'import_admin')
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.row, checkpoint.imported, checkpoint.rejected), (5, 4, 1))
+        self.assertEqual(
+            sorted(Complaint.objects.values_list('title', flat=True)),
+            ['Blocked culvert', 'Broken railing', 'Sunken drain', 'Washed out verge'],
+        )
+        self.assertEqual(ComplaintAssignment.objects.filter(contractor=self.contractor).count(), 2)
+        self.assertEqual(Complaint.objects.filter(created_at__year=2020).count(), 4)
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+        self.assertEqual(complaint_search_count('historic'), 4)
+        with open(self.errors, newline='') as errors:
+            (number, message), = csv.reader(errors)
+        self.assertEqual(number, '2')
+        self.assertIn('status', message)
+
+    def test_actor_is_only_needed_for_assignments(self):
+        with open(self.path, 'w', newline='') as source:
+            source.write('title,description,location,reporter\nSunken drain,Historic report,Import Ln,import_reporter\n')
+        self.run_import()
+        self.assertEqual(ComplaintAssignment.objects.count(), 0)
+        self.assertEqual(Complaint.objects.get().title, 'Sunken drain')
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.reporter = User.objects.create(username='purge_reporter')
+        self.survivor = Complaint.objects.create(
+            user=User.objects.create(username='purge_other'), title='Faded crossing', description='Paint gone',
+            location='Purge Ave', complaint_type='other',
+        )
+        self.contractor = Contractor.objects.create(
+            user=self.reporter, company_name='Purge Roads', phone='0', address='-', specialization='other',
+        )
+        for i in range(3):
+            Complaint.objects.create(
+                user=self.reporter, title=f'Cracked kerb {i}', description='Loose stones', location='Purge Ave',
+                complaint_type='other',
+            )
+        # The reporter's update on another complaint is purged with them; that complaint stays searchable
+        ComplaintUpdate.objects.create(complaint=self.survivor, contractor=self.contractor, update_text='Repainting')
+
+    def purge(self, *args):
+        call_command('purge_data', 'users', '--user', 'purge_reporter', '--no-input', *args, stdout=io.StringIO())
+
+    def test_users_purge_reindexes_cascaded_complaints(self):
+        self.assertEqual(complaint_search_count('kerb'), 3)
+        self.assertEqual(complaint_search_count('repainting'), 1)
+        self.purge('--batch-size', '1')
+        self.assertEqual(complaint_search_count('kerb'), 0)
+        self.assertEqual(complaint_search_count('repainting'), 0)
+        self.assertEqual(complaint_search_count('crossing'), 1)
+        self.assertEqual(complaint_status_counts(), aggregate_status_counts())
+
+    def test_dry_run_changes_nothing(self):
+        self.purge('--dry-run')
+        self.assertEqual(complaint_search_count('kerb'), 3)
+        self.assertEqual(complaint_search_count('repainting'), 1)
+        self.assertTrue(User.objects.filter(username='purge_reporter').exists())
+        self.assertEqual(Complaint.objects.count(), 4)
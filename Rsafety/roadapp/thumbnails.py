@@ -0,0 +1,134 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from . import fragments
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+# Format name for Pillow -> (file extension, save options)
+THUMBNAIL_FORMATS = {
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+THUMBNAIL_DIR = 'thumbs'
+
+# Image field -> JSON field that records its derivatives
+THUMBNAIL_FIELDS = {
+    'roadapp.Complaint': ('image', 'image_thumbnails'),
+    'roadapp.ComplaintUpdate': ('update_image', 'update_image_thumbnails'),
+    'roadapp.ArchivedComplaint': ('image', 'image_thumbnails'),
+    'roadapp.ArchivedUpdate': ('update_image', 'update_image_thumbnails'),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2), thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def derivative_name(source_name, width, extension):
+    stem = posixpath.splitext(source_name)[0]
+    return posixpath.join(THUMBNAIL_DIR, f'{stem}-{width}w.{extension}')
+
+
+def generate_derivatives(source_name, storage=default_storage):
+    """
+    Write every size and format of one stored image and describe them.
+
+    Returns ``{'source': name, 'width': w, 'variants': {'webp': {'320': path, ...}, 'jpg': {...}}}``.
+    Sizes wider than the original are skipped; a small original still gets
+    one derivative at its own width.
+    """
+    with storage.open(source_name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    widths = [w for w in THUMBNAIL_WIDTHS if w < image.width] or [image.width]
+    variants = {extension: {} for extension, _ in THUMBNAIL_FORMATS.values()}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+        for format_name, (extension, options) in THUMBNAIL_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, format_name, **options)
+            name = derivative_name(source_name, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[extension][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return {'source': source_name, 'width': image.width, 'variants': variants}
+
+
+def delete_derivatives(thumbnails, storage=default_storage):
+    for sizes in (thumbnails or {}).get('variants', {}).values():
+        for name in sizes.values():
+            storage.delete(name)
+
+
+def needs_thumbnails(instance):
+    image_field, thumbnails_field = THUMBNAIL_FIELDS[instance._meta.label]
+    image = getattr(instance, image_field)
+    return bool(image) and getattr(instance, thumbnails_field).get('source') != image.name
+
+
+def fragment_scopes(model_label, pk):
+    """Scopes the save signals would bump for the row, whose cached fragments may show its image"""
+    rows = apps.get_model(model_label).objects.filter(pk=pk)
+    if model_label == 'roadapp.Complaint':
+        assignments = apps.get_model('roadapp.ComplaintAssignment').objects.filter(complaint_id=pk)
+        return [
+            'role:admin', f"reporter:{rows.values_list('user_id', flat=True).first()}",
+            *(f'contractor:{contractor_id}' for contractor_id in assignments.values_list('contractor_id', flat=True)),
+        ]
+    if model_label == 'roadapp.ComplaintUpdate':
+        return [f"contractor:{rows.values_list('contractor_id', flat=True).first()}"]
+    # Archived rows are not on any dashboard
+    return []
+
+
+def process(model_label, pk):
+    """Build the derivatives for one row; runs on a worker thread or inline"""
+    close_old_connections()
+    try:
+        model = apps.get_model(model_label)
+        image_field, thumbnails_field = THUMBNAIL_FIELDS[model_label]
+        source_name = model.objects.filter(pk=pk).values_list(image_field, flat=True).first()
+        if not source_name:
+            return None
+        thumbnails = generate_derivatives(source_name)
+        # update() rather than save() so no save signals fire and reschedule this work;
+        # the fragments they would have invalidated are bumped here instead
+        if model.objects.filter(pk=pk, **{image_field: source_name}).update(**{thumbnails_field: thumbnails}):
+            fragments.bump(*fragment_scopes(model_label, pk))
+        return thumbnails
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s %s', model_label, pk)
+        return None
+    finally:
+        close_old_connections()
+
+
+def schedule(instance):
+    """Queue thumbnail generation once the surrounding transaction commits"""
+    label, pk = instance._meta.label, instance.pk
+    if getattr(settings, 'THUMBNAIL_ASYNC', True):
+        transaction.on_commit(lambda: get_executor().submit(process, label, pk))
+    else:
+        transaction.on_commit(lambda: process(label, pk))
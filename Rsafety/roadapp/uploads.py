@@ -0,0 +1,209 @@
+import hashlib
+import posixpath
+from collections import Counter, defaultdict
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.db.models import F
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+BLOB_DIR = 'blobs'
+# Names per query when releasing many blobs at once
+RELEASE_CHUNK_SIZE = 500
+DEFAULT_MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+
+def max_upload_size():
+    return getattr(settings, 'MAX_IMAGE_UPLOAD_SIZE', DEFAULT_MAX_IMAGE_UPLOAD_SIZE)
+
+
+def blob_name(digest, extension):
+    return posixpath.join(BLOB_DIR, digest[:2], f'{digest}{extension}')
+
+
+def file_sha256(content):
+    """Digest of a file not received through HashingUploadHandler"""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """
+    Hash uploads as they stream in and stop storing them past the size limit.
+
+    Small files stay in memory; once a file outgrows FILE_UPLOAD_MAX_MEMORY_SIZE
+    it spills to a temporary file that storage can later move into place
+    without copying. The finished file carries ``sha256`` and, when it was
+    too large, ``oversized`` so the form can reject it before Pillow reads it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.buffer = BytesIO()
+        self.temporary = None
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.oversized or self.received > max_upload_size():
+            # Keep draining the request body, but stop storing this file
+            self.oversized = True
+            return None
+        self.digest.update(raw_data)
+        if self.temporary is None and self.received > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            self.temporary = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+            )
+            self.temporary.write(self.buffer.getvalue())
+            self.buffer = None
+        (self.temporary or self.buffer).write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.temporary is not None:
+            upload = self.temporary
+            upload.seek(0)
+            upload.size = file_size
+        else:
+            self.buffer.seek(0)
+            upload = InMemoryUploadedFile(
+                self.buffer, self.field_name, self.file_name, self.content_type,
+                file_size, self.charset, self.content_type_extra,
+            )
+        upload.sha256 = self.digest.hexdigest()
+        upload.oversized = self.oversized
+        return upload
+
+
+def hashing_uploads(view):
+    """
+    Receive the view's uploads through HashingUploadHandler only.
+
+    The handler caps every file at MAX_IMAGE_UPLOAD_SIZE, so it is attached
+    to the image-upload views rather than installed for the whole site.
+    Handlers must be set before anything reads the request body, and the
+    CSRF middleware reads it, so the check runs inside the view instead.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [HashingUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Store each distinct upload once, named by its SHA-256.
+
+    Saving a file whose blob already exists only bumps the MediaBlob reference
+    count; deleting a name drops a reference and removes the file with the last one.
+    """
+
+    def save(self, name, content, max_length=None):
+        from .models import MediaBlob
+
+        if content is None or not hasattr(content, 'chunks'):
+            return super().save(name, content, max_length)
+        digest = getattr(content, 'sha256', None) or file_sha256(content)
+        name = blob_name(digest, posixpath.splitext(name)[1].lower())
+        with transaction.atomic():
+            blob, created = MediaBlob.objects.select_for_update().get_or_create(
+                sha256=digest, defaults={'name': name, 'size': content.size}
+            )
+            if not created:
+                MediaBlob.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+                if self.exists(blob.name):
+                    return blob.name
+            self._save(blob.name, content)
+        return blob.name
+
+    def get_available_name(self, name, max_length=None):
+        # Blob names are their content, so an existing file is the same file
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def delete(self, name):
+        self.release(name)
+
+    def release(self, name):
+        """
+        Drop one reference to ``name``; True if that was the last one.
+
+        The file is removed once the transaction commits, so a rolled-back
+        delete keeps it.
+        """
+        from .models import MediaBlob
+
+        if not name:
+            return False
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None:
+                if blob.ref_count > 1:
+                    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                    return False
+                blob.delete()
+            # Otherwise it was uploaded before blobs were reference counted: it has one owner
+            transaction.on_commit(lambda: FileSystemStorage.delete(self, name))
+        return True
+
+    def release_many(self, names):
+        """
+        Drop one reference per occurrence of each name, with set-based queries.
+
+        Returns the set of names whose last reference went. Their files are
+        removed once the transaction commits, so a rolled-back purge keeps them.
+        """
+        from .models import MediaBlob
+
+        references = Counter(name for name in names if name)
+        removed = set()
+        batch = sorted(references)
+        for start in range(0, len(batch), RELEASE_CHUNK_SIZE):
+            chunk = batch[start:start + RELEASE_CHUNK_SIZE]
+            stored = dict(
+                MediaBlob.objects.select_for_update().filter(name__in=chunk).values_list('name', 'ref_count')
+            )
+            by_count = defaultdict(list)
+            for name in chunk:
+                if name in stored and stored[name] > references[name]:
+                    by_count[references[name]].append(name)
+                else:
+                    # Last reference, or uploaded before blobs were reference counted
+                    removed.add(name)
+            for count, shared in by_count.items():
+                MediaBlob.objects.filter(name__in=shared).update(ref_count=F('ref_count') - count)
+            MediaBlob.objects.filter(name__in=[name for name in chunk if name in removed]).delete()
+
+        def delete_files():
+            for name in removed:
+                FileSystemStorage.delete(self, name)
+
+        if removed:
+            transaction.on_commit(delete_files)
+        return removed
+
+
+upload_storage = ContentAddressedStorage()
+
+
+def get_upload_storage():
+    return upload_storage
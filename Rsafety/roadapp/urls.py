@@ -17,6 +17,9 @@ urlpatterns = [
     path('user/complaint/new/', views.post_complaint, name='post_complaint'),
     path('user/complaint/<int:complaint_id>/', views.complaint_detail, name='complaint_detail'),
     path('user/notifications/', views.user_notifications, name='user_notifications'),
+    path('notifications/mark-read/', views.mark_notifications_read, name='mark_notifications_read'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
+    path('notifications/mark-all-read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     
 
     
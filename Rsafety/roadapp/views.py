@@ -6,15 +6,34 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Q
-from django.http import JsonResponse
-from django.core.mail import send_mail
+from django.core.handlers.asgi import ASGIRequest
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
 from django.template.loader import render_to_string
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import url_has_allowed_host_and_scheme, urlsafe_base64_encode, urlsafe_base64_decode
+from django.views.decorators.http import require_POST
 from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import SimpleLazyObject
 from django.contrib.sites.shortcuts import get_current_site
-from .models import Complaint, Contractor, ComplaintAssignment, ComplaintUpdate, Notification
+from .models import Complaint, Contractor, ComplaintAssignment, ComplaintUpdate, ContractorWorkload, Notification
+from .dedup import find_duplicate
+from . import fragments
+from .archive import find_complaint
+from .bulk import BULK_TRANSITIONS, bulk_transition
+from .exports import EXPORT_FORMATS, EXPORTS, export_filename, export_stream
+from .events import (
+    POLL_INTERVAL, event_id, format_event, high_water_mark, notification_events, notifications_after, stream_events,
+)
+from .mailer import enqueue_mail
+from .notifications import mark_read, notify_transition
 from .forms import UserRegistrationForm, ContractorRegistrationForm, ComplaintForm, ComplaintUpdateForm, ComplaintAssignmentForm
+from .pagination import paginate_keyset
+from .search import complaint_search, complaint_search_count, email_search, snippet_html
+from .stats import aggregate_status_counts, complaint_status_counts, verified_contractor_count
+from .uploads import hashing_uploads
 
 def is_admin(user):
     return user.is_staff
@@ -63,6 +82,7 @@ def forgot_password(request):
             email = form.cleaned_data['email']
             associated_users = User.objects.filter(email=email)
             if associated_users.exists():
+                # Queued rather than sent here so the request never waits on SMTP
                 for user in associated_users:
                     subject = "Password Reset Request - Road Safety System"
                     email_template_name = "registration/password_reset_email.html"
@@ -76,11 +96,8 @@ def forgot_password(request):
                         'protocol': 'https' if request.is_secure() else 'http',
                     }
                     email = render_to_string(email_template_name, c)
-                    try:
-                        send_mail(subject, email, 'noreply@roadsafety.com', [user.email], fail_silently=False)
-                        messages.success(request, 'Password reset email has been sent to your email address.')
-                    except Exception as e:
-                        messages.error(request, 'Failed to send password reset email. Please try again.')
+                    enqueue_mail(subject, email, [user.email], 'noreply@roadsafety.com')
+                messages.success(request, 'Password reset email has been sent to your email address.')
             else:
                 messages.error(request, 'No user found with this email address.')
             return redirect('login')
@@ -144,15 +161,22 @@ def contractor_register(request):
 # User Views
 @login_required
 def user_dashboard(request):
-    complaints = Complaint.objects.filter(user=request.user).order_by('-created_at')
+    # Lazy so that cached fragments of the template skip these queries
+    complaints = Complaint.objects.filter(user=request.user)
+    counts = SimpleLazyObject(lambda: aggregate_status_counts(complaints))
+    page = SimpleLazyObject(lambda: paginate_keyset(request, complaints.for_user_list()))
     context = {
-        'complaints': complaints,
-        'total_complaints': complaints.count(),
-        'pending_complaints': complaints.filter(status='pending').count(),
-        'completed_complaints': complaints.filter(status='completed').count(),
+        'complaints': SimpleLazyObject(lambda: page.object_list),
+        'page': page,
+        'total_complaints': SimpleLazyObject(lambda: counts['total']),
+        'pending_complaints': SimpleLazyObject(lambda: counts['pending']),
+        'assigned_complaints': SimpleLazyObject(lambda: counts['assigned']),
+        'completed_complaints': SimpleLazyObject(lambda: counts['completed']),
+        'fragment_scopes': fragments.reporter_scopes(request.user.pk),
     }
     return render(request, 'user/user_index.html', context)
 
+@hashing_uploads
 @login_required
 def post_complaint(request):
     if request.method == 'POST':
@@ -160,8 +184,19 @@ def post_complaint(request):
         if form.is_valid():
             complaint = form.save(commit=False)
             complaint.user = request.user
+            original = find_duplicate(complaint)
+            if original:
+                complaint.duplicate_of = original
+                complaint.status = 'duplicate'
             complaint.save()
-            messages.success(request, 'Complaint submitted successfully!')
+            if original:
+                messages.info(
+                    request,
+                    f'This looks like an issue that was already reported (complaint #{original.id}). '
+                    'Your report has been linked to it.'
+                )
+            else:
+                messages.success(request, 'Complaint submitted successfully!')
             return redirect('user_dashboard')
     else:
         form = ComplaintForm()
@@ -169,56 +204,85 @@ def post_complaint(request):
 
 @login_required
 def complaint_detail(request, complaint_id):
-    # Allow admins to view any complaint; regular users can only view their own
-    if request.user.is_staff:
-        complaint = get_object_or_404(Complaint, id=complaint_id)
-    else:
-        complaint = get_object_or_404(Complaint, id=complaint_id, user=request.user)
-    updates = ComplaintUpdate.objects.filter(complaint=complaint).order_by('-created_at')
+    # Allow admins to view any complaint; regular users can only view their own.
+    # Closed complaints moved to the archive tables keep their ids and stay viewable.
+    complaint, updates, archived = find_complaint(complaint_id, None if request.user.is_staff else request.user)
+    if complaint is None:
+        raise Http404('No complaint matches the given query.')
     context = {
         'complaint': complaint,
         'updates': updates,
+        'archived': archived,
     }
     return render(request, 'user/complaint_detail.html', context)
 
 @login_required
 def user_notifications(request):
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'user/notifications.html', {'notifications': notifications})
+    notifications = Notification.objects.for_inbox().filter(user=request.user)
+    page = paginate_keyset(request, notifications)
+    return render(request, 'user/notifications.html', {'notifications': page.object_list, 'page': page})
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    marked = mark_read(request.user, ids)
+    messages.success(request, f'Marked {marked} notification(s) as read.')
+    return _back_to_notifications(request)
+
+@login_required
+@require_POST
+def mark_all_notifications_read(request):
+    marked = mark_read(request.user)
+    messages.success(request, f'Marked {marked} notification(s) as read.')
+    return _back_to_notifications(request)
+
+def _back_to_notifications(request):
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('contractor_notifications' if is_contractor(request.user) else 'user_notifications')
 
 # Admin Views
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard(request):
-    complaints = Complaint.objects.all().order_by('-created_at')
+    complaints = Complaint.objects.all()
     contractors = Contractor.objects.all()
+
+    status_filter = request.GET.get('status', '')
+    if status_filter in dict(Complaint.STATUS_CHOICES):
+        complaints = complaints.filter(status=status_filter)
+    else:
+        status_filter = ''
+    # Lazy so that cached fragments of the template skip these queries
+    page = SimpleLazyObject(lambda: paginate_keyset(request, complaints.for_admin_list()))
     
     # Email search functionality
     search_email = request.GET.get('search_email', '')
-    if search_email:
-        # Search in users by email
-        users_by_email = User.objects.filter(email__icontains=search_email)
-        contractors_by_email = contractors.filter(user__email__icontains=search_email)
-        complaints_by_email = complaints.filter(user__email__icontains=search_email)
-    else:
-        users_by_email = User.objects.none()
-        contractors_by_email = contractors.none()
-        complaints_by_email = complaints.none()
+    results = email_search(search_email)
     
+    counts = complaint_status_counts()
     context = {
-        'complaints': complaints,
-        'contractors': contractors,
-        'total_complaints': complaints.count(),
-        'pending_complaints': complaints.filter(status='pending').count(),
-        'verified_complaints': complaints.filter(status='verified').count(),
-        'assigned_complaints': complaints.filter(status='assigned').count(),
-        'completed_complaints': complaints.filter(status='completed').count(),
-        'verified_contractors': contractors.filter(is_verified=True).count(),
+        'complaints': SimpleLazyObject(lambda: page.object_list),
+        'page': page,
+        'status_filter': status_filter,
+        'contractors': SimpleLazyObject(lambda: list(contractors.select_related('user').order_by('-created_at')[:5])),
+        'verified_contractor_choices': SimpleLazyObject(
+            lambda: list(contractors.filter(is_verified=True).order_by('company_name').values_list('id', 'company_name'))
+        ),
+        'fragment_scopes': fragments.admin_scopes(),
+        'total_complaints': counts['total'],
+        'pending_complaints': counts['pending'],
+        'verified_complaints': counts['verified'],
+        'assigned_complaints': counts['assigned'],
+        'completed_complaints': counts['completed'],
+        'verified_contractors': verified_contractor_count(),
         # Email search results
         'search_email': search_email,
-        'users_by_email': users_by_email,
-        'contractors_by_email': contractors_by_email,
-        'complaints_by_email': complaints_by_email,
+        'users_by_email': results['users'],
+        'contractors_by_email': results['contractors'],
+        'complaints_by_email': results['complaints'],
     }
     return render(request, 'admin/admin_index.html', context)
 
@@ -229,30 +293,64 @@ def verify_complaint(request, complaint_id):
     if request.method == 'POST':
         action = request.POST.get('action')
         if action == 'verify':
-            complaint.status = 'verified'
-            complaint.verified_by = request.user
-            complaint.verified_at = timezone.now()
-            complaint.save()
+            with transaction.atomic():
+                complaint.status = 'verified'
+                complaint.verified_by = request.user
+                complaint.verified_at = timezone.now()
+                complaint.save(update_fields=['status', 'verified_by', 'verified_at', 'updated_at'])
+                notify_transition(complaint, actor=request.user)
             messages.success(request, 'Complaint verified successfully!')
         elif action == 'reject':
-            complaint.status = 'rejected'
-            complaint.save()
+            with transaction.atomic():
+                complaint.status = 'rejected'
+                complaint.save(update_fields=['status', 'updated_at'])
+                notify_transition(complaint, actor=request.user)
             messages.success(request, 'Complaint rejected!')
     return redirect('admin_dashboard')
 
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def bulk_complaint_action(request):
+    """Verify, reject or assign every complaint ticked on the dashboard in one transaction"""
+    action = request.POST.get('action')
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    if action not in BULK_TRANSITIONS or not ids:
+        messages.error(request, 'Select some complaints and an action.')
+        return redirect('admin_dashboard')
+    contractor = None
+    if action == 'assign':
+        contractor = Contractor.objects.filter(
+            pk=request.POST.get('contractor') or None, is_verified=True
+        ).select_related('user').first()
+        if contractor is None:
+            messages.error(request, 'Choose a verified contractor to assign the complaints to.')
+            return redirect('admin_dashboard')
+    changed = bulk_transition(ids, action, request.user, contractor=contractor)
+    old_status, new_status = BULK_TRANSITIONS[action]
+    labels = dict(Complaint.STATUS_CHOICES)
+    skipped = len(set(ids)) - changed
+    message = f'{changed} complaint(s) {labels[new_status].lower()}.'
+    if skipped:
+        message += f' {skipped} skipped because they were not {labels[old_status].lower()}.'
+    messages.success(request, message)
+    return redirect('admin_dashboard')
+
 @login_required
 @user_passes_test(is_admin)
 def assign_contractor(request, complaint_id):
-    complaint = get_object_or_404(Complaint, id=complaint_id)
+    complaint = get_object_or_404(Complaint.objects.for_detail(), id=complaint_id)
     if request.method == 'POST':
         form = ComplaintAssignmentForm(request.POST)
         if form.is_valid():
-            assignment = form.save(commit=False)
-            assignment.complaint = complaint
-            assignment.assigned_by = request.user
-            assignment.save()
-            complaint.status = 'assigned'
-            complaint.save()
+            with transaction.atomic():
+                assignment = form.save(commit=False)
+                assignment.complaint = complaint
+                assignment.assigned_by = request.user
+                assignment.save()
+                complaint.status = 'assigned'
+                complaint.save(update_fields=['status', 'updated_at'])
+                notify_transition(complaint, actor=request.user, contractor_user_id=assignment.contractor.user_id)
             messages.success(request, 'Complaint assigned to contractor successfully!')
             return redirect('admin_dashboard')
     else:
@@ -268,8 +366,9 @@ def assign_contractor(request, complaint_id):
 @login_required
 @user_passes_test(is_admin)
 def view_contractors(request):
-    contractors = Contractor.objects.all().order_by('-created_at')
-    return render(request, 'admin/contractors.html', {'contractors': contractors})
+    contractors = Contractor.objects.select_related('user', 'workload')
+    page = paginate_keyset(request, contractors)
+    return render(request, 'admin/contractors.html', {'contractors': page.object_list, 'page': page})
 
 @login_required
 @user_passes_test(is_admin)
@@ -285,26 +384,9 @@ def verify_contractor(request, contractor_id):
 def search_by_email(request):
     """Search users, contractors, and complaints by email"""
     search_email = request.GET.get('email', '')
-    results = {}
-    
-    if search_email:
-        # Search users by email
-        users = User.objects.filter(email__icontains=search_email)
-        results['users'] = users
-        
-        # Search contractors by email
-        contractors = Contractor.objects.filter(user__email__icontains=search_email)
-        results['contractors'] = contractors
-        
-        # Search complaints by user email
-        complaints = Complaint.objects.filter(user__email__icontains=search_email)
-        results['complaints'] = complaints
-    else:
-        # Initialize empty querysets when no search
-        results['users'] = User.objects.none()
-        results['contractors'] = Contractor.objects.none()
-        results['complaints'] = Complaint.objects.none()
-    
+    # Users, contractors and complaints all come from one lookup in the email index
+    results = email_search(search_email)
+
     context = {
         'search_email': search_email,
         'results': results,
@@ -312,6 +394,66 @@ def search_by_email(request):
     }
     return render(request, 'admin/email_search.html', context)
 
+@login_required
+@user_passes_test(is_admin)
+def search_complaints(request):
+    """Full-text search over complaint text and contractor updates, best matches first"""
+    query = request.GET.get('q', '').strip()
+    per_page = 20
+    try:
+        page_number = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page_number = 1
+
+    results = []
+    total = 0
+    if query:
+        total = complaint_search_count(query)
+        hits = complaint_search(query, limit=per_page, offset=(page_number - 1) * per_page)
+        complaints = Complaint.objects.for_admin_list().in_bulk([complaint_id for complaint_id, _, _ in hits])
+        for complaint_id, score, snippet in hits:
+            if complaint_id in complaints:
+                results.append({
+                    'complaint': complaints[complaint_id],
+                    'score': -score,
+                    'snippet': snippet_html(snippet),
+                })
+
+    context = {
+        'query': query,
+        'results': results,
+        'total': total,
+        'page_number': page_number,
+        'previous_page': page_number - 1 if page_number > 1 else None,
+        'next_page': page_number + 1 if page_number * per_page < total else None,
+    }
+    return render(request, 'admin/complaint_search.html', context)
+
+@login_required
+@user_passes_test(is_admin)
+def export_data(request, name):
+    """Stream complaints, assignments or updates as CSV or JSON lines, optionally gzipped"""
+    if name not in EXPORTS:
+        return JsonResponse({'error': f'Unknown export {name!r}.'}, status=404)
+    export_format = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip') in ('1', 'true')
+    try:
+        stream = export_stream(name, request.GET, export_format, compress)
+    except ValidationError as exc:
+        return JsonResponse({'error': ' '.join(exc.messages)}, status=400)
+    response = StreamingHttpResponse(
+        stream, content_type='application/gzip' if compress else EXPORT_FORMATS[export_format],
+    )
+    filename = export_filename(name, export_format, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+@user_passes_test(is_admin)
+def fragment_cache_stats(request):
+    """Hit/miss counts of the dashboard fragment cache as JSON"""
+    return JsonResponse({'fragments': fragments.fragment_stats()})
+
 # Contractor Views
 @login_required
 @user_passes_test(is_contractor)
@@ -319,36 +461,57 @@ def contractor_dashboard(request):
     assignments = ComplaintAssignment.objects.filter(
         contractor=request.user.contractor,
         is_active=True
-    ).order_by('-assigned_at')
-    
+    )
+    # Lazy so that cached fragments of the template skip these queries
+    page = SimpleLazyObject(lambda: paginate_keyset(request, assignments.for_contractor_dashboard(), key='assigned_at'))
+
+    contractor = request.user.contractor
+    workload = SimpleLazyObject(
+        lambda: ContractorWorkload.objects.filter(contractor=contractor).first() or ContractorWorkload(contractor=contractor)
+    )
+
     context = {
-        'assignments': assignments,
-        'total_assignments': assignments.count(),
-        'active_assignments': assignments.filter(complaint__status='assigned').count(),
-        'in_progress_assignments': assignments.filter(complaint__status='in_progress').count(),
-        'completed_assignments': assignments.filter(complaint__status='completed').count(),
+        'assignments': SimpleLazyObject(lambda: page.object_list),
+        'page': page,
+        'total_assignments': SimpleLazyObject(lambda: workload.active),
+        'active_assignments': SimpleLazyObject(lambda: workload.assigned),
+        'in_progress_assignments': SimpleLazyObject(lambda: workload.in_progress),
+        'completed_assignments': SimpleLazyObject(lambda: workload.completed),
+        'overdue_assignments': SimpleLazyObject(lambda: workload.overdue),
+        'fragment_scopes': fragments.contractor_scopes(request.user.contractor.pk),
     }
     return render(request, 'contractor/contractor_index.html', context)
 
+@hashing_uploads
 @login_required
 @user_passes_test(is_contractor)
 def update_status(request, assignment_id):
-    assignment = get_object_or_404(ComplaintAssignment, id=assignment_id, contractor=request.user.contractor)
+    assignment = get_object_or_404(
+        ComplaintAssignment.objects.for_update_form(), id=assignment_id, contractor=request.user.contractor
+    )
     if request.method == 'POST':
         form = ComplaintUpdateForm(request.POST, request.FILES)
 
         # Always try to update status, even if no text/image provided
         new_status = request.POST.get('status')
+        # The status counters only know the defined statuses
+        if new_status and new_status not in dict(Complaint.STATUS_CHOICES):
+            messages.error(request, 'Unknown status.')
+            return redirect('update_status', assignment_id=assignment.id)
         if new_status:
-            assignment.complaint.status = new_status
-            assignment.complaint.save()
+            with transaction.atomic():
+                changed = assignment.complaint.status != new_status
+                assignment.complaint.status = new_status
+                assignment.complaint.save(update_fields=['status', 'updated_at'])
 
-            if new_status == 'in_progress' and not assignment.work_started_at:
-                assignment.work_started_at = timezone.now()
-            elif new_status == 'completed' and not assignment.work_completed_at:
-                assignment.work_completed_at = timezone.now()
+                if new_status == 'in_progress' and not assignment.work_started_at:
+                    assignment.work_started_at = timezone.now()
+                elif new_status == 'completed' and not assignment.work_completed_at:
+                    assignment.work_completed_at = timezone.now()
 
-            assignment.save()
+                assignment.save()
+                if changed:
+                    notify_transition(assignment.complaint, actor=request.user)
 
         # Create a progress note only if provided/valid
         if form.is_valid() and (form.cleaned_data.get('update_text') or form.cleaned_data.get('update_image')):
@@ -365,17 +528,50 @@ def update_status(request, assignment_id):
     else:
         form = ComplaintUpdateForm()
     
+    recent_updates = ComplaintUpdate.objects.for_complaint_detail().filter(
+        complaint_id=assignment.complaint_id
+    ).order_by('-created_at')[:3]
     context = {
         'assignment': assignment,
         'form': form,
+        'recent_updates': recent_updates,
     }
     return render(request, 'contractor/update_status.html', context)
 
 @login_required
 @user_passes_test(is_contractor)
 def contractor_notifications(request):
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'contractor/notifications.html', {'notifications': notifications})
+    notifications = Notification.objects.for_inbox().filter(user=request.user)
+    page = paginate_keyset(request, notifications)
+    return render(request, 'contractor/notifications.html', {'notifications': page.object_list, 'page': page})
+
+async def notification_stream(request):
+    """
+    Server-Sent Events feed of the user's new notifications and complaint status changes.
+
+    Under ASGI the stream stays open on the event loop without holding a
+    thread. Under WSGI it answers like a single poll and the browser
+    reconnects from its Last-Event-ID after the retry delay.
+    """
+    user = await sync_to_async(
+        lambda: request.user if request.user.is_authenticated else None, thread_sensitive=False,
+    )()
+    if user is None:
+        return HttpResponse(status=401)
+    last_event_id = request.headers.get('Last-Event-ID')
+    mark = await sync_to_async(high_water_mark, thread_sensitive=False)(user.pk, last_event_id)
+    if not isinstance(request, ASGIRequest):
+        rows = await sync_to_async(notifications_after, thread_sensitive=False)(user.pk, mark)
+        events, new_mark = notification_events(rows)
+        mark = new_mark or mark
+        body = f'retry: {POLL_INTERVAL * 1000}\n\n' + ''.join(events)
+        if not events:
+            body += format_event('ready', {}, event_id(mark))
+        return HttpResponse(body, content_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    response = StreamingHttpResponse(stream_events(user.pk, mark), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 # General Views
 def home(request):
@@ -0,0 +1,117 @@
+import threading
+import weakref
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import ComplaintAssignment, Contractor, ContractorWorkload
+
+WORKLOAD_FIELDS = ['active', 'assigned', 'in_progress', 'completed', 'overdue']
+OPEN_STATUSES = ['assigned', 'in_progress']
+
+
+def aggregate_workloads(contractor_ids=None):
+    """``{contractor_id: {field: n}}`` counted from the active assignments with one grouped query"""
+    rows = ComplaintAssignment.objects.filter(is_active=True)
+    if contractor_ids is not None:
+        rows = rows.filter(contractor_id__in=contractor_ids)
+    counts = rows.values('contractor_id').annotate(
+        active=Count('id'),
+        assigned=Count('id', filter=Q(complaint__status='assigned')),
+        in_progress=Count('id', filter=Q(complaint__status='in_progress')),
+        completed=Count('id', filter=Q(complaint__status='completed')),
+        overdue=Count('id', filter=Q(
+            complaint__status__in=OPEN_STATUSES, estimated_completion_date__lt=timezone.localdate(),
+        )),
+    ).order_by()
+    return {row.pop('contractor_id'): row for row in counts}
+
+
+def refresh_workloads(contractor_ids):
+    """Recount the given contractors and upsert their counters in one statement"""
+    contractor_ids = list(Contractor.objects.filter(pk__in=set(contractor_ids)).values_list('pk', flat=True))
+    if not contractor_ids:
+        return
+    actual = aggregate_workloads(contractor_ids)
+    zero = dict.fromkeys(WORKLOAD_FIELDS, 0)
+    ContractorWorkload.objects.bulk_create(
+        [ContractorWorkload(contractor_id=pk, **actual.get(pk, zero)) for pk in contractor_ids],
+        update_conflicts=True, unique_fields=['contractor'], update_fields=[*WORKLOAD_FIELDS, 'updated_at'],
+    )
+
+
+# The pending recount of the current transaction, weakly referenced per thread
+_pending = threading.local()
+
+
+class PendingRefresh:
+    """on_commit callback recounting every contractor touched by one transaction"""
+
+    def __init__(self, contractor_ids):
+        self.contractor_ids = set(contractor_ids)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        refresh_workloads(self.contractor_ids)
+
+
+def pending_refresh():
+    """The recount still waiting for the current transaction to commit, if any"""
+    reference = getattr(_pending, 'refresh', None)
+    pending = reference() if reference is not None else None
+    return pending if pending is not None and not pending.done else None
+
+
+def schedule_refresh(contractor_ids):
+    """
+    Recount the contractors once the transaction commits.
+
+    Counters are recounted rather than nudged: transitions touch a handful of
+    contractors, each recount reads their active assignments through
+    assignment_active_idx, and the result is right whichever path (save, bulk
+    action, auto-assignment) changed the rows. All contractors touched by one
+    transaction share a single recount. Only Django holds the callback
+    itself, so when a rollback discards it the weak reference dies and the
+    next call registers a new one.
+    """
+    contractor_ids = set(contractor_ids)
+    if not contractor_ids:
+        return
+    pending = pending_refresh()
+    if pending is not None:
+        pending.contractor_ids |= contractor_ids
+        return
+    pending = PendingRefresh(contractor_ids)
+    _pending.refresh = weakref.ref(pending)
+    transaction.on_commit(pending)
+
+
+def complaint_status_changed(complaint):
+    schedule_refresh(
+        ComplaintAssignment.objects.filter(complaint_id=complaint.pk, is_active=True)
+        .values_list('contractor_id', flat=True)
+    )
+
+
+def workload_drift():
+    """``{contractor_id: (stored, actual)}`` for every contractor whose counters are off"""
+    actual = aggregate_workloads()
+    stored = {
+        row.pop('contractor_id'): row
+        for row in ContractorWorkload.objects.values('contractor_id', *WORKLOAD_FIELDS)
+    }
+    zero = dict.fromkeys(WORKLOAD_FIELDS, 0)
+    return {
+        pk: (stored.get(pk), actual.get(pk, zero))
+        for pk in Contractor.objects.values_list('pk', flat=True)
+        if stored.get(pk, zero) != actual.get(pk, zero)
+    }
+
+
+def rebuild_workloads():
+    """Recount every contractor that drifted, including overdue counts that aged, and return the drift"""
+    drift = workload_drift()
+    refresh_workloads(drift)
+    return drift
@@ -1,49 +1,196 @@
+"""
+Schema, size and query-plan report for the Road Safety database, as JSON.
+
+    python schema_dump.py                     # schema and sizes of Rsafety/db.sqlite3
+    python schema_dump.py --views             # also explain every SELECT the budgeted views issue
+    python schema_dump.py --views --rows 200 -o report.json
+
+Keys are sorted and nothing time-dependent is recorded, so the reports of two
+releases can be diffed. View plans come from a throwaway database seeded by
+Rsafety/roadapp/seeding.py rather than from the local database, so they do not depend on
+whatever data it happens to hold.
+
+--views covers the GET pages listed by SeedData.requests(), the ones with a
+query budget. Out of scope:
+
+- views that write: the POST half of update_status and assign_contractor,
+  verify_complaint, bulk_complaint_action, verify_contractor, post_complaint,
+  mark_notifications_read, mark_all_notifications_read and the login,
+  registration and password views. Each would change the seeded rows that
+  every later view is explained against;
+- export_data, which streams whole tables in primary-key order by design;
+- notification_stream, whose reads walk the same (user, created_at, id)
+  notification index as api_notifications;
+- fragment_cache_stats and test_csrf, which only load the session and user.
+"""
+import argparse
+import json
 import os
 import sqlite3
 import sys
 
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rsafety")
+DEFAULT_DB_PATH = os.path.join(PROJECT_DIR, "db.sqlite3")
 
-def print_schema(db_path: str) -> None:
-    if not os.path.exists(db_path):
-        print(f"Database not found: {db_path}")
-        sys.exit(1)
 
-    connection = sqlite3.connect(db_path)
-    cursor = connection.cursor()
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
 
+def table_names(cursor: sqlite3.Cursor) -> list:
     cursor.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
     )
-    table_names = [row[0] for row in cursor.fetchall()]
+    return [row[0] for row in cursor.fetchall()]
 
-    for table_name in table_names:
-        safe_table_name = table_name.replace("'", "''")
-        print(f"TABLE: {table_name}")
-        print("cid|name|type|notnull|default|pk")
 
-        cursor.execute(f"PRAGMA table_info('{safe_table_name}')")
-        for cid, col_name, col_type, notnull, default, pk in cursor.fetchall():
-            print(f"{cid}|{col_name}|{col_type}|{notnull}|{default}|{pk}")
+def schema(connection: sqlite3.Connection) -> dict:
+    """Columns, foreign keys and indexes of every table"""
+    cursor = connection.cursor()
+    tables = {}
+    for table_name in table_names(cursor):
+        cursor.execute(f"PRAGMA table_info({quote(table_name)})")
+        columns = [
+            {"name": name, "type": col_type, "notnull": bool(notnull), "default": default, "pk": pk}
+            for _, name, col_type, notnull, default, pk in cursor.fetchall()
+        ]
 
-        print("")
+        cursor.execute(f"PRAGMA foreign_key_list({quote(table_name)})")
+        foreign_keys = [
+            {"from": from_col, "table": ref_table, "to": to_col, "on_update": on_update, "on_delete": on_delete}
+            for _, _, ref_table, from_col, to_col, on_update, on_delete, _ in cursor.fetchall()
+        ]
 
-        cursor.execute(f"PRAGMA foreign_key_list('{safe_table_name}')")
-        foreign_keys = cursor.fetchall()
-        if foreign_keys:
-            print("foreign_keys: id|seq|table|from|to|on_update|on_delete|match")
-            for fk in foreign_keys:
-                fk_id, seq, ref_table, from_col, to_col, on_update, on_delete, match = fk
-                print(
-                    f"foreign_keys: {fk_id}|{seq}|{ref_table}|{from_col}|{to_col}|{on_update}|{on_delete}|{match}"
-                )
-            print("")
+        cursor.execute(f"PRAGMA index_list({quote(table_name)})")
+        indexes = {}
+        for _, index_name, unique, origin, partial in cursor.fetchall():
+            cursor.execute(f"PRAGMA index_info({quote(index_name)})")
+            indexes[index_name] = {
+                "columns": [name for _, _, name in sorted(cursor.fetchall())],
+                "unique": bool(unique),
+                "partial": bool(partial),
+                "origin": origin,
+            }
 
-    connection.close()
+        tables[table_name] = {"columns": columns, "foreign_keys": foreign_keys, "indexes": indexes}
+    return tables
 
 
-if __name__ == "__main__":
-    db_file_path = os.path.join("Rsafety", "db.sqlite3")
-    print_schema(db_file_path)
+def sizes(connection: sqlite3.Connection) -> dict:
+    """
+    Row count and on-disk bytes of every table and its indexes.
+
+    Bytes come from the dbstat virtual table; they are null when SQLite was
+    built without it.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")
+        page_bytes = dict(cursor.fetchall())
+    except sqlite3.OperationalError:
+        page_bytes = None
+
+    cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type='index'")
+    index_tables = cursor.fetchall()
+
+    report = {}
+    for table_name in table_names(cursor):
+        cursor.execute(f"SELECT COUNT(*) FROM {quote(table_name)}")
+        report[table_name] = {
+            "rows": cursor.fetchone()[0],
+            "bytes": page_bytes.get(table_name, 0) if page_bytes is not None else None,
+            "indexes": {
+                index_name: page_bytes.get(index_name, 0) if page_bytes is not None else None
+                for index_name, owner in index_tables if owner == table_name
+            },
+        }
+    return report
+
 
+def view_plans(rows: int) -> dict:
+    """
+    EXPLAIN QUERY PLAN of every SELECT each budgeted view issues, with index suggestions.
 
+    Runs the views under the Django test client against a freshly migrated
+    database seeded with ``rows`` batches, the same data the query budget tests
+    and explain_queries use.
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "RoadSafety.settings")
+    import django
 
+    django.setup()
+    from django.db import connection
+    from roadapp.queryplan import explain_view_queries, suggest_index
+    from roadapp.seeding import SeedData, test_database
+
+    views = {}
+    suggested = {}
+    with test_database():
+        data = SeedData()
+        data.seed(rows)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        for view, queries in explain_view_queries(data.requests()).items():
+            views[view] = []
+            for query in queries:
+                problems = []
+                for step in query["problems"]:
+                    suggestion = suggest_index(query["sql"], step, query["plan"])
+                    problems.append({"step": step, "suggestion": suggestion})
+                    if suggestion and not suggestion["covered_by"]:
+                        key = (suggestion["table"], tuple(suggestion["columns"]))
+                        suggested.setdefault(key, set()).add(view)
+                views[view].append({"sql": query["sql"], "plan": query["plan"], "problems": problems})
+
+    # An index on (a, b) also serves queries that only need (a)
+    for table, columns in sorted(suggested, key=lambda key: len(key[1])):
+        for other in suggested:
+            if other[0] == table and len(other[1]) > len(columns) and other[1][:len(columns)] == columns:
+                suggested[other] |= suggested.pop((table, columns))
+                break
+
+    return {
+        "rows_seeded": rows,
+        "views": views,
+        "suggested_indexes": [
+            {"table": table, "columns": list(columns), "views": sorted(view_names)}
+            for (table, columns), view_names in sorted(suggested.items())
+        ],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Dump the schema, table sizes and view query plans as JSON.")
+    parser.add_argument(
+        "--db", default=DEFAULT_DB_PATH, help="SQLite database to describe (default Rsafety/db.sqlite3)"
+    )
+    parser.add_argument("--views", action="store_true", help="Also explain the queries of every budgeted view")
+    parser.add_argument("--rows", type=int, default=50, help="Rows to seed for --views (default 50)")
+    parser.add_argument("-o", "--output", help="Write the report here instead of standard output")
+    options = parser.parse_args(argv)
+
+    if not os.path.exists(options.db):
+        print(f"Database not found: {options.db}", file=sys.stderr)
+        return 1
+
+    connection = sqlite3.connect(options.db)
+    try:
+        report = {"schema": schema(connection), "sizes": sizes(connection)}
+    finally:
+        connection.close()
+    if options.views:
+        report["query_plans"] = view_plans(options.rows)
+
+    output = json.dumps(report, indent=2, sort_keys=True, default=str) + "\n"
+    if options.output:
+        with open(options.output, "w") as report_file:
+            report_file.write(output)
+    else:
+        sys.stdout.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())